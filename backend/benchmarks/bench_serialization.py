@@ -0,0 +1,107 @@
+"""CPU cost per list request: legacy model path vs. the fast read path.
+
+The legacy path is what list handlers did before: build a Pydantic model per
+document, then let FastAPI validate and encode it again through
+``response_model``. The fast path is ``ModelCodec.load_many`` + orjson.
+
+Usage:
+    python benchmarks/bench_serialization.py [--rows 100] [--iterations 500]
+"""
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from models import Experience, PortfolioItem, Service, Skill, Testimonial
+from serialization import ModelCodec, dumps
+
+
+def _stamp(i: int) -> datetime:
+    return datetime(2024, 1, 1) + timedelta(minutes=i)
+
+
+SAMPLE_DOCS = {
+    PortfolioItem: lambda i: {
+        "id": str(uuid.uuid4()), "title": f"Project {i}", "category": "E-commerce",
+        "description": "Scaled a fashion startup from $50K to $500K annual revenue",
+        "results": {"revenue": "900% increase", "conversion": "45% improvement"},
+        "technologies": ["Shopify", "Facebook Ads", "Klaviyo"], "is_featured": i % 2 == 0,
+        "created_at": _stamp(i),
+    },
+    Testimonial: lambda i: {
+        "id": str(uuid.uuid4()), "name": f"Client {i}", "position": "CEO", "company": "Fashion Forward",
+        "testimonial": "Transformed our struggling online store into a 6-figure business.",
+        "rating": 5, "is_featured": True, "created_at": _stamp(i),
+    },
+    Service: lambda i: {
+        "id": str(uuid.uuid4()), "title": f"Service {i}", "description": "Custom Shopify stores",
+        "icon": "🛍️", "features": ["Custom Design", "App Integration"], "price": "Starting at $2,500",
+        "is_active": True, "created_at": _stamp(i),
+    },
+    Experience: lambda i: {
+        "id": str(uuid.uuid4()), "company": "Extreme Commerce", "position": "Lead Shopify Developer",
+        "duration": "2019 - 2021", "description": "High-converting Shopify store development",
+        "achievements": ["Built 100+ Shopify stores", "Trained 20+ junior developers"], "order": i,
+        "created_at": _stamp(i),
+    },
+    Skill: lambda i: {
+        "id": str(uuid.uuid4()), "name": f"Skill {i}", "level": 50 + i % 50, "category": "Business",
+        "created_at": _stamp(i),
+    },
+}
+
+
+def _docs(model, rows: int) -> List[dict]:
+    # Stored documents carry Mongo's _id, which the legacy path had to strip
+    return [{"_id": i, **SAMPLE_DOCS[model](i)} for i in range(rows)]
+
+
+def legacy_request(loop, model, field, docs: List[dict]) -> bytes:
+    items = [model(**doc) for doc in docs]
+    content = loop.run_until_complete(serialize_response(field=field, response_content=items))
+    return JSONResponse(content).body
+
+
+def fast_request(codec: ModelCodec, docs: List[dict]) -> bytes:
+    # Mongo applies the projection server-side; emulate it here
+    projected = [{k: v for k, v in doc.items() if k in codec.projection and k != "_id"} for doc in docs]
+    return dumps(codec.load_many(projected))
+
+
+def _cpu_per_call(fn, iterations: int) -> float:
+    start = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100, help="documents per list response")
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    print(f"{'model':<15}{'legacy µs/req':>15}{'fast µs/req':>15}{'speedup':>10}")
+    for model in SAMPLE_DOCS:
+        docs = _docs(model, args.rows)
+        field = create_response_field(name=f"Response_{model.__name__}", type_=List[model])
+        codec = ModelCodec(model)
+        legacy = _cpu_per_call(lambda: legacy_request(loop, model, field, docs), args.iterations)
+        fast = _cpu_per_call(lambda: fast_request(codec, docs), args.iterations)
+        print(f"{model.__name__:<15}{legacy * 1e6:>15.1f}{fast * 1e6:>15.1f}{legacy / fast:>9.1f}x")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
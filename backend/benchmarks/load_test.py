@@ -0,0 +1,420 @@
+"""Concurrent load test of the API, in-process against an offline Mongo stand-in.
+
+Boots the FastAPI app with its real lifespan (index migration, warm-up,
+contact queue, change feed) and drives it through an in-process ASGI
+transport, so runs need no network, server or database. The request mix is
+drawn up front from ``--seed``, which makes two runs of the same command
+issue the same requests in the same order.
+
+Workloads:
+    read     page loads: bundle, lists, details, categories, stats, search
+    contact  bursts of contact form submissions
+    admin    content and stats edits
+    mixed    mostly reads with a trickle of submissions and edits
+
+For each endpoint the report gives p50/p95/p99 latency, throughput and the
+peak bytes allocated while serving one request (measured separately,
+sequentially, under tracemalloc). Results can be saved as a baseline and
+later runs compared against it; a regression beyond the thresholds exits 1.
+
+Usage:
+    python benchmarks/load_test.py [--workload read] [--concurrency 20] [--requests 2000]
+    python benchmarks/load_test.py --workload mixed --save-baseline benchmarks/baselines/mixed.json
+    python benchmarks/load_test.py --workload mixed --compare benchmarks/baselines/mixed.json
+    python benchmarks/load_test.py --mongo-url mongodb://localhost:27017  # real server, scratch database
+    python benchmarks/load_test.py --storage sqlite  # the SQLite backend, in a temporary file
+
+The stand-in is mongomock-motor; latencies against it measure the app's own
+CPU cost, not MongoDB's. Compare baselines recorded on the same machine.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+LOADTEST_DB = "portfolio_loadtest"
+
+# (method, url, json body)
+Call = Tuple[str, str, Optional[dict]]
+
+
+class Fixture(NamedTuple):
+    """Ids of the seeded documents, for building detail and edit requests"""
+    ids: Dict[str, List[str]]
+    categories: List[str]
+
+
+class Operation(NamedTuple):
+    name: str  # report label: method and route template
+    weight: float
+    build: Callable[[random.Random, Fixture, int], Call]
+
+
+def _pick(collection: str) -> Callable[[random.Random, Fixture], str]:
+    return lambda rng, fixture: rng.choice(fixture.ids[collection])
+
+
+SEARCH_TERMS = ["shopify", "store", "growth", "ads", "conversion", "design", "brand", "commerce"]
+
+READ_OPS = [
+    Operation("GET /api/bundle", 5, lambda rng, fx, i: ("GET", "/api/bundle", None)),
+    Operation("GET /api/portfolio", 4, lambda rng, fx, i: ("GET", "/api/portfolio", None)),
+    Operation("GET /api/portfolio?category", 1,
+              lambda rng, fx, i: ("GET", f"/api/portfolio?category={rng.choice(fx.categories)}", None)),
+    Operation("GET /api/portfolio?limit", 1, lambda rng, fx, i: ("GET", "/api/portfolio?limit=10", None)),
+    Operation("GET /api/portfolio/categories", 1, lambda rng, fx, i: ("GET", "/api/portfolio/categories", None)),
+    Operation("GET /api/portfolio/{item_id}", 3,
+              lambda rng, fx, i: ("GET", f"/api/portfolio/{_pick('portfolio')(rng, fx)}", None)),
+    Operation("GET /api/services", 2, lambda rng, fx, i: ("GET", "/api/services", None)),
+    Operation("GET /api/testimonials", 2, lambda rng, fx, i: ("GET", "/api/testimonials?featured_only=true", None)),
+    Operation("GET /api/experience", 1, lambda rng, fx, i: ("GET", "/api/experience", None)),
+    Operation("GET /api/skills", 1, lambda rng, fx, i: ("GET", "/api/skills", None)),
+    Operation("GET /api/stats", 2, lambda rng, fx, i: ("GET", "/api/stats", None)),
+    Operation("GET /api/search", 1, lambda rng, fx, i: ("GET", f"/api/search?q={rng.choice(SEARCH_TERMS)}", None)),
+]
+
+CONTACT_OPS = [
+    Operation("POST /api/contact", 1, lambda rng, fx, i: ("POST", "/api/contact", {
+        "name": f"Load Test {i}",
+        "email": f"loadtest{i}@example.com",
+        "company": rng.choice(["Acme", "Globex", "Initech", None]),
+        "service": rng.choice(["Shopify Store Development", "Facebook Ads", None]),
+        "message": f"Benchmark submission number {i} asking about a new store build.",
+    })),
+]
+
+ADMIN_OPS = [
+    Operation("PUT /api/portfolio/{item_id}", 3, lambda rng, fx, i: (
+        "PUT", f"/api/portfolio/{_pick('portfolio')(rng, fx)}", _portfolio_body(rng, i))),
+    Operation("PUT /api/skills/{skill_id}", 2, lambda rng, fx, i: (
+        "PUT", f"/api/skills/{_pick('skills')(rng, fx)}",
+        {"name": f"Skill {i}", "level": rng.randint(40, 100), "category": "Business"})),
+    Operation("PUT /api/stats", 1, lambda rng, fx, i: ("PUT", "/api/stats", {
+        "total_sales": 1_000_000 + i, "clients_served": 200 + i % 50,
+        "years_experience": 8, "projects_completed": 300 + i % 70,
+    })),
+    Operation("POST /api/skills", 1, lambda rng, fx, i: (
+        "POST", "/api/skills", {"name": f"New skill {i}", "level": rng.randint(1, 100), "category": "Technical"})),
+]
+
+
+def _scaled(ops: List[Operation], factor: float) -> List[Operation]:
+    return [op._replace(weight=op.weight * factor) for op in ops]
+
+
+WORKLOADS: Dict[str, List[Operation]] = {
+    "read": READ_OPS,
+    "contact": CONTACT_OPS,
+    "admin": ADMIN_OPS,
+    # Read weights sum to 24: roughly 90% reads, 5% submissions, 5% edits
+    "mixed": READ_OPS + _scaled(CONTACT_OPS, 1.3) + _scaled(ADMIN_OPS, 0.2),
+}
+
+
+def _portfolio_body(rng: random.Random, i: int) -> dict:
+    return {
+        "title": f"Project revision {i}",
+        "category": rng.choice(["E-commerce", "Dropshipping", "Branding"]),
+        "description": "Scaled a Shopify store with paid social and conversion work",
+        "results": {"revenue": f"{rng.randint(100, 900)}% increase"},
+        "technologies": ["Shopify", "Facebook Ads", "Klaviyo"],
+        "is_featured": rng.random() < 0.5,
+    }
+
+
+async def seed(store, rng: random.Random, scale: int) -> Fixture:
+    """Insert a deterministic data set; ids are stable across runs with the same seed"""
+    from models import ContactForm, Experience, PortfolioItem, Service, Skill, Testimonial
+    from repository import WriteOp
+
+    base = datetime(2024, 1, 1)
+    categories = ["E-commerce", "Dropshipping", "Branding", "Marketing"]
+    words = SEARCH_TERMS + ["launch", "scaled", "revenue", "funnel", "email", "retention"]
+
+    def text(count: int) -> str:
+        return " ".join(rng.choice(words) for _ in range(count))
+
+    builders = {
+        "portfolio": (12 * scale, lambda i: PortfolioItem(
+            title=f"Project {i} {text(2)}", category=categories[i % len(categories)], description=text(25),
+            results={"revenue": f"{rng.randint(100, 900)}% increase"}, technologies=rng.sample(words, 3),
+            is_featured=i % 3 == 0)),
+        "testimonials": (8 * scale, lambda i: Testimonial(
+            name=f"Client {i}", position="Founder", company=f"Company {i}", testimonial=text(30),
+            rating=rng.randint(4, 5), is_featured=i % 2 == 0)),
+        "services": (6 * scale, lambda i: Service(
+            title=f"Service {i}", description=text(15), icon="🛍️", features=[text(3) for _ in range(4)],
+            price="Starting at $2,500")),
+        "experience": (5 * scale, lambda i: Experience(
+            company=f"Company {i}", position=f"Lead {text(1)} developer", duration="2019 - 2021",
+            description=text(15), achievements=[text(5) for _ in range(3)], order=i)),
+        "skills": (20 * scale, lambda i: Skill(
+            name=f"Skill {i}", level=rng.randint(40, 100), category=rng.choice(["Technical", "Business"]))),
+        "contacts": (200 * scale, lambda i: ContactForm(
+            name=f"Visitor {i}", email=f"visitor{i}@example.com", message=text(20),
+            status=rng.choice(["new", "read", "replied"]))),
+    }
+    ids: Dict[str, List[str]] = {}
+    for collection, (count, build) in builders.items():
+        docs = []
+        for i in range(count):
+            doc = build(i).dict()
+            doc["id"] = f"{collection}-{i:05d}"
+            doc["created_at"] = base + timedelta(hours=i)
+            docs.append(doc)
+        await store[collection].apply_writes([WriteOp("insert", doc["id"], doc) for doc in docs])
+        ids[collection] = [doc["id"] for doc in docs]
+    return Fixture(ids, categories)
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+async def drive(client, schedule: List[Tuple[Operation, Call]], concurrency: int,
+                duration: Optional[float]) -> Tuple[Dict[str, List[float]], Dict[str, int], float]:
+    """Run ``schedule`` with ``concurrency`` workers; returns latencies, errors and wall time"""
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    position = 0
+    started = time.perf_counter()
+    deadline = started + duration if duration else None
+
+    async def worker():
+        nonlocal position
+        while position < len(schedule) and (deadline is None or time.perf_counter() < deadline):
+            op, (method, url, body) = schedule[position]
+            position += 1
+            request_started = time.perf_counter()
+            try:
+                response = await client.request(method, url, json=body)
+                failed = response.status_code >= 400
+            except Exception:
+                failed = True
+            latencies[op.name].append(time.perf_counter() - request_started)
+            if failed:
+                errors[op.name] += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+async def measure_allocations(client, schedule: List[Tuple[Operation, Call]], samples: int) -> Dict[str, float]:
+    """Median peak bytes allocated while serving one request, per operation, run sequentially"""
+    by_op: Dict[str, List[Call]] = defaultdict(list)
+    for op, call in schedule:
+        if len(by_op[op.name]) < samples:
+            by_op[op.name].append(call)
+    allocations = {}
+    tracemalloc.start()
+    try:
+        for name, calls in by_op.items():
+            peaks = []
+            for method, url, body in calls:
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+                await client.request(method, url, json=body)
+                peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+            peaks.sort()
+            allocations[name] = peaks[len(peaks) // 2]
+    finally:
+        tracemalloc.stop()
+    return allocations
+
+
+def summarize(latencies: Dict[str, List[float]], errors: Dict[str, int], wall: float,
+              allocations: Dict[str, float]) -> Dict[str, Dict[str, Any]]:
+    endpoints = {}
+    everything = []
+    for name in sorted(latencies):
+        values = sorted(latencies[name])
+        everything.extend(values)
+        endpoints[name] = {
+            "requests": len(values),
+            "errors": errors.get(name, 0),
+            "rps": round(len(values) / wall, 1),
+            "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+            "p95_ms": round(percentile(values, 0.95) * 1000, 3),
+            "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+            "alloc_kib": round(allocations[name] / 1024, 1) if name in allocations else None,
+        }
+    everything.sort()
+    endpoints["TOTAL"] = {
+        "requests": len(everything),
+        "errors": sum(errors.values()),
+        "rps": round(len(everything) / wall, 1),
+        "p50_ms": round(percentile(everything, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(everything, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(everything, 0.99) * 1000, 3),
+        "alloc_kib": None,
+    }
+    return endpoints
+
+
+def print_report(result: Dict[str, Any]):
+    config = result["config"]
+    print(f"workload={config['workload']} concurrency={config['concurrency']} seed={config['seed']} "
+          f"scale={config['scale']} backend={config['backend']} wall={result['wall_seconds']:.2f}s")
+    print(f"{'endpoint':<36}{'reqs':>7}{'err':>5}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'alloc KiB':>11}")
+    for name, row in result["endpoints"].items():
+        alloc = f"{row['alloc_kib']:.1f}" if row["alloc_kib"] is not None else "-"
+        print(f"{name:<36}{row['requests']:>7}{row['errors']:>5}{row['rps']:>9.1f}"
+              f"{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}{row['p99_ms']:>9.2f}{alloc:>11}")
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], max_regression: float,
+            max_alloc_regression: float, noise_floor_ms: float) -> List[str]:
+    """Regressions of ``result`` against ``baseline``; small absolute changes are ignored as noise"""
+    if baseline["config"] != result["config"]:
+        print(f"warning: baseline was recorded with a different config: {baseline['config']}")
+    problems = []
+    for name, base in baseline["endpoints"].items():
+        current = result["endpoints"].get(name)
+        if current is None:
+            continue
+        for metric in ("p95_ms", "p99_ms"):
+            if current[metric] > base[metric] * (1 + max_regression) and current[metric] - base[metric] > noise_floor_ms:
+                problems.append(f"{name}: {metric} {base[metric]:.2f} -> {current[metric]:.2f}")
+        if base["alloc_kib"] and current["alloc_kib"] and current["alloc_kib"] > base["alloc_kib"] * (1 + max_alloc_regression):
+            problems.append(f"{name}: alloc_kib {base['alloc_kib']:.1f} -> {current['alloc_kib']:.1f}")
+        if current["errors"] > base["errors"]:
+            problems.append(f"{name}: errors {base['errors']} -> {current['errors']}")
+    base_rps, rps = baseline["endpoints"]["TOTAL"]["rps"], result["endpoints"]["TOTAL"]["rps"]
+    if rps < base_rps * (1 - max_regression):
+        problems.append(f"TOTAL: rps {base_rps:.1f} -> {rps:.1f}")
+    return problems
+
+
+def _configure_environment(args):
+    # Read before the app modules are imported, which is when their singletons are built
+    os.environ.setdefault("CONTACT_SPOOL_DIR", tempfile.mkdtemp(prefix="loadtest-spool-"))
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "true" if args.rate_limit else "false")
+    os.environ.setdefault("METRICS_ENABLED", "false")
+    os.environ["STORAGE_BACKEND"] = args.storage
+    if args.storage == "sqlite":
+        os.environ["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="loadtest-sqlite-"), "portfolio.db")
+    if args.mongo_url:
+        os.environ["MONGO_URL"] = args.mongo_url
+        os.environ["DB_NAME"] = args.db_name
+    else:
+        # mongomock-motor has no change streams
+        os.environ.setdefault("CHANGE_FEED_MODE", "poll")
+
+
+async def run(args) -> Dict[str, Any]:
+    _configure_environment(args)
+    import httpx
+    import server
+    from database import database
+    from storage import storage
+
+    if args.mongo_url:
+        from pymongo import MongoClient
+        # Only the dedicated scratch database is ever dropped
+        MongoClient(args.mongo_url).drop_database(args.db_name)
+        database.connect()
+    elif args.storage == "mongo":
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            sys.exit("The offline stand-in needs mongomock-motor (pip install mongomock-motor), or pass --mongo-url")
+        database.client = AsyncMongoMockClient()
+        database.db = database.client[args.db_name]
+
+    # connect() reuses the open client or store, so the lifespan below starts on the seeded data
+    rng = random.Random(args.seed)
+    fixture = await seed(storage.connect(), rng, args.scale)
+    async with server.app.router.lifespan_context(server.app):
+        while not server.cache_warmer.done:
+            await asyncio.sleep(0.01)
+
+        ops = WORKLOADS[args.workload]
+        chosen = rng.choices(ops, weights=[op.weight for op in ops], k=args.requests)
+        schedule = [(op, op.build(rng, fixture, i)) for i, op in enumerate(chosen)]
+
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest",
+                                     headers={"accept-encoding": "gzip"}) as client:
+            warmup = schedule[:args.warmup_requests]
+            if warmup:
+                await drive(client, warmup, args.concurrency, None)
+            latencies, errors, wall = await drive(client, schedule, args.concurrency, args.duration)
+            allocations = await measure_allocations(client, schedule, args.alloc_samples) if args.alloc_samples else {}
+
+    return {
+        "config": {
+            "workload": args.workload,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "duration": args.duration,
+            "seed": args.seed,
+            "scale": args.scale,
+            "backend": args.storage if args.storage != "mongo" else "mongodb" if args.mongo_url else "mongomock",
+        },
+        "recorded_at": datetime.utcnow().isoformat() + "Z",
+        "python": sys.version.split()[0],
+        "wall_seconds": round(wall, 3),
+        "endpoints": summarize(latencies, errors, wall, allocations),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workload", choices=list(WORKLOADS), default="read")
+    parser.add_argument("--concurrency", type=int, default=20, help="concurrent simulated clients")
+    parser.add_argument("--requests", type=int, default=2000, help="requests in the measured run")
+    parser.add_argument("--duration", type=float, default=None, help="stop the measured run after this many seconds")
+    parser.add_argument("--warmup-requests", type=int, default=200, help="unmeasured requests issued first")
+    parser.add_argument("--alloc-samples", type=int, default=20, help="sequential requests per endpoint under tracemalloc; 0 skips")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--scale", type=int, default=1, help="multiplier for the seeded data set size")
+    parser.add_argument("--rate-limit", action="store_true", help="keep contact rate limiting on")
+    parser.add_argument("--storage", choices=["mongo", "memory", "sqlite"], default="mongo",
+                        help="storage backend; sqlite uses a temporary file")
+    parser.add_argument("--mongo-url", help="run against this MongoDB instead of the in-memory stand-in")
+    parser.add_argument("--db-name", default=LOADTEST_DB, help="scratch database; dropped before seeding")
+    parser.add_argument("--json", type=Path, help="also write the results here")
+    parser.add_argument("--save-baseline", type=Path, help="write the results as a baseline")
+    parser.add_argument("--compare", type=Path, help="baseline to check the results against")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="allowed p95/p99 and throughput change")
+    parser.add_argument("--max-alloc-regression", type=float, default=0.10, help="allowed allocation growth")
+    parser.add_argument("--noise-floor-ms", type=float, default=0.5, help="latency changes below this never fail")
+    args = parser.parse_args()
+    if args.mongo_url and args.storage != "mongo":
+        parser.error("--mongo-url needs --storage mongo")
+
+    result = asyncio.run(run(args))
+    print_report(result)
+    for path in (args.json, args.save_baseline):
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(result, indent=2) + "\n")
+            print(f"wrote {path}")
+    if args.compare is not None:
+        problems = compare(result, json.loads(args.compare.read_text()), args.max_regression,
+                           args.max_alloc_regression, args.noise_floor_ms)
+        if problems:
+            print("Regressions against", args.compare)
+            for problem in problems:
+                print("  " + problem)
+            sys.exit(1)
+        print(f"No regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
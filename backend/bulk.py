@@ -0,0 +1,88 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+from models import BulkItemResult, BulkRequest, BulkResponse
+from http_cache import mark_changed
+from repository import Repository, WriteOp
+from search import search_index
+from versioning import INITIAL_VERSION
+
+
+async def apply_bulk(collection: Repository, payload: BulkRequest, model: Type[BaseModel]) -> BulkResponse:
+    """Apply a batch of creates, updates and deletes as one unordered batch write.
+
+    Updates and deletes for ids that don't exist are reported per item instead
+    of being sent; write errors from the backend are mapped back to their item.
+    The read cache is invalidated once for the whole batch.
+    """
+    results: List[BulkItemResult] = []
+    ops = []
+    op_results: List[BulkItemResult] = []
+    # Created and updated documents by (op, index), for the search index
+    written: Dict[Tuple[str, int], dict] = {}
+
+    def queue(op, result: BulkItemResult, doc: Optional[dict] = None):
+        ops.append(op)
+        op_results.append(result)
+        if doc is not None:
+            written[(result.op, result.index)] = doc
+
+    for index, data in enumerate(payload.create):
+        obj = model(**data.dict())
+        result = BulkItemResult(op="create", index=index, id=obj.id)
+        results.append(result)
+        doc = obj.dict()
+        queue(WriteOp("insert", obj.id, doc), result, doc)
+
+    ids = {item.id for item in payload.update} | set(payload.delete)
+    existing: Dict[str, int] = {}
+    if ids:
+        async for doc in collection.iterate({"id": {"$in": list(ids)}}, projection={"id": 1, "version": 1}):
+            existing[doc["id"]] = doc.get("version", INITIAL_VERSION)
+
+    now = datetime.utcnow()
+    for index, item in enumerate(payload.update):
+        result = BulkItemResult(op="update", index=index, id=item.id)
+        results.append(result)
+        if item.id not in existing:
+            result.success, result.error = False, "Not found"
+            continue
+        if item.version is not None and existing[item.id] != item.version:
+            result.success, result.error = False, "Version conflict"
+            continue
+        update_dict = item.data.dict()
+        update_dict["updated_at"] = now
+        # The expected version still guards the write itself against a concurrent editor
+        queue(WriteOp("update", item.id, update_dict, item.version), result, {"id": item.id, **update_dict})
+
+    for index, item_id in enumerate(payload.delete):
+        result = BulkItemResult(op="delete", index=index, id=item_id)
+        results.append(result)
+        if item_id not in existing:
+            result.success, result.error = False, "Not found"
+            continue
+        queue(WriteOp("delete", item_id), result)
+
+    if ops:
+        for failed, error in zip(op_results, await collection.apply_writes(ops)):
+            if error is not None:
+                failed.success, failed.error = False, error
+
+    succeeded = [result for result in results if result.success]
+    if succeeded:
+        mark_changed(collection.name, *{result.id for result in succeeded if result.op != "create"})
+        for result in succeeded:
+            if result.op == "delete":
+                search_index.remove(collection.name, result.id)
+            else:
+                search_index.index_document(collection.name, written[(result.op, result.index)])
+
+    return BulkResponse(
+        created=sum(1 for result in succeeded if result.op == "create"),
+        updated=sum(1 for result in succeeded if result.op == "update"),
+        deleted=sum(1 for result in succeeded if result.op == "delete"),
+        failed=len(results) - len(succeeded),
+        results=results
+    )
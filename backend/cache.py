@@ -0,0 +1,183 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+# Cache keys are (namespace, route, *params); the namespace is the collection name
+CacheKey = Tuple[Hashable, ...]
+
+# Rough per-entry bookkeeping cost on top of the cached body
+ENTRY_OVERHEAD_BYTES = 256
+
+
+class CacheEntry:
+    __slots__ = ("value", "size", "expires_at")
+
+    def __init__(self, value: Any, size: int, expires_at: float):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """In-process TTL + LRU cache bounded by entry count and total bytes.
+
+    Entries are grouped by namespace so writes can drop the list views of a
+    collection together with the single detail entry they touched.
+    """
+
+    def __init__(self, ttl_seconds: float = 60.0, max_entries: int = 512,
+                 max_bytes: int = 16 * 1024 * 1024, enabled: bool = True):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._entries: "OrderedDict[CacheKey, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._generations: Dict[Hashable, int] = {}
+        self._inflight: Dict[CacheKey, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        return cls(
+            ttl_seconds=float(os.environ.get("CACHE_TTL_SECONDS", 60)),
+            max_entries=int(os.environ.get("CACHE_MAX_ENTRIES", 512)),
+            max_bytes=int(os.environ.get("CACHE_MAX_BYTES", 16 * 1024 * 1024)),
+            enabled=os.environ.get("CACHE_ENABLED", "true").lower() == "true",
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: CacheKey) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.value
+
+    def set(self, key: CacheKey, value: Any, size: int):
+        if not self.enabled:
+            return
+        size += ENTRY_OVERHEAD_BYTES
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = CacheEntry(value, size, time.monotonic() + self.ttl_seconds)
+        self._bytes += size
+        self._evict()
+
+    def grow(self, key: CacheKey, size: int):
+        """Account for ``size`` more bytes attached to an existing entry"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        entry.size += size
+        self._bytes += size
+        self._evict()
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: CacheKey):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    async def get_or_load(self, key: CacheKey, loader: Callable[[], Awaitable[Tuple[Any, int]]]) -> Any:
+        """Read-through lookup; concurrent misses for the same key share one load.
+
+        ``loader`` returns ``(value, size_in_bytes)``.
+        """
+        value = self.get(key) if self.enabled else None
+        if value is not None:
+            return value
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        namespace = key[0]
+        generation = self._generations.get(namespace, 0)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value, size = await loader()
+        except BaseException as e:
+            if isinstance(e, Exception):
+                future.set_exception(e)
+                # Waiters re-raise it; mark retrieved so an unawaited future doesn't warn
+                future.exception()
+            else:
+                future.cancel()
+            raise
+        else:
+            future.set_result(value)
+            # A write that landed while we were loading makes this value stale
+            if self._generations.get(namespace, 0) == generation:
+                self.set(key, value, size)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def invalidate(self, namespace: Hashable, *item_ids: str):
+        """Drop a namespace's list views, plus the detail entries for ``item_ids``.
+
+        Detail entries for other ids are untouched. Pass no ids after an
+        insert, where no existing detail entry can be stale.
+        """
+        self._generations[namespace] = self._generations.get(namespace, 0) + 1
+        for key in [k for k in self._entries if k[0] == namespace]:
+            if key[1] != "detail" or key[2] in item_ids:
+                self._remove(key)
+        self.invalidations += 1
+
+    def invalidate_all(self, namespace: Hashable):
+        """Drop every entry of a namespace, detail entries included"""
+        self._generations[namespace] = self._generations.get(namespace, 0) + 1
+        for key in [k for k in self._entries if k[0] == namespace]:
+            self._remove(key)
+        self.invalidations += 1
+
+    def clear(self):
+        for namespace in {key[0] for key in self._entries}:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+read_cache = ResponseCache.from_env()
+
@@ -0,0 +1,268 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Sequence, Set, Tuple
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from http_cache import mark_changed, mark_stale
+from search import search_index
+from snapshot import snapshot_server
+from stats_store import stats_store
+from storage import Storage
+
+logger = logging.getLogger(__name__)
+
+# Collections whose documents back the read cache, search index or stats store
+WATCHED_COLLECTIONS = ("portfolio", "services", "testimonials", "experience", "skills", "stats")
+
+# Server error codes: change streams need a replica set; the resume token fell off the oplog
+STREAMS_UNSUPPORTED = 40573
+HISTORY_LOST = (280, 286)
+
+# Longest pause between reconnect attempts while Mongo is unavailable
+MAX_RETRY_DELAY_SECONDS = 30.0
+
+# Operations that end the stream or leave documents we can't name
+_COLLECTION_EVENTS = frozenset({"drop", "rename", "dropDatabase", "invalidate"})
+
+
+class ChangeStreamsUnsupported(Exception):
+    """The server can't open change streams (standalone mongod or a test double)"""
+
+
+class ChangeFeed:
+    """Keeps this process's caches in step with writes made anywhere.
+
+    Tails a database change stream over ``collections`` and, per event,
+    invalidates the cached responses of the written document, updates the
+    search index and drops the in-memory stats. The last resume token is
+    kept so a dropped connection resumes without missing events. When
+    change streams aren't available the feed polls a cheap per-collection
+    fingerprint instead and invalidates whole collections when it moves.
+
+    Writes made through this process's routes are seen twice (once by the
+    route, once here); the second invalidation only costs a cache refill.
+    """
+
+    def __init__(self, collections: Sequence[str] = WATCHED_COLLECTIONS, mode: str = "auto",
+                 poll_interval: float = 2.0, reload_delay: float = 0.05, enabled: bool = True):
+        if mode not in ("auto", "stream", "poll"):
+            raise ValueError(f"Unknown change feed mode: {mode}")
+        self.collections = tuple(collections)
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.reload_delay = reload_delay
+        self.enabled = enabled
+        self.active_mode: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._reload_task: Optional[asyncio.Task] = None
+        self._stale_search: Set[str] = set()
+        self._resume_token: Optional[Dict[str, Any]] = None
+        self.events = 0
+        self.reconnects = 0
+        self.resyncs = 0
+        self.last_event_at: Optional[float] = None
+        self.last_lag_ms: Optional[float] = None
+
+    @classmethod
+    def from_env(cls) -> "ChangeFeed":
+        collections = os.environ.get("CHANGE_FEED_COLLECTIONS")
+        return cls(
+            collections=[name.strip() for name in collections.split(",") if name.strip()]
+            if collections else WATCHED_COLLECTIONS,
+            mode=os.environ.get("CHANGE_FEED_MODE", "auto").lower(),
+            poll_interval=float(os.environ.get("CHANGE_FEED_POLL_SECONDS", 2)),
+            reload_delay=int(os.environ.get("CHANGE_FEED_RELOAD_DELAY_MS", 50)) / 1000,
+            enabled=os.environ.get("CHANGE_FEED_ENABLED", "true").lower() == "true",
+        )
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, store: Storage):
+        if self.enabled and store.mongo is None:
+            logger.info("Change feed needs MongoDB; disabled on %s storage", store.backend)
+            self.enabled = False
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run(store))
+
+    async def stop(self):
+        for task in (self._task, self._reload_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = self._reload_task = None
+        self.active_mode = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "running": self.running,
+            "mode": self.active_mode,
+            "collections": list(self.collections),
+            "events": self.events,
+            "reconnects": self.reconnects,
+            "resyncs": self.resyncs,
+            "last_event_age_seconds": round(time.monotonic() - self.last_event_at, 3) if self.last_event_at else None,
+            "last_lag_ms": self.last_lag_ms,
+        }
+
+    async def check(self) -> Dict[str, Any]:
+        """Readiness check: reports the feed mode; fails if the feed task died"""
+        if self.enabled and not self.running:
+            raise RuntimeError("Change feed is not running")
+        return {"mode": self.active_mode, "events": self.events}
+
+    async def _run(self, store: Storage):
+        try:
+            await self._follow(store)
+        except Exception:
+            logger.exception("Change feed stopped; caches now rely on TTL expiry")
+            raise
+
+    async def _follow(self, store: Storage):
+        if self.mode != "poll":
+            try:
+                await self._stream(store)
+                return
+            except ChangeStreamsUnsupported as e:
+                if self.mode == "stream":
+                    logger.error("Change streams unavailable and CHANGE_FEED_MODE=stream: %s", e)
+                    return
+                logger.info("Change streams unavailable (%s); polling every %.1fs", e, self.poll_interval)
+        await self._poll(store)
+
+    async def _stream(self, store: Storage):
+        pipeline = [{"$match": {"ns.coll": {"$in": list(self.collections)}}}]
+        retry_delay = 0.5
+        while True:
+            try:
+                async with store.mongo.watch(pipeline, full_document="updateLookup", resume_after=self._resume_token) as stream:
+                    if self.active_mode is None:
+                        logger.info("Watching change stream on %s", ", ".join(self.collections))
+                    self.active_mode = "stream"
+                    retry_delay = 0.5
+                    async for change in stream:
+                        self._resume_token = stream.resume_token
+                        self._apply(store, change)
+                        if change["operationType"] == "invalidate":
+                            # The token of an invalidate event can't be resumed after
+                            self._resume_token = None
+                            break
+            except NotImplementedError as e:
+                raise ChangeStreamsUnsupported(str(e) or "not implemented by the client")
+            except OperationFailure as e:
+                if e.code == STREAMS_UNSUPPORTED:
+                    raise ChangeStreamsUnsupported(str(e))
+                if e.code in HISTORY_LOST:
+                    # Events were missed; nothing cached before now can be trusted
+                    logger.warning("Change stream history lost, resynchronising: %s", e)
+                    self._resume_token = None
+                    self._resync(store)
+                    continue
+                await self._backoff(e, retry_delay)
+                retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY_SECONDS)
+            except PyMongoError as e:
+                await self._backoff(e, retry_delay)
+                retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY_SECONDS)
+
+    async def _backoff(self, error: Exception, delay: float):
+        self.reconnects += 1
+        logger.warning("Change stream interrupted, resuming in %.1fs: %s", delay, error)
+        await asyncio.sleep(delay)
+
+    def _apply(self, store: Storage, change: Dict[str, Any]):
+        operation = change["operationType"]
+        collection = change.get("ns", {}).get("coll")
+        self.events += 1
+        self.last_event_at = time.monotonic()
+        cluster_time = change.get("clusterTime")
+        if cluster_time is not None:
+            self.last_lag_ms = max(0.0, round((time.time() - cluster_time.time) * 1000, 1))
+
+        if operation in _COLLECTION_EVENTS:
+            for name in ([collection] if collection in self.collections else self.collections):
+                self._collection_changed(store, name)
+            return
+        if collection == "stats":
+            stats_store.invalidate()
+        doc = change.get("fullDocument")
+        item_id = doc.get("id") if doc else None
+        if operation == "delete" or item_id is None:
+            # Deletes only carry the _id, so the app-level id is unknown
+            self._collection_changed(store, collection)
+            return
+        mark_changed(collection, item_id)
+        search_index.index_document(collection, doc)
+
+    def _collection_changed(self, store: Storage, collection: str):
+        if collection == "stats":
+            stats_store.invalidate()
+        mark_stale(collection)
+        if collection in search_index.sources:
+            self._stale_search.add(collection)
+            if self._reload_task is None or self._reload_task.done():
+                self._reload_task = asyncio.create_task(self._reload_search(store))
+
+    async def _reload_search(self, store: Storage):
+        # Bulk writes (e.g. the seed script) arrive as bursts; reload each collection once per burst
+        await asyncio.sleep(self.reload_delay)
+        while self._stale_search:
+            collection = self._stale_search.pop()
+            try:
+                await search_index.reload(store, collection)
+            except PyMongoError as e:
+                logger.warning("Search reload for %s failed: %s", collection, e)
+
+    def _resync(self, store: Storage):
+        self.resyncs += 1
+        for collection in self.collections:
+            self._collection_changed(store, collection)
+
+    async def _fingerprint(self, store: Storage, collection: str) -> Tuple[Any, ...]:
+        pipeline = [{"$group": {
+            "_id": None,
+            "count": {"$sum": 1},
+            "created": {"$max": "$created_at"},
+            "updated": {"$max": "$updated_at"},
+            "versions": {"$sum": {"$ifNull": ["$version", 1]}},
+        }}]
+        rows = await store.mongo[collection].aggregate(pipeline).to_list(1)
+        if not rows:
+            return (0,)
+        row = rows[0]
+        return row["count"], row["created"], row["updated"], row["versions"]
+
+    async def _poll(self, store: Storage):
+        """Fallback for servers without change streams; the watched collections are small"""
+        self.active_mode = "poll"
+        fingerprints: Dict[str, Tuple[Any, ...]] = {}
+        while True:
+            for collection in self.collections:
+                try:
+                    fingerprint = await self._fingerprint(store, collection)
+                except PyMongoError as e:
+                    logger.warning("Change poll of %s failed: %s", collection, e)
+                    continue
+                previous = fingerprints.get(collection)
+                fingerprints[collection] = fingerprint
+                if previous is not None and previous != fingerprint:
+                    self.events += 1
+                    self.last_event_at = time.monotonic()
+                    self._collection_changed(store, collection)
+            if snapshot_server.enabled:
+                # Rechecks the snapshot's fingerprints once they are due, so a re-export is picked up again
+                try:
+                    await snapshot_server.verify()
+                except PyMongoError as e:
+                    logger.warning("Snapshot fingerprint check failed: %s", e)
+            await asyncio.sleep(self.poll_interval)
+
+
+change_feed = ChangeFeed.from_env()
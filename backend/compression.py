@@ -0,0 +1,238 @@
+import os
+import time
+import zlib
+from typing import Callable, Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+COMPRESSION_ENABLED = os.environ.get("COMPRESSION_ENABLED", "true").lower() == "true"
+# Bodies smaller than this cost more to compress than they save on the wire
+MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_BYTES", 1024))
+GZIP_LEVEL = int(os.environ.get("COMPRESSION_GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.environ.get("COMPRESSION_BROTLI_QUALITY", 5))
+ZSTD_LEVEL = int(os.environ.get("COMPRESSION_ZSTD_LEVEL", 3))
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+class StreamCompressor:
+    """Incremental compressor with a common interface across codecs"""
+
+    def __init__(self, compress: Callable[[bytes], bytes], flush: Callable[[], bytes]):
+        self.compress = compress
+        self.flush = flush
+
+
+def _gzip_stream() -> StreamCompressor:
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return StreamCompressor(compressor.compress, compressor.flush)
+
+
+def _brotli_stream() -> StreamCompressor:
+    compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+    return StreamCompressor(compressor.process, compressor.finish)
+
+
+def _zstd_stream() -> StreamCompressor:
+    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    return StreamCompressor(compressor.compress, compressor.flush)
+
+
+# Server preference when the client accepts several encodings equally
+ENCODERS: Dict[str, Callable[[], StreamCompressor]] = {}
+if brotli is not None:
+    ENCODERS["br"] = _brotli_stream
+if zstandard is not None:
+    ENCODERS["zstd"] = _zstd_stream
+ENCODERS["gzip"] = _gzip_stream
+
+
+class CompressionStats:
+    """Bytes in/out and time spent compressing, per encoding"""
+
+    def __init__(self):
+        self._encodings: Dict[str, Dict[str, float]] = {}
+        self.skipped_small = 0
+
+    def record(self, encoding: str, size_in: int, size_out: int, seconds: float, precompressed: bool = False):
+        counters = self._encodings.setdefault(
+            encoding, {"responses": 0, "precompressed": 0, "bytes_in": 0, "bytes_out": 0, "cpu_seconds": 0.0}
+        )
+        counters["responses" if not precompressed else "precompressed"] += 1
+        counters["bytes_in"] += size_in
+        counters["bytes_out"] += size_out
+        counters["cpu_seconds"] += seconds
+
+    def snapshot(self) -> dict:
+        encodings = {}
+        for encoding, counters in self._encodings.items():
+            encodings[encoding] = {
+                **counters,
+                "cpu_seconds": round(counters["cpu_seconds"], 6),
+                "ratio": round(counters["bytes_in"] / counters["bytes_out"], 3) if counters["bytes_out"] else None,
+            }
+        return {
+            "enabled": COMPRESSION_ENABLED,
+            "available": list(ENCODERS),
+            "min_size": MIN_SIZE,
+            "skipped_small": self.skipped_small,
+            "encodings": encodings,
+        }
+
+
+compression_stats = CompressionStats()
+
+
+def _parse_accept_encoding(header: str) -> Dict[str, float]:
+    accepted = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name] = quality
+    return accepted
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the best available encoding the client accepts, or None for identity"""
+    if not COMPRESSION_ENABLED or not accept_encoding:
+        return None
+    accepted = _parse_accept_encoding(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in ENCODERS:
+        quality = accepted.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str, precompressed: bool = False) -> bytes:
+    started = time.perf_counter()
+    stream = ENCODERS[encoding]()
+    compressed = stream.compress(body) + stream.flush()
+    compression_stats.record(encoding, len(body), len(compressed), time.perf_counter() - started, precompressed)
+    return compressed
+
+
+def encoding_etag(etag: str, encoding: Optional[str]) -> str:
+    """Strong ETags must differ per content-coding, so append the coding"""
+    if encoding is None:
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def strip_encoding(etag: str) -> str:
+    for encoding in ENCODERS:
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+
+def _compressible(headers: Headers) -> bool:
+    content_type = headers.get("content-type", "")
+    return "content-encoding" not in headers and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """Compress responses that weren't compressed upstream.
+
+    Single-body responses below MIN_SIZE go out as they are; streamed
+    responses are compressed chunk by chunk. Responses rendered by
+    ``cached_json_response`` arrive with Content-Encoding already set and
+    pass straight through.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        stream: Optional[StreamCompressor] = None
+        totals: List[float] = [0, 0, 0.0]  # bytes in, bytes out, seconds
+
+        async def send_compressed(message: Message):
+            nonlocal start, stream
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                # e.g. http.response.pathsend: the file goes out as-is
+                if start is not None:
+                    await send(start)
+                    start = None
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                headers = MutableHeaders(raw=start["headers"])
+                if not _compressible(headers) or (not more_body and len(body) < MIN_SIZE):
+                    if not more_body and _compressible(headers):
+                        compression_stats.skipped_small += 1
+                    await send(start)
+                    start = None
+                    await send(message)
+                    return
+                if not more_body:
+                    compressed = compress(body, encoding)
+                    headers["Content-Encoding"] = encoding
+                    headers["Content-Length"] = str(len(compressed))
+                    headers.add_vary_header("Accept-Encoding")
+                    if "etag" in headers:
+                        headers["ETag"] = encoding_etag(headers["etag"], encoding)
+                    await send(start)
+                    start = None
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                stream = ENCODERS[encoding]()
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                del headers["Content-Length"]
+                await send(start)
+                start = None
+
+            if stream is None:
+                await send(message)
+                return
+            started = time.perf_counter()
+            chunk = stream.compress(body)
+            if not more_body:
+                chunk += stream.flush()
+            totals[0] += len(body)
+            totals[1] += len(chunk)
+            totals[2] += time.perf_counter() - started
+            if not more_body:
+                compression_stats.record(encoding, int(totals[0]), int(totals[1]), totals[2])
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,223 @@
+import os
+import asyncio
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import UpdateOne
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+logger = logging.getLogger(__name__)
+
+# Dimensions counted per contact, besides the overall total
+DIMENSIONS = ("status", "service", "company")
+INTERVALS = {"day": "%Y-%m-%d", "week": "%G-W%V"}
+
+# Histogram key for contacts that left an optional field empty
+UNSPECIFIED = "unspecified"
+
+ROLLUP_COLLECTION = "contacts_rollup"
+EPOCH = datetime(1970, 1, 1)
+
+
+def day_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, moment.day)
+
+
+def bucket_label(day: datetime, interval: str) -> str:
+    return day.strftime(INTERVALS[interval])
+
+
+def _label(value: Any) -> str:
+    return UNSPECIFIED if value in (None, "") else str(value)
+
+
+def _top(counts: Dict[str, int], top: int) -> Dict[str, int]:
+    """Keep the ``top`` largest counts and fold the rest into "other" """
+    ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    kept = dict(ranked[:top])
+    rest = sum(count for _, count in ranked[top:])
+    if rest:
+        kept["other"] = kept.get("other", 0) + rest
+    return kept
+
+
+def _created_match(since: Optional[datetime], until: Optional[datetime]) -> dict:
+    # Always bound created_at so the pipelines scan the covering index
+    created_at = {"$gte": since or EPOCH}
+    if until is not None:
+        created_at["$lt"] = until
+    return {"$match": {"created_at": created_at}}
+
+
+async def live_analytics(db: AsyncIOMotorDatabase, since: Optional[datetime], until: Optional[datetime],
+                         interval: str = "day", top: int = 20, tz: str = "UTC") -> Dict[str, Any]:
+    """Run one aggregation per histogram concurrently.
+
+    Each pipeline only touches created_at and the grouped field, so the
+    ``created_at_1_status_1_service_1_company_1`` index covers them.
+    """
+    match = _created_match(since, until)
+
+    async def count_by(field: str) -> Dict[str, int]:
+        pipeline = [match, {"$group": {"_id": f"${field}", "count": {"$sum": 1}}}]
+        return {_label(row["_id"]): row["count"] async for row in db.contacts.aggregate(pipeline)}
+
+    async def timeline() -> List[Dict[str, Any]]:
+        pipeline = [
+            match,
+            {"$group": {
+                "_id": {"$dateToString": {"format": INTERVALS[interval], "date": "$created_at", "timezone": tz}},
+                "count": {"$sum": 1},
+            }},
+            {"$sort": {"_id": 1}},
+        ]
+        return [{"bucket": row["_id"], "count": row["count"]} async for row in db.contacts.aggregate(pipeline)]
+
+    by_status, by_service, by_company, buckets = await asyncio.gather(
+        count_by("status"), count_by("service"), count_by("company"), timeline()
+    )
+    return {
+        "source": "live",
+        "total": sum(by_status.values()),
+        "by_status": by_status,
+        "by_service": _top(by_service, top),
+        "by_company": _top(by_company, top),
+        "timeline": buckets,
+    }
+
+
+class ContactRollups:
+    """Daily counts per dimension value, kept current as contacts change.
+
+    Each rollup document is ``{day, dim, value, count}``; ``dim`` is one of
+    DIMENSIONS or "total". Writers ``$inc`` the affected rows, so reads only
+    sum a few documents per day instead of scanning contacts.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+
+    @classmethod
+    def from_env(cls) -> "ContactRollups":
+        return cls(enabled=os.environ.get("CONTACT_ROLLUPS_ENABLED", "false").lower() == "true")
+
+    @staticmethod
+    def _rows(contact: Dict[str, Any]) -> Iterable[Tuple[datetime, str, Optional[str]]]:
+        day = day_start(contact["created_at"])
+        yield day, "total", None
+        for dim in DIMENSIONS:
+            yield day, dim, _label(contact.get(dim))
+
+    async def _apply(self, db: AsyncIOMotorDatabase, deltas: Counter):
+        ops = [
+            UpdateOne({"day": day, "dim": dim, "value": value}, {"$inc": {"count": delta}}, upsert=True)
+            for (day, dim, value), delta in deltas.items() if delta
+        ]
+        if ops:
+            await db[ROLLUP_COLLECTION].bulk_write(ops, ordered=False)
+
+    def inserted_deltas(self, contacts: Iterable[Dict[str, Any]]) -> Counter:
+        return Counter(row for contact in contacts for row in self._rows(contact))
+
+    async def record_inserted(self, db: AsyncIOMotorDatabase, contacts: List[Dict[str, Any]]):
+        if not self.enabled:
+            return
+        await self._apply(db, self.inserted_deltas(contacts))
+
+    async def record_deltas(self, db: AsyncIOMotorDatabase, deltas: Counter):
+        """Apply increments summed over many writes, e.g. a bulk load, in one pass"""
+        if not self.enabled:
+            return
+        await self._apply(db, deltas)
+
+    async def record_deleted(self, db: AsyncIOMotorDatabase, contact: Dict[str, Any]):
+        if not self.enabled:
+            return
+        await self._apply(db, Counter({row: -1 for row in self._rows(contact)}))
+
+    async def record_status_change(self, db: AsyncIOMotorDatabase, before: Dict[str, Any], status: str):
+        if not self.enabled or before.get("status") == status:
+            return
+        day = day_start(before["created_at"])
+        await self._apply(db, Counter({
+            (day, "status", _label(before.get("status"))): -1,
+            (day, "status", status): 1,
+        }))
+
+    async def rebuild(self, db: AsyncIOMotorDatabase):
+        """Recompute every rollup from the contacts collection.
+
+        Increments that land between the delete and the rewrite are lost, so
+        run this while contact writes are quiet.
+        """
+        pipeline = [
+            _created_match(None, None),
+            {"$group": {
+                "_id": {
+                    "day": {"$dateFromParts": {
+                        "year": {"$year": "$created_at"},
+                        "month": {"$month": "$created_at"},
+                        "day": {"$dayOfMonth": "$created_at"},
+                    }},
+                    **{dim: f"${dim}" for dim in DIMENSIONS},
+                },
+                "count": {"$sum": 1},
+            }},
+        ]
+        deltas: Counter = Counter()
+        async for row in db.contacts.aggregate(pipeline):
+            group = row["_id"]
+            deltas[(group["day"], "total", None)] += row["count"]
+            for dim in DIMENSIONS:
+                deltas[(group["day"], dim, _label(group.get(dim)))] += row["count"]
+        await db[ROLLUP_COLLECTION].delete_many({})
+        await self._apply(db, deltas)
+        logger.info("Rebuilt contact rollups: %d rows", len(deltas))
+
+    async def analytics(self, db: AsyncIOMotorDatabase, since: Optional[datetime], until: Optional[datetime],
+                        interval: str = "day", top: int = 20) -> Dict[str, Any]:
+        """Histograms from the rollups; days are UTC and ``since``/``until`` round down to whole days"""
+        day_filter: Dict[str, datetime] = {"$gte": day_start(since) if since else EPOCH}
+        if until is not None:
+            day_filter["$lt"] = day_start(until)
+        counts: Dict[str, Counter] = defaultdict(Counter)
+        timeline: Counter = Counter()
+        async for row in db[ROLLUP_COLLECTION].find({"day": day_filter, "count": {"$ne": 0}}, {"_id": 0}):
+            if row["dim"] == "total":
+                timeline[bucket_label(row["day"], interval)] += row["count"]
+            else:
+                counts[row["dim"]][row["value"]] += row["count"]
+        return {
+            "source": "rollup",
+            "total": sum(timeline.values()),
+            "by_status": dict(counts["status"]),
+            "by_service": _top(counts["service"], top),
+            "by_company": _top(counts["company"], top),
+            "timeline": [{"bucket": bucket, "count": count} for bucket, count in sorted(timeline.items())],
+        }
+
+
+contact_rollups = ContactRollups.from_env()
+
+
+if __name__ == "__main__":
+    import argparse
+    from pathlib import Path
+    from dotenv import load_dotenv
+
+    load_dotenv(Path(__file__).parent / '.env')
+    parser = argparse.ArgumentParser(description="Maintain contact analytics rollups")
+    parser.add_argument("command", choices=["rebuild"])
+    args = parser.parse_args()
+
+    async def main():
+        from database import database
+        db = database.connect()
+        try:
+            await ContactRollups(enabled=True).rebuild(db)
+        finally:
+            database.close()
+
+    asyncio.run(main())
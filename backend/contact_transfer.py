@@ -0,0 +1,320 @@
+"""Streaming contact export (CSV, NDJSON, Parquet) and bulk import.
+
+Exports read the repository cursor in chunks and yield each chunk as soon
+as it is encoded, so memory stays flat however many contacts match. Parquet
+writes one row group per chunk, building columns with pyarrow; it needs the
+optional ``pyarrow`` package.
+
+Imports parse the request body as it arrives (CSV or NDJSON; Parquet is
+spooled to a temporary file first, since its footer comes last), validate
+every row against ``ContactFormCreate`` and insert valid rows in unordered
+batches.
+"""
+import io
+import csv
+import asyncio
+import tempfile
+import codecs
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import orjson
+from pydantic import ValidationError
+
+from models import ContactForm, ContactFormCreate, ContactImportResult, ImportRowError
+from repository import Repository, WriteOp
+from serialization import ModelCodec, dumps
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - optional dependency
+    pyarrow = None
+
+PARQUET_AVAILABLE = pyarrow is not None
+
+CONTACT_STATUSES = ["new", "read", "replied"]
+
+EXPORT_CHUNK_SIZE = 1000
+PARQUET_ROW_GROUP_SIZE = 10000
+IMPORT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Exported alongside the ContactFormCreate fields and kept on import, so an export re-imports as-is
+PRESERVED_FIELDS = ("id", "created_at", "status")
+
+# Spreadsheet apps evaluate cells starting with these; contact fields are visitor input
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+# A leading apostrophe is escaped too, so import can always strip exactly one
+ESCAPED_PREFIXES = FORMULA_PREFIXES + ("'",)
+
+
+def export_query(status: Optional[str], since: Optional[datetime], until: Optional[datetime]) -> Dict[str, Any]:
+    query: Dict[str, Any] = {}
+    if status is not None:
+        query["status"] = status
+    created: Dict[str, datetime] = {}
+    if since is not None:
+        created["$gte"] = since
+    if until is not None:
+        created["$lt"] = until
+    if created:
+        query["created_at"] = created
+    return query
+
+
+async def _chunks(collection: Repository, query: dict, sort, codec: ModelCodec,
+                  size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+    chunk = []
+    async for doc in collection.iterate(query, sort, projection=codec.projection, batch_size=EXPORT_CHUNK_SIZE):
+        chunk.append(codec.load(doc))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _csv_cell(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(ESCAPED_PREFIXES):
+        return "'" + value
+    return value
+
+
+async def csv_rows(collection: Repository, query: dict, sort, codec: ModelCodec) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(codec.fields)
+    async for chunk in _chunks(collection, query, sort, codec, EXPORT_CHUNK_SIZE):
+        writer.writerows([_csv_cell(row[name]) for name in codec.fields] for row in chunk)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Header only: nothing matched
+        yield buffer.getvalue().encode()
+
+
+async def ndjson_rows(collection: Repository, query: dict, sort, codec: ModelCodec) -> AsyncIterator[bytes]:
+    async for chunk in _chunks(collection, query, sort, codec, EXPORT_CHUNK_SIZE):
+        yield b"".join(dumps(row) + b"\n" for row in chunk)
+
+
+class _ChunkSink:
+    """Write-only file for ParquetWriter whose output is drained after every row group"""
+
+    closed = False
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def _parquet_schema(codec: ModelCodec):
+    types = {datetime: pyarrow.timestamp("ms"), int: pyarrow.int64(), bool: pyarrow.bool_()}
+    fields = []
+    for name in codec.fields:
+        annotation = codec.model.model_fields[name].annotation
+        # Optional[X] -> X
+        annotation = next((arg for arg in getattr(annotation, "__args__", ()) if arg is not type(None)), annotation)
+        fields.append(pyarrow.field(name, types.get(annotation, pyarrow.string())))
+    return pyarrow.schema(fields)
+
+
+async def parquet_chunks(collection: Repository, query: dict, sort, codec: ModelCodec) -> AsyncIterator[bytes]:
+    schema = _parquet_schema(codec)
+    sink = _ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema, compression="zstd")
+    async for chunk in _chunks(collection, query, sort, codec, PARQUET_ROW_GROUP_SIZE):
+        # Columnar build and compression happen off the event loop
+        await asyncio.to_thread(writer.write_batch, pyarrow.RecordBatch.from_pylist(chunk, schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+EXPORTERS = {"csv": csv_rows, "ndjson": ndjson_rows, "parquet": parquet_chunks}
+
+
+# ---------------------------------------------------------------------------
+# Import
+
+
+async def _lines(body: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in body:
+        # Split on newlines only: str.splitlines would also break JSON strings at U+2028 and friends
+        lines = (pending + decoder.decode(chunk)).split("\n")
+        # The last piece may be a partial line
+        pending = lines.pop()
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def _csv_records(body: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    header: Optional[List[str]] = None
+    record = ""
+    async for line in _lines(body):
+        record += line
+        # A quoted field may contain line breaks; quotes are balanced once the record is complete
+        if record.count('"') % 2:
+            continue
+        values = next(csv.reader([record]), [])
+        record = ""
+        if not values:
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        yield {name: value for name, value in zip(header, values)}
+    if record.strip():
+        yield ValueError("CSV ends inside a quoted field")
+
+
+def _csv_value(value: str) -> Optional[str]:
+    if value == "":
+        return None
+    if value.startswith("'") and value[1:].startswith(ESCAPED_PREFIXES):
+        # Undo the export's formula escaping
+        return value[1:]
+    return value
+
+
+async def _ndjson_records(body: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    async for line in _lines(body):
+        if line.strip():
+            try:
+                yield orjson.loads(line)
+            except orjson.JSONDecodeError as e:
+                yield ValueError(f"Invalid JSON: {e}")
+
+
+async def _parquet_records(body: AsyncIterator[bytes]) -> AsyncIterator[Dict[str, Any]]:
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as spool:
+        async for chunk in body:
+            spool.write(chunk)
+        spool.seek(0)
+        try:
+            batches = pyarrow.parquet.ParquetFile(spool).iter_batches(batch_size=IMPORT_BATCH_SIZE)
+        except pyarrow.ArrowInvalid as e:
+            raise ValueError(f"Invalid Parquet file: {e}")
+        while True:
+            batch = await asyncio.to_thread(next, batches, None)
+            if batch is None:
+                return
+            for record in batch.to_pylist():
+                yield record
+
+
+def validate_record(record: Any) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """A contact document for one imported record, or the reason it was rejected"""
+    if isinstance(record, Exception):
+        return None, str(record)
+    if not isinstance(record, dict):
+        return None, "Expected an object"
+    try:
+        data = ContactFormCreate(**{name: record.get(name) for name in ContactFormCreate.model_fields})
+        preserved = {name: record[name] for name in PRESERVED_FIELDS if record.get(name) is not None}
+        if preserved.get("status", "new") not in CONTACT_STATUSES:
+            return None, f"Invalid status. Must be one of: {CONTACT_STATUSES}"
+        contact = ContactForm(**data.dict(), **preserved)
+    except ValidationError as e:
+        return None, "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+    return contact.dict(), None
+
+
+async def import_contacts(collection: Repository, body: AsyncIterator[bytes], format: str,
+                          on_inserted=None) -> ContactImportResult:
+    """Validate and insert every record of an uploaded file in batches.
+
+    Rows that fail validation or collide with an existing id are reported
+    by row number (up to MAX_REPORTED_ERRORS) and skipped; the rest are
+    inserted. ``on_inserted`` is awaited with each batch of new documents.
+    """
+    if format == "csv":
+        records = (
+            {name: _csv_value(value) for name, value in record.items()} if isinstance(record, dict) else record
+            async for record in _csv_records(body)
+        )
+    elif format == "ndjson":
+        records = _ndjson_records(body)
+    else:
+        records = _parquet_records(body)
+
+    result = ContactImportResult()
+
+    def reject(row: int, error: str):
+        result.failed += 1
+        if len(result.errors) < MAX_REPORTED_ERRORS:
+            result.errors.append(ImportRowError(row=row, error=error))
+
+    async def flush(batch: List[Tuple[int, Dict[str, Any]]]):
+        errors = await collection.apply_writes([WriteOp("insert", doc["id"], doc) for _, doc in batch])
+        inserted = []
+        for (row, doc), error in zip(batch, errors):
+            if error:
+                reject(row, "Duplicate id" if "duplicate" in error.lower() or "unique" in error.lower() else error)
+            else:
+                inserted.append(doc)
+        result.imported += len(inserted)
+        if inserted and on_inserted is not None:
+            await on_inserted(inserted)
+
+    batch: List[Tuple[int, Dict[str, Any]]] = []
+    row = 0
+    async for record in records:
+        row += 1
+        doc, error = validate_record(record)
+        if error:
+            reject(row, error)
+            continue
+        batch.append((row, doc))
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+    return result
+
+
+def sniff_format(content_type: Optional[str]) -> Optional[str]:
+    """Import format from a Content-Type header"""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    for format, known in MEDIA_TYPES.items():
+        if media_type == known.split(";")[0]:
+            return format
+    return None
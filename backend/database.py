@@ -0,0 +1,200 @@
+import os
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+from pymongo import monitoring
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+
+from metrics import command_listener
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseSettings(BaseModel):
+    """Connection and pool settings for the shared Mongo client"""
+    mongo_url: str
+    db_name: str
+    max_pool_size: int = Field(default=50, ge=1)
+    min_pool_size: int = Field(default=0, ge=0)
+    max_idle_time_ms: Optional[int] = Field(default=60000, ge=0)
+    connect_timeout_ms: int = Field(default=5000, ge=1)
+    server_selection_timeout_ms: int = Field(default=5000, ge=1)
+    socket_timeout_ms: Optional[int] = Field(default=None, ge=1)
+    wait_queue_timeout_ms: Optional[int] = Field(default=None, ge=1)
+    compressors: List[str] = Field(default_factory=list)
+    app_name: str = "portfolio-api"
+
+    @classmethod
+    def from_env(cls) -> "DatabaseSettings":
+        """Build settings from MONGO_* environment variables"""
+        def optional_int(name: str, default: Optional[int]) -> Optional[int]:
+            value = os.environ.get(name)
+            if value is None:
+                return default
+            return int(value) if value.strip() else None
+
+        compressors = os.environ.get("MONGO_COMPRESSORS", "")
+        return cls(
+            mongo_url=os.environ['MONGO_URL'],
+            db_name=os.environ['DB_NAME'],
+            max_pool_size=int(os.environ.get("MONGO_MAX_POOL_SIZE", 50)),
+            min_pool_size=int(os.environ.get("MONGO_MIN_POOL_SIZE", 0)),
+            max_idle_time_ms=optional_int("MONGO_MAX_IDLE_TIME_MS", 60000),
+            connect_timeout_ms=int(os.environ.get("MONGO_CONNECT_TIMEOUT_MS", 5000)),
+            server_selection_timeout_ms=int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000)),
+            socket_timeout_ms=optional_int("MONGO_SOCKET_TIMEOUT_MS", None),
+            wait_queue_timeout_ms=optional_int("MONGO_WAIT_QUEUE_TIMEOUT_MS", None),
+            compressors=[c.strip() for c in compressors.split(",") if c.strip()],
+            app_name=os.environ.get("MONGO_APP_NAME", "portfolio-api"),
+        )
+
+    def client_kwargs(self) -> dict:
+        """Keyword arguments for AsyncIOMotorClient"""
+        kwargs = {
+            "maxPoolSize": self.max_pool_size,
+            "minPoolSize": self.min_pool_size,
+            "connectTimeoutMS": self.connect_timeout_ms,
+            "serverSelectionTimeoutMS": self.server_selection_timeout_ms,
+            "appname": self.app_name,
+        }
+        if self.max_idle_time_ms is not None:
+            kwargs["maxIdleTimeMS"] = self.max_idle_time_ms
+        if self.socket_timeout_ms is not None:
+            kwargs["socketTimeoutMS"] = self.socket_timeout_ms
+        if self.wait_queue_timeout_ms is not None:
+            kwargs["waitQueueTimeoutMS"] = self.wait_queue_timeout_ms
+        if self.compressors:
+            kwargs["compressors"] = ",".join(self.compressors)
+        return kwargs
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Collects connection pool counters from pymongo pool events.
+
+    Events are published from driver threads, so counters are guarded by a lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._servers: Dict[str, Dict[str, int]] = defaultdict(self._empty)
+
+    @staticmethod
+    def _empty() -> Dict[str, int]:
+        return {
+            "open": 0,
+            "checked_out": 0,
+            "waiting": 0,
+            "created_total": 0,
+            "closed_total": 0,
+            "checkout_failed_total": 0,
+            "cleared_total": 0,
+        }
+
+    def _update(self, event, **deltas):
+        key = "%s:%s" % event.address
+        with self._lock:
+            counters = self._servers[key]
+            for name, delta in deltas.items():
+                counters[name] += delta
+
+    def pool_created(self, event):
+        self._update(event)
+
+    def pool_ready(self, event):
+        self._update(event)
+
+    def pool_cleared(self, event):
+        self._update(event, cleared_total=1)
+
+    def pool_closed(self, event):
+        with self._lock:
+            self._servers.pop("%s:%s" % event.address, None)
+
+    def connection_created(self, event):
+        self._update(event, open=1, created_total=1)
+
+    def connection_ready(self, event):
+        self._update(event)
+
+    def connection_closed(self, event):
+        self._update(event, open=-1, closed_total=1)
+
+    def connection_check_out_started(self, event):
+        self._update(event, waiting=1)
+
+    def connection_check_out_failed(self, event):
+        self._update(event, waiting=-1, checkout_failed_total=1)
+
+    def connection_checked_out(self, event):
+        self._update(event, waiting=-1, checked_out=1)
+
+    def connection_checked_in(self, event):
+        self._update(event, checked_out=-1)
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {address: dict(counters) for address, counters in self._servers.items()}
+
+
+class Database:
+    """Owns the single pooled Mongo client shared by every router"""
+
+    def __init__(self):
+        self.settings: Optional[DatabaseSettings] = None
+        self.client: Optional[AsyncIOMotorClient] = None
+        self.db: Optional[AsyncIOMotorDatabase] = None
+        self.pool_listener = PoolStatsListener()
+
+    def connect(self, settings: Optional[DatabaseSettings] = None) -> AsyncIOMotorDatabase:
+        if self.client is not None:
+            return self.db
+        self.settings = settings or DatabaseSettings.from_env()
+        self.client = AsyncIOMotorClient(
+            self.settings.mongo_url,
+            event_listeners=[self.pool_listener, command_listener],
+            **self.settings.client_kwargs()
+        )
+        self.db = self.client[self.settings.db_name]
+        logger.info(
+            "MongoDB client created (maxPoolSize=%s, minPoolSize=%s, compressors=%s)",
+            self.settings.max_pool_size,
+            self.settings.min_pool_size,
+            ",".join(self.settings.compressors) or "none",
+        )
+        return self.db
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+            logger.info("Database connection closed")
+        self.client = None
+        self.db = None
+
+    def pool_stats(self) -> dict:
+        servers = self.pool_listener.snapshot()
+        totals = PoolStatsListener._empty()
+        for counters in servers.values():
+            for name, value in counters.items():
+                totals[name] += value
+        max_pool_size = self.settings.max_pool_size if self.settings else None
+        return {
+            "connected": self.client is not None,
+            "max_pool_size": max_pool_size,
+            "min_pool_size": self.settings.min_pool_size if self.settings else None,
+            "utilization": (totals["checked_out"] / max_pool_size) if max_pool_size else 0.0,
+            "totals": totals,
+            "servers": servers,
+        }
+
+
+database = Database()
+
+
+def get_database() -> AsyncIOMotorDatabase:
+    """FastAPI dependency returning the shared database handle"""
+    if database.db is None:
+        raise RuntimeError("Database is not connected; the app lifespan has not started")
+    return database.db
@@ -0,0 +1,94 @@
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# A check returns details for the report and raises when the dependency is unhealthy
+CheckFunc = Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+
+
+class HealthCheck(NamedTuple):
+    name: str
+    check: CheckFunc
+    critical: bool  # readiness fails when a critical check fails
+    timeout: float
+
+
+class HealthChecker:
+    """Runs readiness checks concurrently and caches the result for ``ttl`` seconds.
+
+    Probes arriving while a run is in progress wait for that run, so a burst
+    of probe traffic costs one round of checks.
+    """
+
+    def __init__(self, ttl: float = 5.0, default_timeout: float = 1.0):
+        self.ttl = ttl
+        self.default_timeout = default_timeout
+        self.started_at = time.monotonic()
+        self._checks: List[HealthCheck] = []
+        self._result: Optional[Dict[str, Any]] = None
+        self._expires_at = 0.0
+        self._running: Optional[asyncio.Future] = None
+
+    @classmethod
+    def from_env(cls) -> "HealthChecker":
+        return cls(
+            ttl=float(os.environ.get("HEALTH_CACHE_SECONDS", 5)),
+            default_timeout=int(os.environ.get("HEALTH_CHECK_TIMEOUT_MS", 1000)) / 1000,
+        )
+
+    def register(self, name: str, check: CheckFunc, critical: bool = True, timeout: Optional[float] = None):
+        self._checks.append(HealthCheck(name, check, critical, timeout or self.default_timeout))
+
+    def liveness(self) -> Dict[str, Any]:
+        return {"status": "alive", "uptime_seconds": round(time.monotonic() - self.started_at, 1)}
+
+    async def readiness(self) -> Dict[str, Any]:
+        if self._result is not None and time.monotonic() < self._expires_at:
+            return {**self._result, "cached": True}
+        if self._running is None:
+            self._running = asyncio.ensure_future(self._run())
+            self._running.add_done_callback(self._finished)
+        return {**await asyncio.shield(self._running), "cached": False}
+
+    def _finished(self, future: asyncio.Future):
+        self._running = None
+        if not future.cancelled() and future.exception() is None:
+            self._result = future.result()
+            self._expires_at = time.monotonic() + self.ttl
+
+    async def _run(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        results = await asyncio.gather(*(self._run_check(check) for check in self._checks))
+        checks = {check.name: result for check, result in zip(self._checks, results)}
+        ready = all(result["ok"] for check, result in zip(self._checks, results) if check.critical)
+        return {
+            "status": "ready" if ready else "not_ready",
+            "checked_at": datetime.utcnow().isoformat() + "Z",
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+            "checks": checks,
+        }
+
+    async def _run_check(self, check: HealthCheck) -> Dict[str, Any]:
+        started = time.perf_counter()
+        result: Dict[str, Any] = {"critical": check.critical}
+        try:
+            details = await asyncio.wait_for(check.check(), check.timeout)
+            result["ok"] = True
+            if details:
+                result.update(details)
+        except asyncio.TimeoutError:
+            result.update(ok=False, error=f"Timed out after {check.timeout * 1000:.0f} ms")
+        except Exception as e:
+            result.update(ok=False, error=str(e) or type(e).__name__)
+        result["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        if not result["ok"]:
+            logger.warning("Health check %s failed: %s", check.name, result["error"])
+        return result
+
+
+health = HealthChecker.from_env()
@@ -0,0 +1,219 @@
+import os
+import hashlib
+import secrets
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, NamedTuple, Optional, Set
+
+from fastapi import Request, Response
+
+from cache import CacheKey, read_cache
+from compression import MIN_SIZE, compress, compression_stats, encoding_etag, negotiate, strip_encoding
+from serialization import FastJSONResponse, dumps
+from versioning import document_etag, strip_document_version
+
+
+class CollectionVersions:
+    """Per-collection version counters used to build strong ETags.
+
+    The boot nonce keeps ETags from two processes (or two runs of the same
+    one) from colliding while their counters happen to be equal.
+    """
+
+    def __init__(self):
+        self.boot_id = secrets.token_hex(4)
+        self._versions: Dict[str, int] = {}
+        self._changed_at: Dict[str, datetime] = {}
+
+    def get(self, collection: str) -> int:
+        return self._versions.get(collection, 0)
+
+    def bump(self, collection: str):
+        self._versions[collection] = self.get(collection) + 1
+        self._changed_at[collection] = datetime.utcnow()
+
+    def changed_at(self, collection: str) -> Optional[datetime]:
+        return self._changed_at.get(collection)
+
+    def etag(self, key: CacheKey, version: int) -> str:
+        digest = hashlib.blake2s(repr(key[1:]).encode(), digest_size=6).hexdigest()
+        return f'"{key[0]}-{self.boot_id}-{version}-{digest}"'
+
+
+versions = CollectionVersions()
+
+CACHE_CONTROL = os.environ.get("HTTP_CACHE_CONTROL", "public, max-age=30, stale-while-revalidate=60")
+
+
+# Cache namespaces whose responses are derived from several collections
+_dependents: Dict[str, Set[str]] = {}
+
+
+def register_dependent(namespace: str, collections: Iterable[str]):
+    """Have writes to any of ``collections`` also invalidate ``namespace``"""
+    for collection in collections:
+        _dependents.setdefault(collection, set()).add(namespace)
+
+
+def mark_changed(collection: str, *item_ids: str):
+    """Record a write: bump the collection's ETag version and drop stale cache entries"""
+    versions.bump(collection)
+    read_cache.invalidate(collection, *item_ids)
+    for namespace in _dependents.get(collection, ()):
+        versions.bump(namespace)
+        read_cache.invalidate(namespace)
+
+
+def mark_stale(collection: str):
+    """Record writes whose item ids aren't known: drop every cached response of the collection"""
+    versions.bump(collection)
+    read_cache.invalidate_all(collection)
+    for namespace in _dependents.get(collection, ()):
+        versions.bump(namespace)
+        read_cache.invalidate(namespace)
+
+
+class RenderedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    last_modified: Optional[datetime]
+    # Compressed copies of body by content-coding, filled on first request for each
+    encoded: Dict[str, bytes]
+    # Extra headers the loaded value asked for, e.g. the cursor continuing a truncated list
+    headers: Dict[str, str]
+
+
+def _newest_timestamp(value: Any) -> Optional[datetime]:
+    items = value if isinstance(value, list) else [value]
+    newest = None
+    for item in items:
+        for field in ("updated_at", "created_at"):
+            stamp = item.get(field) if isinstance(item, dict) else getattr(item, field, None)
+            if isinstance(stamp, datetime) and (newest is None or stamp > newest):
+                newest = stamp
+    return newest
+
+
+def _http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc).replace(microsecond=0), usegmt=True)
+
+
+def _matching_tag(header: str, etag: str, document: bool = False) -> Optional[str]:
+    # If-None-Match uses weak comparison, so W/ prefixes and content-coding suffixes are ignored
+    if header.strip() == "*":
+        return etag
+    for raw in header.split(","):
+        raw = raw.strip()
+        tag = strip_encoding(raw[2:] if raw.startswith("W/") else raw)
+        if document:
+            # Any write to the document also bumps the collection version
+            tag = strip_document_version(tag)
+        if tag == etag:
+            return raw
+    return None
+
+
+def _etag_matches(header: str, etag: str, document: bool = False) -> bool:
+    return _matching_tag(header, etag, document) is not None
+
+
+def _not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        modified = last_modified if last_modified.tzinfo else last_modified.replace(tzinfo=timezone.utc)
+        return modified.replace(microsecond=0) <= since
+    return False
+
+
+def _headers(etag: str, last_modified: Optional[datetime]) -> Dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    if last_modified is not None:
+        headers["Last-Modified"] = _http_date(last_modified)
+    return headers
+
+
+async def _rendered(key: CacheKey, etag: str, loader: Callable[[], Awaitable[Any]],
+                    document: bool = False) -> RenderedResponse:
+    async def load_rendered():
+        value = await loader()
+        tag = etag
+        if document and isinstance(value, dict) and "version" in value:
+            tag = document_etag(etag, value["version"])
+        # A delete leaves no timestamp behind in the remaining documents, so the write time counts too
+        stamps = [stamp for stamp in (_newest_timestamp(value), versions.changed_at(key[0])) if stamp is not None]
+        last_modified = max(stamps) if stamps else None
+        body = dumps(value)
+        headers = dict(getattr(value, "response_headers", None) or {})
+        return RenderedResponse(body, tag, last_modified, {}, headers), len(body)
+
+    return await read_cache.get_or_load(key, load_rendered)
+
+
+def _encoded(key: CacheKey, rendered: RenderedResponse, encoding: str) -> bytes:
+    body = rendered.encoded.get(encoding)
+    if body is None:
+        body = rendered.encoded[encoding] = compress(rendered.body, encoding)
+        read_cache.grow(key, len(body))
+    else:
+        compression_stats.record(encoding, len(rendered.body), len(body), 0.0, precompressed=True)
+    return body
+
+
+async def prerender(key: CacheKey, loader: Callable[[], Awaitable[Any]], encodings: Iterable[str] = ()) -> int:
+    """Fill the cache entry ``cached_json_response`` would serve for ``key``.
+
+    Compressed variants are built for ``encodings`` as well. Returns the
+    size of the rendered body.
+    """
+    rendered = await _rendered(key, versions.etag(key, versions.get(key[0])), loader)
+    if len(rendered.body) >= MIN_SIZE:
+        for encoding in encodings:
+            if encoding not in rendered.encoded:
+                _encoded(key, rendered, encoding)
+    return len(rendered.body)
+
+
+async def cached_json_response(request: Request, key: CacheKey, loader: Callable[[], Awaitable[Any]],
+                               document: bool = False) -> Response:
+    """Serve ``loader()`` rendered as JSON with conditional GET support.
+
+    A matching ``If-None-Match`` is answered with 304 straight from the version
+    counter, without touching the cache or Mongo. Otherwise the serialized body
+    comes from ``read_cache`` and carries ETag / Last-Modified / Cache-Control.
+    Compressed variants are stored on the cache entry, so each encoding of a
+    body is compressed once per cache fill.
+
+    With ``document`` the loader returns one versioned document and its
+    version is appended to the ETag, so the ETag works as If-Match on update.
+    """
+    collection = key[0]
+    version = versions.get(collection)
+    etag = versions.etag(key, version)
+    if_none_match = request.headers.get("if-none-match")
+    matched = _matching_tag(if_none_match, etag, document) if if_none_match is not None else None
+    if matched is not None:
+        # The client's tag carries the document version, which isn't known without a read
+        return Response(status_code=304, headers=_headers(matched if document else etag, None))
+
+    rendered = await _rendered(key, etag, loader, document)
+    if _not_modified(request, rendered.etag, rendered.last_modified):
+        return Response(status_code=304, headers=_headers(rendered.etag, rendered.last_modified))
+
+    encoding = negotiate(request.headers.get("accept-encoding"))
+    if encoding is None or len(rendered.body) < MIN_SIZE:
+        if encoding is not None:
+            compression_stats.skipped_small += 1
+        return FastJSONResponse(content=rendered.body, headers={**rendered.headers, **_headers(rendered.etag, rendered.last_modified)})
+    body = _encoded(key, rendered, encoding)
+    headers = {**rendered.headers, **_headers(encoding_etag(rendered.etag, encoding), rendered.last_modified)}
+    headers["Content-Encoding"] = encoding
+    return FastJSONResponse(content=body, headers=headers)
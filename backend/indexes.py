@@ -0,0 +1,202 @@
+"""Declarative index registry, migration and verification.
+
+Usage:
+    python indexes.py verify
+    python indexes.py migrate [--drop-redundant]
+"""
+import argparse
+import asyncio
+import logging
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+logger = logging.getLogger(__name__)
+
+IndexKey = Tuple[Tuple[str, int], ...]
+
+
+class IndexSpec(NamedTuple):
+    keys: IndexKey
+    unique: bool = False
+    # TTL indexes: documents are removed this long after the indexed date
+    expire_after_seconds: Optional[int] = None
+
+    @property
+    def name(self) -> str:
+        return "_".join("%s_%s" % (field, direction) for field, direction in self.keys)
+
+    def to_model(self) -> IndexModel:
+        options = {} if self.expire_after_seconds is None else {"expireAfterSeconds": self.expire_after_seconds}
+        return IndexModel(list(self.keys), name=self.name, unique=self.unique, **options)
+
+
+def _spec(*keys: Tuple[str, int], unique: bool = False, expire_after_seconds: Optional[int] = None) -> IndexSpec:
+    return IndexSpec(tuple(keys), unique, expire_after_seconds)
+
+
+ID_INDEX = _spec(("id", ASCENDING), unique=True)
+
+# Each compound index matches a filter + sort shape issued by the routers, ending
+# in the `id` tiebreaker used for keyset pagination. Single-field indexes serve
+# sorts in either direction, so they stay ascending.
+INDEX_REGISTRY: Dict[str, List[IndexSpec]] = {
+    "contacts": [
+        ID_INDEX,
+        _spec(("created_at", DESCENDING), ("id", DESCENDING)),
+        _spec(("status", ASCENDING), ("created_at", DESCENDING)),
+        _spec(("email", ASCENDING)),
+        # Covers the analytics pipelines: range on created_at, group on the rest
+        _spec(("created_at", ASCENDING), ("status", ASCENDING), ("service", ASCENDING), ("company", ASCENDING)),
+    ],
+    "contacts_rollup": [
+        _spec(("day", ASCENDING), ("dim", ASCENDING), ("value", ASCENDING), unique=True),
+    ],
+    "portfolio": [
+        ID_INDEX,
+        _spec(("created_at", DESCENDING), ("id", DESCENDING)),
+        _spec(("category", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)),
+        _spec(("is_featured", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)),
+    ],
+    "testimonials": [
+        ID_INDEX,
+        _spec(("created_at", DESCENDING), ("id", DESCENDING)),
+        _spec(("is_featured", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)),
+    ],
+    "services": [
+        ID_INDEX,
+        _spec(("created_at", DESCENDING), ("id", DESCENDING)),
+        _spec(("is_active", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)),
+    ],
+    "experience": [
+        ID_INDEX,
+        _spec(("order", ASCENDING), ("id", ASCENDING)),
+    ],
+    "skills": [
+        ID_INDEX,
+        _spec(("level", DESCENDING), ("id", DESCENDING)),
+        _spec(("category", ASCENDING), ("level", DESCENDING), ("id", DESCENDING)),
+    ],
+    "stats": [
+        ID_INDEX,
+        _spec(("updated_at", ASCENDING)),
+    ],
+    "stats_history": [
+        _spec(("bucket_start", ASCENDING), unique=True),
+    ],
+    "rate_limits": [
+        _spec(("expires_at", ASCENDING), expire_after_seconds=0),
+    ],
+}
+
+
+def _normalize_keys(keys) -> IndexKey:
+    return tuple((field, int(direction)) for field, direction in keys.items())
+
+
+async def _existing_indexes(db: AsyncIOMotorDatabase, collection: str) -> Dict[str, IndexSpec]:
+    existing = {}
+    async for index in db[collection].list_indexes():
+        if index["name"] == "_id_":
+            continue
+        existing[index["name"]] = IndexSpec(_normalize_keys(index["key"]), bool(index.get("unique", False)),
+                                            index.get("expireAfterSeconds"))
+    return existing
+
+
+def _is_prefix(shorter: IndexKey, longer: IndexKey) -> bool:
+    return len(shorter) < len(longer) and longer[:len(shorter)] == shorter
+
+
+async def verify_collection(db: AsyncIOMotorDatabase, collection: str) -> dict:
+    """Compare a collection's indexes against the registry"""
+    expected = INDEX_REGISTRY[collection]
+    existing = await _existing_indexes(db, collection)
+    existing_specs = set(existing.values())
+
+    missing = [spec.name for spec in expected if spec not in existing_specs]
+    redundant = []
+    for name, spec in existing.items():
+        if spec in expected:
+            continue
+        # Unregistered indexes are flagged either because a registered compound
+        # index already covers them as a prefix, or because nothing queries them
+        covered_by = [other.name for other in expected if _is_prefix(spec.keys, other.keys)]
+        redundant.append({
+            "name": name,
+            "reason": "prefix of %s" % ", ".join(covered_by) if covered_by else "not in registry",
+        })
+    return {"collection": collection, "missing": missing, "redundant": redundant}
+
+
+async def verify_indexes(db: AsyncIOMotorDatabase) -> List[dict]:
+    """Check every registered collection concurrently"""
+    return list(await asyncio.gather(*(verify_collection(db, name) for name in INDEX_REGISTRY)))
+
+
+async def migrate_collection(db: AsyncIOMotorDatabase, collection: str, drop_redundant: bool = False) -> dict:
+    """Idempotently build the registered indexes for one collection"""
+    result = {"collection": collection, "created": [], "dropped": [], "error": None}
+    try:
+        report = await verify_collection(db, collection)
+        to_create = [spec for spec in INDEX_REGISTRY[collection] if spec.name in report["missing"]]
+        if to_create:
+            result["created"] = await db[collection].create_indexes([spec.to_model() for spec in to_create])
+        if drop_redundant:
+            for index in report["redundant"]:
+                await db[collection].drop_index(index["name"])
+                result["dropped"].append(index["name"])
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+
+async def migrate_indexes(db: AsyncIOMotorDatabase, drop_redundant: bool = False) -> List[dict]:
+    """Build indexes for all collections in parallel"""
+    return list(await asyncio.gather(
+        *(migrate_collection(db, name, drop_redundant) for name in INDEX_REGISTRY)
+    ))
+
+
+def log_index_report(report: List[dict]):
+    for entry in report:
+        if entry["missing"]:
+            logger.warning("Collection %s is missing indexes: %s", entry["collection"], ", ".join(entry["missing"]))
+        for index in entry["redundant"]:
+            logger.warning("Collection %s has redundant index %s (%s)", entry["collection"], index["name"], index["reason"])
+
+
+async def _main(args):
+    from database import database
+    db = database.connect()
+    try:
+        if args.command == "migrate":
+            for result in await migrate_indexes(db, drop_redundant=args.drop_redundant):
+                if result["error"]:
+                    print(f"❌ {result['collection']}: {result['error']}")
+                else:
+                    print(f"✅ {result['collection']}: created {result['created'] or 'none'}, dropped {result['dropped'] or 'none'}")
+        report = await verify_indexes(db)
+        ok = True
+        for entry in report:
+            redundant = [index["name"] for index in entry["redundant"]]
+            if entry["missing"] or redundant:
+                ok = False
+            print(f"   {entry['collection']}: missing {entry['missing'] or 'none'}, redundant {redundant or 'none'}")
+        return 0 if ok else 1
+    finally:
+        database.close()
+
+
+if __name__ == "__main__":
+    from pathlib import Path
+    from dotenv import load_dotenv
+
+    load_dotenv(Path(__file__).parent / '.env')
+    parser = argparse.ArgumentParser(description="Manage MongoDB indexes for the portfolio API")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("verify", help="Report missing and redundant indexes")
+    migrate = subparsers.add_parser("migrate", help="Build missing indexes in parallel")
+    migrate.add_argument("--drop-redundant", action="store_true", help="Drop indexes flagged as redundant")
+    raise SystemExit(asyncio.run(_main(parser.parse_args())))
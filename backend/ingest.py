@@ -0,0 +1,324 @@
+import os
+import time
+import fcntl
+import asyncio
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from bson import json_util
+from pymongo.errors import BulkWriteError, PyMongoError
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+
+# Longest pause between retries while Mongo is unavailable
+MAX_RETRY_DELAY_SECONDS = 30.0
+
+
+class QueueFull(Exception):
+    """Raised when a submission can't be accepted before the enqueue timeout"""
+
+
+class ContactQueue:
+    """Write-behind queue for contact submissions.
+
+    ``submit`` appends the document to a local spool file and returns; a
+    background writer flushes accepted documents with ``insert_many`` once
+    ``batch_size`` are waiting or every ``flush_interval`` seconds. The spool
+    is an append-only log of ``add`` and ``ack`` records, so documents that
+    were accepted but never flushed are replayed on the next start. Replays
+    are safe because ``contacts.id`` is unique and duplicates count as written.
+
+    Each process owns one spool file guarded by a lock file; spools left
+    behind by processes that are gone are adopted on start.
+    """
+
+    def __init__(self, spool_dir: Path, batch_size: int = 100, flush_interval: float = 0.2,
+                 max_depth: int = 10000, enqueue_timeout: float = 2.0, drain_timeout: float = 10.0,
+                 compact_bytes: int = 8 * 1024 * 1024, fsync: bool = False, enabled: bool = True):
+        self.spool_dir = Path(spool_dir)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_depth = max_depth
+        self.enqueue_timeout = enqueue_timeout
+        self.drain_timeout = drain_timeout
+        self.compact_bytes = compact_bytes
+        self.fsync = fsync
+        self.enabled = enabled
+        self._collection: Optional[AsyncIOMotorCollection] = None
+        self._pending: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._spool_path: Optional[Path] = None
+        self._lock_path: Optional[Path] = None
+        self._spool = None
+        self._lock = None
+        self._listeners: List[Callable[[List[Dict[str, Any]]], Awaitable[None]]] = []
+        self.accepted = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.flush_failures = 0
+        self.replayed = 0
+        self.rejected = 0
+        self.discarded = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    @classmethod
+    def from_env(cls, default_spool_dir: Path) -> "ContactQueue":
+        return cls(
+            spool_dir=Path(os.environ.get("CONTACT_SPOOL_DIR", default_spool_dir)),
+            batch_size=int(os.environ.get("CONTACT_QUEUE_BATCH_SIZE", 100)),
+            flush_interval=int(os.environ.get("CONTACT_QUEUE_FLUSH_INTERVAL_MS", 200)) / 1000,
+            max_depth=int(os.environ.get("CONTACT_QUEUE_MAX_DEPTH", 10000)),
+            enqueue_timeout=float(os.environ.get("CONTACT_QUEUE_ENQUEUE_TIMEOUT_SECONDS", 2.0)),
+            drain_timeout=float(os.environ.get("CONTACT_QUEUE_DRAIN_TIMEOUT_SECONDS", 10.0)),
+            fsync=os.environ.get("CONTACT_SPOOL_FSYNC", "false").lower() == "true",
+            enabled=os.environ.get("CONTACT_QUEUE_ENABLED", "true").lower() == "true",
+        )
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._stopping
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def pending(self, contact_id: str) -> Optional[Dict[str, Any]]:
+        """Return a submission that has been accepted but not written yet"""
+        return self._pending.get(contact_id)
+
+    async def start(self, collection: AsyncIOMotorCollection):
+        """Open this process's spool, replay unflushed submissions and start the writer"""
+        if not self.enabled or self._task is not None:
+            return
+        self._collection = collection
+        self._stopping = False
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        self._lock_path = self.spool_dir / f"contacts-{os.getpid()}.lock"
+        self._spool_path = self.spool_dir / f"contacts-{os.getpid()}.log"
+        self._lock = open(self._lock_path, "w")
+        fcntl.flock(self._lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+        # A spool already at our path belongs to a dead process that had our pid
+        self._pending.update(self._read_spool(self._spool_path))
+        self._spool = open(self._spool_path, "a", encoding="utf-8")
+        for lock_path in sorted(self.spool_dir.glob("contacts-*.lock")):
+            if lock_path != self._lock_path:
+                self._adopt(lock_path)
+        self.replayed = len(self._pending)
+        if self.replayed:
+            logger.info("Replaying %d unflushed contact submissions from %s", self.replayed, self.spool_dir)
+
+        self._update_space()
+        self._task = asyncio.create_task(self._run())
+        if self._pending:
+            self._wakeup.set()
+
+    async def stop(self):
+        """Flush what we can within ``drain_timeout``; the rest stays spooled for the next start"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(self._task, self.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Contact queue drain timed out with %d submissions spooled", self.depth)
+        self._task = None
+        self._spool.close()
+        if not self._pending:
+            self._spool_path.unlink(missing_ok=True)
+            self._lock_path.unlink(missing_ok=True)
+        self._lock.close()
+
+    async def submit(self, doc: Dict[str, Any]):
+        """Spool ``doc`` for writing; waits for space when the queue is full"""
+        if len(self._pending) >= self.max_depth:
+            try:
+                await asyncio.wait_for(self._wait_for_space(), self.enqueue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise QueueFull(f"Contact queue is full ({self.depth} submissions waiting)")
+        self._append({"op": "add", "doc": doc})
+        self._pending[doc["id"]] = doc
+        self.accepted += 1
+        self._update_space()
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "running": self.running,
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "accepted": self.accepted,
+            "flushed": self.flushed,
+            "replayed": self.replayed,
+            "dropped": self.rejected + self.discarded,
+            "rejected": self.rejected,
+            "discarded": self.discarded,
+            "flushes": self.flushes,
+            "flush_failures": self.flush_failures,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "max_flush_ms": round(self.max_flush_ms, 2),
+            "avg_flush_ms": round(self._total_flush_ms / self.flushes, 2) if self.flushes else 0.0,
+            "spool_bytes": self._spool.tell() if self._spool and not self._spool.closed else 0,
+        }
+
+    async def _wait_for_space(self):
+        while len(self._pending) >= self.max_depth:
+            await self._space.wait()
+
+    def _update_space(self):
+        if len(self._pending) < self.max_depth:
+            self._space.set()
+        else:
+            self._space.clear()
+
+    async def _run(self):
+        retry_delay = self.flush_interval
+        while True:
+            if not self._stopping:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+            try:
+                await self._flush_pending()
+                retry_delay = self.flush_interval
+            except Exception as e:
+                # Never let the writer die: the submissions stay pending and spooled until a retry succeeds
+                self.flush_failures += 1
+                if isinstance(e, (PyMongoError, OSError)):
+                    logger.warning("Contact flush failed, retrying in %.1fs: %s", retry_delay, e)
+                else:
+                    logger.exception("Unexpected contact flush error, retrying in %.1fs", retry_delay)
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY_SECONDS)
+                continue
+            if self._stopping and not self._pending:
+                return
+
+    async def _flush_pending(self):
+        while self._pending:
+            batch = [doc for _, doc in zip(range(self.batch_size), self._pending.values())]
+            started = time.perf_counter()
+            inserted = await self._insert(batch)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.flushes += 1
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self._total_flush_ms += elapsed_ms
+            self.flushed += len(inserted)
+
+            ids = [doc["id"] for doc in batch]
+            for contact_id in ids:
+                del self._pending[contact_id]
+            self._append({"op": "ack", "ids": ids})
+            self._update_space()
+            self._compact()
+            await self._notify(inserted)
+
+    async def _insert(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert ``batch``; returns the documents written by this call"""
+        try:
+            # Copies, because insert_many adds an _id to each document it sends
+            await self._collection.insert_many([dict(doc) for doc in batch], ordered=False)
+            return batch
+        except BulkWriteError as e:
+            failed = set()
+            for error in e.details.get("writeErrors", []):
+                failed.add(error["index"])
+                if error.get("code") != DUPLICATE_KEY:
+                    # Retrying would fail the same way; drop it rather than wedge the queue
+                    self.discarded += 1
+                    logger.error("Discarding contact submission %s: %s",
+                                 batch[error["index"]].get("id"), error.get("errmsg"))
+            return [doc for index, doc in enumerate(batch) if index not in failed]
+
+    def add_listener(self, listener: Callable[[List[Dict[str, Any]]], Awaitable[None]]):
+        """Call ``listener`` with each batch of documents after it is written"""
+        self._listeners.append(listener)
+
+    async def _notify(self, inserted: List[Dict[str, Any]]):
+        if not inserted:
+            return
+        for listener in self._listeners:
+            try:
+                await listener(inserted)
+            except Exception:
+                # The documents are already stored; a listener failure must not replay them
+                logger.exception("Contact queue listener failed")
+
+    def _append(self, record: Dict[str, Any]):
+        self._spool.write(json_util.dumps(record) + "\n")
+        self._spool.flush()
+        if self.fsync:
+            os.fsync(self._spool.fileno())
+
+    def _compact(self):
+        """Rewrite the spool with just the pending submissions once it is empty or too large"""
+        if self._pending and self._spool.tell() < self.compact_bytes:
+            return
+        if not self._pending:
+            self._spool.truncate(0)
+            self._spool.seek(0)
+            return
+        tmp_path = self._spool_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as tmp:
+            for doc in self._pending.values():
+                tmp.write(json_util.dumps({"op": "add", "doc": doc}) + "\n")
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        self._spool.close()
+        os.replace(tmp_path, self._spool_path)
+        self._spool = open(self._spool_path, "a", encoding="utf-8")
+
+    def _adopt(self, lock_path: Path):
+        """Take over the spool of a process that no longer holds its lock"""
+        with open(lock_path, "a") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return  # still owned by a live worker
+            spool_path = lock_path.with_suffix(".log")
+            adopted = self._read_spool(spool_path)
+            for contact_id, doc in adopted.items():
+                if contact_id not in self._pending:
+                    self._append({"op": "add", "doc": doc})
+                    self._pending[contact_id] = doc
+            spool_path.unlink(missing_ok=True)
+            lock_path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _read_spool(path: Path) -> "OrderedDict[str, Dict[str, Any]]":
+        pending: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        if not path.exists():
+            return pending
+        with open(path, encoding="utf-8") as spool:
+            for line in spool:
+                try:
+                    record = json_util.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-write; it was never acknowledged
+                    continue
+                if record["op"] == "add":
+                    pending[record["doc"]["id"]] = record["doc"]
+                else:
+                    for contact_id in record["ids"]:
+                        pending.pop(contact_id, None)
+        return pending
+
+
+contact_queue = ContactQueue.from_env(Path(__file__).parent / "spool")
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Generic, TypeVar
 from datetime import datetime
 import uuid
 
@@ -43,6 +43,8 @@ class PortfolioItem(BaseModel):
     project_url: Optional[str] = None
     is_featured: bool = False
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: Optional[datetime] = None
+    version: int = 1
 
 # Testimonial Models
 class TestimonialCreate(BaseModel):
@@ -63,6 +65,8 @@ class Testimonial(BaseModel):
     avatar_url: Optional[str] = None
     is_featured: bool = False
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: Optional[datetime] = None
+    version: int = 1
 
 # Service Models
 class ServiceCreate(BaseModel):
@@ -82,6 +86,8 @@ class Service(BaseModel):
     price: str
     is_active: bool = True
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: Optional[datetime] = None
+    version: int = 1
 
 # Experience Models
 class ExperienceCreate(BaseModel):
@@ -100,6 +106,8 @@ class Experience(BaseModel):
     achievements: List[str]
     order: int = 0
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: Optional[datetime] = None
+    version: int = 1
 
 # Skills Models
 class SkillCreate(BaseModel):
@@ -113,6 +121,8 @@ class Skill(BaseModel):
     level: int
     category: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: Optional[datetime] = None
+    version: int = 1
 
 # Stats Models
 class StatsUpdate(BaseModel):
@@ -129,6 +139,13 @@ class Stats(BaseModel):
     projects_completed: int
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
+class StatsHistoryPoint(BaseModel):
+    bucket_start: datetime  # first day of the month
+    value: int  # last value recorded in the month
+    min: int
+    max: int
+    samples: int
+
 # Response Models
 class MessageResponse(BaseModel):
     message: str
@@ -137,4 +154,67 @@ class MessageResponse(BaseModel):
 class ContactResponse(BaseModel):
     message: str
     contact_id: str
-    success: bool = True
\ No newline at end of file
+    success: bool = True
+
+class TimelineBucket(BaseModel):
+    bucket: str  # 2024-05-01 for days, 2024-W18 for ISO weeks
+    count: int
+
+class ContactAnalytics(BaseModel):
+    source: str  # live or rollup
+    total: int
+    by_status: Dict[str, int]
+    by_service: Dict[str, int]
+    by_company: Dict[str, int]
+    timeline: List[TimelineBucket]
+
+class ImportRowError(BaseModel):
+    row: int  # 1-based data row, not counting a CSV header
+    error: str
+
+class ContactImportResult(BaseModel):
+    imported: int = 0
+    failed: int = 0
+    errors: List[ImportRowError] = []  # the first failures only
+
+# Bulk Models
+CreateT = TypeVar("CreateT", bound=BaseModel)
+
+class BulkUpdateItem(BaseModel, Generic[CreateT]):
+    id: str
+    data: CreateT
+    version: Optional[int] = None  # expected current version, like If-Match
+
+class BulkRequest(BaseModel, Generic[CreateT]):
+    create: List[CreateT] = Field(default_factory=list, max_length=1000)
+    update: List[BulkUpdateItem[CreateT]] = Field(default_factory=list, max_length=1000)
+    delete: List[str] = Field(default_factory=list, max_length=1000)
+
+class BulkItemResult(BaseModel):
+    op: str  # create, update, delete
+    index: int
+    id: Optional[str] = None
+    success: bool = True
+    error: Optional[str] = None
+
+class BulkResponse(BaseModel):
+    created: int = 0
+    updated: int = 0
+    deleted: int = 0
+    failed: int = 0
+    results: List[BulkItemResult] = []
+
+# Search Models
+class SearchHit(BaseModel):
+    collection: str  # portfolio, services, testimonials, experience
+    id: str
+    title: str
+    score: float
+    field: str  # field the snippet was taken from
+    snippet: str  # HTML-escaped, matches wrapped in <mark>
+
+class SearchResponse(BaseModel):
+    query: str
+    total: int
+    took_ms: float
+    results: List[SearchHit] = []
@@ -0,0 +1,173 @@
+import base64
+import binascii
+import logging
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Generic, List, Literal, Optional, Tuple, TypeVar
+
+from bson import json_util
+from fastapi import HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from cache import CacheKey
+from http_cache import cached_json_response
+from repository import Repository
+from serialization import ModelCodec, dumps
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Sort specs always end with the unique `id` so keyset positions are unambiguous
+SortSpec = List[Tuple[str, int]]
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+STREAM_BATCH_SIZE = 200
+# Ceiling for the bare-array form of a list endpoint; bigger result sets page or stream
+MAX_LIST_SIZE = MAX_PAGE_SIZE
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# What a sort field can hold; anything else in a cursor (a dict like {"$ne": null}) would act as a query operator
+CURSOR_VALUE_TYPES = (str, int, float, bool, datetime, type(None))
+
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+
+class CappedList(list):
+    """The bare-array form of a list cut at MAX_LIST_SIZE rows.
+
+    Served with an ``X-Next-Cursor`` header, so clients can tell the list
+    is incomplete and continue it with ``?cursor=``.
+    """
+
+    def __init__(self, items: List[Any], next_cursor: str):
+        super().__init__(items)
+        self.next_cursor = next_cursor
+
+    @property
+    def response_headers(self) -> dict:
+        return {NEXT_CURSOR_HEADER: self.next_cursor}
+
+
+class PageParams:
+    """Common query parameters for list endpoints.
+
+    Without ``limit`` or ``cursor`` a list endpoint keeps returning a bare JSON
+    array of at most MAX_LIST_SIZE rows; with either it returns a ``Page``.
+    ``format=ndjson`` streams every row.
+    """
+
+    def __init__(
+        self,
+        limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+        cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+        format: Literal["json", "ndjson"] = Query("json", description="ndjson streams every matching row"),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.format = format
+
+    @property
+    def paginated(self) -> bool:
+        return self.limit is not None or self.cursor is not None
+
+
+def encode_cursor(doc: dict, sort: SortSpec) -> str:
+    values = [doc.get(field) for field, _ in sort]
+    return base64.urlsafe_b64encode(json_util.dumps(values).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: SortSpec) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json_util.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(sort):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    for (field, _), value in zip(sort, values):
+        if not isinstance(value, CURSOR_VALUE_TYPES) or (field == "id" and not isinstance(value, str)):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def _after(field: str, direction: int, value: Any) -> Optional[dict]:
+    # Missing values sort lowest: every set value follows them ascending, nothing does descending
+    if value is None:
+        return {field: {"$ne": None}} if direction == 1 else None
+    if direction == 1:
+        return {field: {"$gt": value}}
+    # Descending, missing values follow every set value, but $lt never matches them
+    return {"$or": [{field: {"$lt": value}}, {field: None}]}
+
+
+def keyset_filter(query: dict, sort: SortSpec, values: list) -> dict:
+    """Restrict ``query`` to documents strictly after ``values`` in ``sort`` order"""
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        after = _after(field, direction, values[i])
+        if after is None:
+            continue
+        clause = {prefix: values[j] for j, (prefix, _) in enumerate(sort[:i])}
+        clause.update(after)
+        clauses.append(clause)
+    keyset = {"$or": clauses} if clauses else {"id": {"$in": []}}
+    return {"$and": [query, keyset]} if query else keyset
+
+
+async def fetch_page(collection: Repository, query: dict, sort: SortSpec,
+                     codec: ModelCodec, limit: Optional[int], cursor: Optional[str]) -> dict:
+    """Load one keyset page as a ``Page``-shaped dict"""
+    limit = limit or DEFAULT_PAGE_SIZE
+    if cursor:
+        query = keyset_filter(query, sort, decode_cursor(cursor, sort))
+    # Sort fields are needed for the cursor even when the fieldset leaves them out
+    projection = {**codec.projection, **{field: 1 for field, _ in sort}}
+    # Fetch one extra row to learn whether another page exists
+    docs = await collection.find(query, sort, limit + 1, projection)
+    next_cursor = encode_cursor(docs[limit - 1], sort) if len(docs) > limit else None
+    return {"items": codec.load_many(docs[:limit]), "next_cursor": next_cursor}
+
+
+async def fetch_list(collection: Repository, query: dict, sort: SortSpec, codec: ModelCodec) -> List[dict]:
+    """Load the bare-array form of a list, capped at MAX_LIST_SIZE rows"""
+    projection = {**codec.projection, **{field: 1 for field, _ in sort}}
+    docs = await collection.find(query, sort, MAX_LIST_SIZE + 1, projection)
+    if len(docs) > MAX_LIST_SIZE:
+        logger.warning("Unpaged %s list truncated to %d rows; page with limit/cursor or stream with format=ndjson",
+                       collection.name, MAX_LIST_SIZE)
+        return CappedList(codec.load_many(docs[:MAX_LIST_SIZE]), encode_cursor(docs[MAX_LIST_SIZE - 1], sort))
+    return codec.load_many(docs)
+
+
+async def _ndjson_rows(collection: Repository, query: dict, sort: SortSpec,
+                       codec: ModelCodec, limit: Optional[int]) -> AsyncIterator[bytes]:
+    async for doc in collection.iterate(query, sort, limit, codec.projection, STREAM_BATCH_SIZE):
+        yield dumps(codec.load(doc)) + b"\n"
+
+
+def ndjson_response(collection: Repository, query: dict, sort: SortSpec,
+                    codec: ModelCodec, limit: Optional[int] = None, cursor: Optional[str] = None) -> StreamingResponse:
+    """Stream matching rows as newline-delimited JSON straight off the repository cursor"""
+    if cursor:
+        query = keyset_filter(query, sort, decode_cursor(cursor, sort))
+    return StreamingResponse(_ndjson_rows(collection, query, sort, codec, limit), media_type="application/x-ndjson")
+
+
+async def list_response(request: Request, page: PageParams, key: CacheKey, collection: Repository,
+                        query: dict, sort: SortSpec, codec: ModelCodec,
+                        fetch_all: Callable[[], Awaitable[List[Any]]]) -> Response:
+    """Dispatch a list endpoint to streaming, keyset paging or the cached bare list"""
+    key = key + codec.key_suffix
+    if page.format == "ndjson":
+        return ndjson_response(collection, query, sort, codec, page.limit, page.cursor)
+    if page.paginated:
+        return await cached_json_response(
+            request,
+            key + ("page", page.limit, page.cursor),
+            lambda: fetch_page(collection, query, sort, codec, page.limit, page.cursor)
+        )
+    return await cached_json_response(request, key, fetch_all)
@@ -0,0 +1,281 @@
+import os
+import re
+import math
+import time
+import hashlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+# Buckets and markers of the shared backend; documents expire through a TTL index on expires_at
+RATE_LIMIT_COLLECTION = "rate_limits"
+# "mongo" shares buckets between workers and across restarts; "memory" limits each worker on its own
+SHARED_BACKEND = os.environ.get("RATE_LIMIT_BACKEND", "memory").lower() == "mongo"
+
+
+class BucketLimit(NamedTuple):
+    capacity: float  # burst size
+    per_second: float  # refill rate
+
+    @classmethod
+    def per(cls, count: float, seconds: float, burst: Optional[float] = None) -> "BucketLimit":
+        return cls(capacity=burst if burst is not None else count, per_second=count / seconds)
+
+
+class RateLimitBackend(ABC):
+    """Storage for token buckets and duplicate markers.
+
+    The in-memory backend limits each worker on its own; a shared backend
+    (MongoDB here, or Redis, Memcached, ...) implements the same calls so
+    every worker draws from the same buckets.
+    """
+
+    @abstractmethod
+    async def take(self, key: str, limit: BucketLimit, cost: float = 1.0) -> Tuple[bool, float]:
+        """Take ``cost`` tokens from ``key``'s bucket; returns (allowed, seconds until allowed)"""
+
+    @abstractmethod
+    async def refund(self, key: str, limit: BucketLimit, cost: float = 1.0):
+        """Give back tokens taken for a request that was rejected further on"""
+
+    @abstractmethod
+    async def add_if_absent(self, key: str, ttl_seconds: float) -> bool:
+        """Mark ``key`` for ``ttl_seconds``; False if it was already marked"""
+
+    @abstractmethod
+    async def discard(self, key: str):
+        """Remove a marker set by ``add_if_absent``"""
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Process-local backend; also serves as the fake for exercising the limiter.
+
+    Buckets that have refilled and markers that have expired are swept every
+    ``prune_interval`` seconds. Past ``max_keys`` entries the least recently
+    used one is evicted, which at worst forgets a throttled client early.
+    """
+
+    def __init__(self, max_keys: int = 100000, clock=time.monotonic, prune_interval: float = 60.0):
+        self.max_keys = max_keys
+        self.prune_interval = prune_interval
+        self._clock = clock
+        # Both kept in least recently used order
+        self._buckets: "OrderedDict[str, Tuple[float, float, float]]" = OrderedDict()  # key -> (tokens, updated_at, full_at)
+        self._markers: "OrderedDict[str, float]" = OrderedDict()  # key -> expires_at
+        self._next_prune = clock() + prune_interval
+
+    async def take(self, key: str, limit: BucketLimit, cost: float = 1.0) -> Tuple[bool, float]:
+        now = self._clock()
+        self._prune(now)
+        tokens, updated_at, _ = self._buckets.get(key, (limit.capacity, now, now))
+        tokens = min(limit.capacity, tokens + (now - updated_at) * limit.per_second)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        # Each bucket records when it is full again, after which it is the same as no bucket at all
+        self._store(self._buckets, key, (tokens, now, now + (limit.capacity - tokens) / limit.per_second))
+        if allowed:
+            return True, 0.0
+        return False, (cost - tokens) / limit.per_second
+
+    async def refund(self, key: str, limit: BucketLimit, cost: float = 1.0):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return
+        tokens, updated_at, _ = bucket
+        tokens = min(limit.capacity, tokens + cost)
+        self._buckets[key] = (tokens, updated_at, updated_at + (limit.capacity - tokens) / limit.per_second)
+
+    async def add_if_absent(self, key: str, ttl_seconds: float) -> bool:
+        now = self._clock()
+        self._prune(now)
+        expires_at = self._markers.get(key)
+        if expires_at is not None and expires_at > now:
+            return False
+        self._store(self._markers, key, now + ttl_seconds)
+        return True
+
+    async def discard(self, key: str):
+        self._markers.pop(key, None)
+
+    def _store(self, entries: OrderedDict, key: str, value):
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.max_keys:
+            entries.popitem(last=False)
+
+    def _prune(self, now: float):
+        if now < self._next_prune:
+            return
+        self._next_prune = now + self.prune_interval
+        self._buckets = OrderedDict((k, v) for k, v in self._buckets.items() if v[2] > now)
+        self._markers = OrderedDict((k, v) for k, v in self._markers.items() if v > now)
+
+
+class MongoRateLimitBackend(RateLimitBackend):
+    """Buckets and markers in a MongoDB collection shared by every worker.
+
+    Each bucket is refilled and drawn from in one pipeline update, so
+    concurrent requests can't both spend the last token. Documents carry an
+    ``expires_at`` for the TTL index: a bucket once it would have refilled
+    from empty, a marker once its window has passed. The TTL monitor runs
+    about once a minute, so expiry is also checked on read.
+    """
+
+    def __init__(self, collection: AsyncIOMotorCollection, clock=time.time):
+        self.collection = collection
+        self._clock = clock
+
+    @staticmethod
+    def _expiry(at: float) -> datetime:
+        return datetime.fromtimestamp(at, timezone.utc)
+
+    async def take(self, key: str, limit: BucketLimit, cost: float = 1.0) -> Tuple[bool, float]:
+        now = self._clock()
+        refilled = {"$add": [
+            {"$ifNull": ["$tokens", limit.capacity]},
+            {"$multiply": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, limit.per_second]},
+        ]}
+        bucket = await self.collection.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {
+                    "tokens": {"$min": [limit.capacity, refilled]},
+                    "updated_at": now,
+                    "expires_at": self._expiry(now + limit.capacity / limit.per_second),
+                }},
+                {"$set": {"allowed": {"$gte": ["$tokens", cost]}}},
+                {"$set": {"tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", cost]}, "$tokens"]}}},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        if bucket["allowed"]:
+            return True, 0.0
+        return False, (cost - bucket["tokens"]) / limit.per_second
+
+    async def refund(self, key: str, limit: BucketLimit, cost: float = 1.0):
+        await self.collection.update_one(
+            {"_id": key},
+            [{"$set": {"tokens": {"$min": [limit.capacity, {"$add": ["$tokens", cost]}]}}}],
+        )
+
+    async def add_if_absent(self, key: str, ttl_seconds: float) -> bool:
+        now = self._clock()
+        marker = {"until": now + ttl_seconds, "expires_at": self._expiry(now + ttl_seconds)}
+        try:
+            await self.collection.insert_one({"_id": key, **marker})
+            return True
+        except DuplicateKeyError:
+            # Still there: either marked, or expired and not yet swept by the TTL monitor
+            result = await self.collection.update_one({"_id": key, "until": {"$lte": now}}, {"$set": marker})
+            return result.modified_count == 1
+
+    async def discard(self, key: str):
+        await self.collection.delete_one({"_id": key})
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def submission_fingerprint(email: str, message: str) -> str:
+    normalized = email.strip().lower() + "\0" + _WHITESPACE.sub(" ", message).strip().lower()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class ContactGuard:
+    """Token buckets per client IP and per email, plus duplicate suppression.
+
+    ``check`` raises 429 when either bucket is empty and 409 when the same
+    email sent the same message within ``dedup_window`` seconds.
+    """
+
+    def __init__(self, backend: RateLimitBackend, ip_limit: BucketLimit, email_limit: BucketLimit,
+                 dedup_window: float = 600.0, proxy_hops: int = 0, enabled: bool = True):
+        self.backend = backend
+        self.ip_limit = ip_limit
+        self.email_limit = email_limit
+        self.dedup_window = dedup_window
+        self.proxy_hops = proxy_hops
+        self.enabled = enabled
+        self.allowed = 0
+        self.limited = 0
+        self.duplicates = 0
+
+    @classmethod
+    def from_env(cls, backend: Optional[RateLimitBackend] = None) -> "ContactGuard":
+        return cls(
+            backend=backend or MemoryRateLimitBackend(),
+            ip_limit=BucketLimit.per(
+                float(os.environ.get("RATE_LIMIT_IP_PER_MINUTE", 10)), 60,
+                float(os.environ.get("RATE_LIMIT_IP_BURST", 5))
+            ),
+            email_limit=BucketLimit.per(
+                float(os.environ.get("RATE_LIMIT_EMAIL_PER_HOUR", 5)), 3600,
+                float(os.environ.get("RATE_LIMIT_EMAIL_BURST", 3))
+            ),
+            dedup_window=float(os.environ.get("CONTACT_DEDUP_WINDOW_SECONDS", 600)),
+            proxy_hops=int(os.environ.get("RATE_LIMIT_PROXY_HOPS", 0)),
+            enabled=os.environ.get("RATE_LIMIT_ENABLED", "true").lower() == "true",
+        )
+
+    def client_ip(self, request: Request) -> str:
+        """Client address, taken from X-Forwarded-For only behind ``proxy_hops`` trusted proxies"""
+        if self.proxy_hops:
+            forwarded = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+            if len(forwarded) >= self.proxy_hops:
+                return forwarded[-self.proxy_hops]
+        return request.client.host if request.client else "unknown"
+
+    async def check(self, request: Request, email: str, message: str) -> Optional[str]:
+        """Admit one submission; returns the dedup key to ``release`` if it later fails"""
+        if not self.enabled:
+            return None
+        taken = []
+        for key, limit in (
+            (f"ip:{self.client_ip(request)}", self.ip_limit),
+            (f"email:{email.strip().lower()}", self.email_limit),
+        ):
+            allowed, retry_after = await self.backend.take(key, limit)
+            if not allowed:
+                self.limited += 1
+                await self._refund(taken)
+                raise HTTPException(status_code=429, detail="Too many submissions, please try again later",
+                                    headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+            taken.append((key, limit))
+
+        dedup_key = f"dedup:{submission_fingerprint(email, message)}"
+        if not await self.backend.add_if_absent(dedup_key, self.dedup_window):
+            self.duplicates += 1
+            await self._refund(taken)
+            raise HTTPException(status_code=409, detail="This message was already submitted")
+        self.allowed += 1
+        return dedup_key
+
+    async def _refund(self, taken):
+        # A rejected submission only costs the bucket that rejected it
+        for key, limit in taken:
+            await self.backend.refund(key, limit)
+
+    async def release(self, dedup_key: Optional[str]):
+        """Let a submission that failed downstream be retried right away"""
+        if dedup_key is not None:
+            await self.backend.discard(dedup_key)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__,
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "duplicates": self.duplicates,
+        }
+
+
+contact_guard = ContactGuard.from_env()
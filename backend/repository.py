@@ -0,0 +1,528 @@
+"""Storage-neutral access to the app's collections.
+
+Routers read and write through a ``Repository`` per collection rather than
+Motor directly, so the same handlers run on MongoDB, in memory or on SQLite
+(see ``storage.py``). The interface covers what the routers issue: filtered
+and sorted finds with a limit, distinct, counts and by-id CRUD with the
+optimistic ``version`` counter.
+
+Filters use the MongoDB query subset the routers need: scalar field
+equality, ``$eq $ne $gt $gte $lt $lte $in $nin`` and ``$and``/``$or``.
+Missing fields read as null and sort lowest; comparisons only match values
+of the same type; ``distinct`` leaves nulls out.
+"""
+import asyncio
+import copy
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from pymongo import DeleteOne, InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from indexes import IndexSpec
+from versioning import INITIAL_VERSION, VersionConflict, version_filter, versioned_update
+
+SortSpec = Sequence[Tuple[str, int]]
+Projection = Optional[Dict[str, int]]
+
+COMPARISONS = ("$gt", "$gte", "$lt", "$lte")
+FIELD_OPERATORS = frozenset(("$eq", "$ne", "$in", "$nin") + COMPARISONS)
+
+
+class DuplicateKey(Exception):
+    """A write would break a unique index"""
+
+
+VERSION_CONFLICT = "Version conflict"
+
+
+class WriteOp(NamedTuple):
+    """One entry of an unordered ``apply_writes`` batch.
+
+    As in a MongoDB bulk write, updates and deletes whose id doesn't exist
+    are skipped rather than reported. An update whose ``expected_version``
+    no longer matches fails with VERSION_CONFLICT, so callers never count a
+    write that lost a race as applied.
+    """
+    op: str  # insert, update or delete
+    item_id: str
+    doc: Optional[Dict[str, Any]] = None  # insert: the document; update: the changes
+    expected_version: Optional[int] = None
+
+
+# ---------------------------------------------------------------------------
+# Query evaluation shared by the in-process backends
+
+
+def get_path(doc: Dict[str, Any], path: str) -> Any:
+    value: Any = doc
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _comparable(a: Any, b: Any) -> bool:
+    numbers = (int, float)
+    if isinstance(a, bool) or isinstance(b, bool):
+        return isinstance(a, bool) and isinstance(b, bool)
+    if isinstance(a, numbers) and isinstance(b, numbers):
+        return True
+    return type(a) is type(b)
+
+
+def _equals(value: Any, expected: Any) -> bool:
+    if isinstance(value, list) and not isinstance(expected, list):
+        return any(_equals(item, expected) for item in value)
+    if isinstance(value, bool) != isinstance(expected, bool):
+        return False
+    return value == expected
+
+
+def _compare(value: Any, operator: str, expected: Any) -> bool:
+    if isinstance(value, list):
+        return any(_compare(item, operator, expected) for item in value)
+    if value is None or expected is None or not _comparable(value, expected):
+        return False
+    if operator == "$gt":
+        return value > expected
+    if operator == "$gte":
+        return value >= expected
+    if operator == "$lt":
+        return value < expected
+    return value <= expected
+
+
+def _is_operator_dict(condition: Any) -> bool:
+    return isinstance(condition, dict) and bool(condition) and all(key.startswith("$") for key in condition)
+
+
+def _field_matches(value: Any, condition: Any) -> bool:
+    if not _is_operator_dict(condition):
+        return _equals(value, condition)
+    for operator, argument in condition.items():
+        if operator not in FIELD_OPERATORS:
+            raise ValueError(f"Unsupported query operator: {operator}")
+        if operator == "$eq" and not _equals(value, argument):
+            return False
+        if operator == "$ne" and _equals(value, argument):
+            return False
+        if operator == "$in" and not any(_equals(value, item) for item in argument):
+            return False
+        if operator == "$nin" and any(_equals(value, item) for item in argument):
+            return False
+        if operator in COMPARISONS and not _compare(value, operator, argument):
+            return False
+    return True
+
+
+def matches(doc: Dict[str, Any], query: Optional[Dict[str, Any]]) -> bool:
+    for key, condition in (query or {}).items():
+        if key == "$and":
+            if not all(matches(doc, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(doc, clause) for clause in condition):
+                return False
+        elif key.startswith("$"):
+            raise ValueError(f"Unsupported query operator: {key}")
+        elif not _field_matches(get_path(doc, key), condition):
+            return False
+    return True
+
+
+# Cross-type ordering follows MongoDB: null < numbers < strings < objects < arrays < booleans < dates
+def _sort_key(value: Any) -> Tuple[int, Any]:
+    if value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (5, value)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    if isinstance(value, datetime):
+        return (6, value)
+    if isinstance(value, list):
+        return (4, repr(value))
+    return (3, repr(value))
+
+
+def sort_documents(docs: List[Dict[str, Any]], sort: Optional[SortSpec]) -> List[Dict[str, Any]]:
+    # Stable sorts from the last key to the first give a multi-key, mixed-direction order
+    for field, direction in reversed(list(sort or ())):
+        docs.sort(key=lambda doc: _sort_key(get_path(doc, field)), reverse=direction < 0)
+    return docs
+
+
+def project(doc: Dict[str, Any], projection: Projection) -> Dict[str, Any]:
+    """Apply an inclusion projection; ``_id`` is never returned"""
+    included = [field.split(".")[0] for field, flag in (projection or {}).items() if flag and field != "_id"]
+    if not included:
+        return {key: copy.deepcopy(value) for key, value in doc.items() if key != "_id"}
+    return {field: copy.deepcopy(doc[field]) for field in dict.fromkeys(included) if field in doc}
+
+
+def bson_precision(value: Any) -> Any:
+    """Copy ``value`` with datetimes cut to milliseconds, as MongoDB stores them"""
+    if isinstance(value, datetime):
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    if isinstance(value, dict):
+        return {key: bson_precision(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [bson_precision(item) for item in value]
+    return value
+
+
+def next_version(doc: Dict[str, Any]) -> int:
+    return (doc.get("version") or INITIAL_VERSION) + 1
+
+
+# ---------------------------------------------------------------------------
+# Interface
+
+
+class Repository(ABC):
+    """One collection of documents keyed by their string ``id``"""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    @abstractmethod
+    async def find(self, query: Optional[Dict[str, Any]] = None, sort: Optional[SortSpec] = None,
+                   limit: Optional[int] = None, projection: Projection = None) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def iterate(self, query: Optional[Dict[str, Any]] = None, sort: Optional[SortSpec] = None,
+                limit: Optional[int] = None, projection: Projection = None,
+                batch_size: int = 200) -> AsyncIterator[Dict[str, Any]]:
+        """Stream matching documents without holding them all in memory"""
+
+    async def find_one(self, query: Dict[str, Any], projection: Projection = None,
+                       sort: Optional[SortSpec] = None) -> Optional[Dict[str, Any]]:
+        docs = await self.find(query, sort, 1, projection)
+        return docs[0] if docs else None
+
+    async def get(self, item_id: str, projection: Projection = None) -> Optional[Dict[str, Any]]:
+        return await self.find_one({"id": item_id}, projection)
+
+    @abstractmethod
+    async def distinct(self, field: str, query: Optional[Dict[str, Any]] = None) -> List[Any]:
+        ...
+
+    @abstractmethod
+    async def count(self, query: Optional[Dict[str, Any]] = None, limit: Optional[int] = None) -> int:
+        ...
+
+    @abstractmethod
+    async def insert(self, doc: Dict[str, Any]):
+        """Insert one document; raises ``DuplicateKey``"""
+
+    @abstractmethod
+    async def update(self, item_id: str, changes: Dict[str, Any], expected_version: Optional[int] = None,
+                     projection: Projection = None, return_previous: bool = False) -> Optional[Dict[str, Any]]:
+        """Set ``changes`` and increment ``version`` in one atomic step.
+
+        Returns the post-image (or the pre-image with ``return_previous``), or
+        None when ``item_id`` doesn't exist. Raises ``VersionConflict`` when
+        ``expected_version`` is given and the stored version differs.
+        """
+
+    @abstractmethod
+    async def delete(self, item_id: str, projection: Projection = None) -> Optional[Dict[str, Any]]:
+        """Delete by id and return the removed document, or None"""
+
+    @abstractmethod
+    async def apply_writes(self, writes: List[WriteOp]) -> List[Optional[str]]:
+        """Apply an unordered batch; returns an error message or None per write"""
+
+    @abstractmethod
+    async def clear(self):
+        ...
+
+
+async def _check_conflict(repository: Repository, item_id: str, expected_version: Optional[int]):
+    # Only the failure path pays for telling "missing" apart from "stale"
+    if expected_version is not None and await repository.count({"id": item_id}, limit=1):
+        raise VersionConflict(item_id)
+
+
+# ---------------------------------------------------------------------------
+# MongoDB
+
+
+def _mongo_projection(projection: Projection) -> Dict[str, int]:
+    return {"_id": 0, **(projection or {})}
+
+
+class MongoRepository(Repository):
+    def __init__(self, collection: AsyncIOMotorCollection):
+        super().__init__(collection.name)
+        self.collection = collection
+
+    def _cursor(self, query, sort, limit, projection):
+        cursor = self.collection.find(query or {}, _mongo_projection(projection))
+        if sort:
+            cursor = cursor.sort(list(sort))
+        if limit:
+            cursor = cursor.limit(limit)
+        return cursor
+
+    async def find(self, query=None, sort=None, limit=None, projection=None):
+        return await self._cursor(query, sort, limit, projection).to_list(limit)
+
+    async def iterate(self, query=None, sort=None, limit=None, projection=None, batch_size=200):
+        async for doc in self._cursor(query, sort, limit, projection).batch_size(batch_size):
+            yield doc
+
+    async def find_one(self, query, projection=None, sort=None):
+        return await self.collection.find_one(query, _mongo_projection(projection), sort=list(sort) if sort else None)
+
+    async def distinct(self, field, query=None):
+        # Other backends leave nulls out, so callers can sort the values
+        return [value for value in await self.collection.distinct(field, query or {}) if value is not None]
+
+    async def count(self, query=None, limit=None):
+        options = {"limit": limit} if limit else {}
+        return await self.collection.count_documents(query or {}, **options)
+
+    async def insert(self, doc):
+        try:
+            await self.collection.insert_one(doc)
+        except DuplicateKeyError as e:
+            raise DuplicateKey(str(e))
+        finally:
+            # insert_one adds the ObjectId to the caller's dict
+            doc.pop("_id", None)
+
+    async def update(self, item_id, changes, expected_version=None, projection=None, return_previous=False):
+        query: Dict[str, Any] = {"id": item_id}
+        if expected_version is not None:
+            query["version"] = version_filter(expected_version)
+        doc = await self.collection.find_one_and_update(
+            query,
+            versioned_update(changes),
+            projection=_mongo_projection(projection),
+            return_document=ReturnDocument.BEFORE if return_previous else ReturnDocument.AFTER
+        )
+        if doc is None:
+            await _check_conflict(self, item_id, expected_version)
+        return doc
+
+    async def delete(self, item_id, projection=None):
+        return await self.collection.find_one_and_delete({"id": item_id}, projection=_mongo_projection(projection))
+
+    async def _versioned_update(self, write: WriteOp) -> Optional[str]:
+        query = {"id": write.item_id, "version": version_filter(write.expected_version)}
+        try:
+            result = await self.collection.update_one(query, versioned_update(write.doc))
+            if not result.matched_count:
+                await _check_conflict(self, write.item_id, write.expected_version)
+        except VersionConflict:
+            return VERSION_CONFLICT
+        except DuplicateKeyError as e:
+            return str(e)
+        return None
+
+    async def apply_writes(self, writes):
+        errors: List[Optional[str]] = [None] * len(writes)
+        ops = []
+        positions = []
+        versioned = []
+        for position, write in enumerate(writes):
+            if write.op == "update" and write.expected_version is not None:
+                # bulk_write only reports an aggregate matched count, so these go one by one
+                versioned.append((position, write))
+                continue
+            if write.op == "insert":
+                ops.append(InsertOne(dict(write.doc)))
+            elif write.op == "update":
+                ops.append(UpdateOne({"id": write.item_id}, versioned_update(write.doc)))
+            else:
+                ops.append(DeleteOne({"id": write.item_id}))
+            positions.append(position)
+
+        async def bulk():
+            if not ops:
+                return
+            # One unordered round trip; failures map back to their position
+            try:
+                await self.collection.bulk_write(ops, ordered=False)
+            except BulkWriteError as e:
+                for error in e.details.get("writeErrors", []):
+                    errors[positions[error["index"]]] = error.get("errmsg", "Write failed")
+
+        results = await asyncio.gather(bulk(), *(self._versioned_update(write) for _, write in versioned))
+        for (position, _), error in zip(versioned, results[1:]):
+            errors[position] = error
+        return errors
+
+    async def clear(self):
+        await self.collection.delete_many({})
+
+
+# ---------------------------------------------------------------------------
+# In memory
+
+
+class MemoryRepository(Repository):
+    """Documents in a dict with hash indexes on the leading field of each registered index.
+
+    Equality and ``$in`` filters on an indexed field read candidates from the
+    index instead of scanning; unique specs are enforced on insert and update.
+    Nothing is persisted.
+    """
+
+    def __init__(self, name: str, specs: Iterable[IndexSpec] = ()):
+        super().__init__(name)
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._unique: List[Tuple[str, ...]] = [
+            tuple(field for field, _ in spec.keys) for spec in specs if spec.unique and spec.keys[0][0] != "id"
+        ]
+        self._indexed: Set[str] = {spec.keys[0][0] for spec in specs} - {"id"}
+        # field -> hashable value -> ids
+        self._indexes: Dict[str, Dict[Any, Set[str]]] = {field: defaultdict(set) for field in self._indexed}
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _hashable(value: Any) -> Any:
+        return repr(value) if isinstance(value, (list, dict)) else (type(value) is bool, value)
+
+    def _index_keys(self, value: Any) -> List[Any]:
+        values = value if isinstance(value, list) else [value]
+        return [self._hashable(item) for item in values]
+
+    def _add(self, doc: Dict[str, Any]):
+        self._docs[doc["id"]] = doc
+        for field, index in self._indexes.items():
+            for key in self._index_keys(get_path(doc, field)):
+                index[key].add(doc["id"])
+
+    def _discard(self, doc: Dict[str, Any]):
+        del self._docs[doc["id"]]
+        for field, index in self._indexes.items():
+            for key in self._index_keys(get_path(doc, field)):
+                ids = index.get(key)
+                if ids is not None:
+                    ids.discard(doc["id"])
+                    if not ids:
+                        del index[key]
+
+    def _check_unique(self, doc: Dict[str, Any], ignore: Optional[str] = None):
+        for fields in self._unique:
+            values = tuple(get_path(doc, field) for field in fields)
+            for other in self._candidates({fields[0]: values[0]}):
+                if other["id"] != ignore and tuple(get_path(other, field) for field in fields) == values:
+                    raise DuplicateKey(f"{self.name}: duplicate {dict(zip(fields, values))}")
+
+    def _candidates(self, query: Optional[Dict[str, Any]]) -> Iterable[Dict[str, Any]]:
+        for field, condition in (query or {}).items():
+            if field == "id" and not _is_operator_dict(condition):
+                doc = self._docs.get(condition)
+                return [doc] if doc is not None else []
+            if field not in self._indexed:
+                continue
+            if not _is_operator_dict(condition):
+                keys = [self._hashable(condition)]
+            elif set(condition) == {"$in"}:
+                keys = [self._hashable(value) for value in condition["$in"]]
+            else:
+                continue
+            if any(isinstance(key, str) or key[1] is None for key in keys):
+                # Null matches missing fields, which the index doesn't hold
+                continue
+            ids = set().union(*(self._indexes[field].get(key, ()) for key in keys))
+            return [self._docs[item_id] for item_id in ids]
+        return list(self._docs.values())
+
+    def _select(self, query, sort, limit) -> List[Dict[str, Any]]:
+        docs = [doc for doc in self._candidates(query) if matches(doc, query)]
+        sort_documents(docs, sort)
+        return docs[:limit] if limit else docs
+
+    async def find(self, query=None, sort=None, limit=None, projection=None):
+        return [project(doc, projection) for doc in self._select(query, sort, limit)]
+
+    async def iterate(self, query=None, sort=None, limit=None, projection=None, batch_size=200):
+        for doc in self._select(query, sort, limit):
+            yield project(doc, projection)
+
+    async def distinct(self, field, query=None):
+        seen: Dict[Any, Any] = {}
+        for doc in self._select(query, None, None):
+            value = get_path(doc, field)
+            for item in (value if isinstance(value, list) else [value]):
+                if item is not None:
+                    seen.setdefault(self._hashable(item), item)
+        return list(seen.values())
+
+    async def count(self, query=None, limit=None):
+        total = len(self._select(query, None, None))
+        return min(total, limit) if limit else total
+
+    async def insert(self, doc):
+        async with self._lock:
+            self._insert(doc)
+
+    def _insert(self, doc: Dict[str, Any]):
+        if doc["id"] in self._docs:
+            raise DuplicateKey(f"{self.name}: duplicate id {doc['id']}")
+        stored = bson_precision({key: value for key, value in doc.items() if key != "_id"})
+        self._check_unique(stored)
+        self._add(stored)
+
+    def _update(self, item_id: str, changes: Dict[str, Any], expected_version: Optional[int]):
+        doc = self._docs.get(item_id)
+        if doc is None:
+            return None, None
+        if expected_version is not None and (doc.get("version") or INITIAL_VERSION) != expected_version:
+            raise VersionConflict(item_id)
+        updated = {**doc, **bson_precision(changes), "version": next_version(doc)}
+        self._check_unique(updated, ignore=item_id)
+        self._discard(doc)
+        self._add(updated)
+        return doc, updated
+
+    async def update(self, item_id, changes, expected_version=None, projection=None, return_previous=False):
+        async with self._lock:
+            before, after = self._update(item_id, changes, expected_version)
+        if after is None:
+            return None
+        return project(before if return_previous else after, projection)
+
+    async def delete(self, item_id, projection=None):
+        async with self._lock:
+            doc = self._docs.get(item_id)
+            if doc is None:
+                return None
+            self._discard(doc)
+        return project(doc, projection)
+
+    async def apply_writes(self, writes):
+        errors: List[Optional[str]] = []
+        async with self._lock:
+            for write in writes:
+                try:
+                    if write.op == "insert":
+                        self._insert(write.doc)
+                    elif write.op == "update":
+                        self._update(write.item_id, write.doc, write.expected_version)
+                    elif write.item_id in self._docs:
+                        self._discard(self._docs[write.item_id])
+                    errors.append(None)
+                except VersionConflict:
+                    errors.append(VERSION_CONFLICT)
+                except DuplicateKey as e:
+                    errors.append(str(e))
+        return errors
+
+    async def clear(self):
+        async with self._lock:
+            self._docs.clear()
+            for index in self._indexes.values():
+                index.clear()
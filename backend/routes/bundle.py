@@ -0,0 +1,86 @@
+from fastapi import APIRouter, HTTPException, Depends, Request
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+import asyncio
+
+from storage import Storage, get_storage
+from http_cache import cached_json_response, register_dependent
+from serialization import ModelCodec
+from routes.stats import fetch_stats, STATS_CODEC
+from routes.services import fetch_services, SERVICES_CODEC
+from routes.portfolio import fetch_portfolio_items, PORTFOLIO_CODEC
+from routes.testimonials import fetch_testimonials, TESTIMONIALS_CODEC
+from routes.experience import fetch_experience, EXPERIENCE_CODEC
+from routes.skills import fetch_skills, SKILLS_CODEC
+
+router = APIRouter()
+
+
+class Section(NamedTuple):
+    collection: str
+    codec: ModelCodec
+    fetch: Callable[[Storage], Awaitable[Any]]
+
+
+# Each section mirrors the query the homepage used to issue against its own endpoint
+SECTIONS: Dict[str, Section] = {
+    "stats": Section("stats", STATS_CODEC, fetch_stats),
+    "services": Section("services", SERVICES_CODEC, lambda store: fetch_services(store, active_only=True)),
+    "portfolio": Section("portfolio", PORTFOLIO_CODEC, lambda store: fetch_portfolio_items(store, featured_only=True)),
+    "testimonials": Section("testimonials", TESTIMONIALS_CODEC, lambda store: fetch_testimonials(store, featured_only=True)),
+    "experience": Section("experience", EXPERIENCE_CODEC, fetch_experience),
+    "skills": Section("skills", SKILLS_CODEC, fetch_skills),
+}
+
+register_dependent("bundle", {section.collection for section in SECTIONS.values()})
+
+
+def _select(value: Any, fields: Optional[Tuple[str, ...]]) -> Any:
+    if fields is None:
+        return value
+    if isinstance(value, list):
+        return [{name: row[name] for name in fields} for row in value]
+    return {name: value[name] for name in fields}
+
+
+def parse_bundle_params(request: Request, sections: Optional[str]) -> Dict[str, Optional[Tuple[str, ...]]]:
+    """Resolve ``sections=a,b`` and JSON:API style ``fields[section]=x,y`` parameters"""
+    names = [name.strip() for name in sections.split(",") if name.strip()] if sections else list(SECTIONS)
+    unknown = [name for name in names if name not in SECTIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown sections: {unknown}. Must be among: {list(SECTIONS)}")
+
+    selected = {}
+    for name in names:
+        raw = request.query_params.get(f"fields[{name}]")
+        if raw is None:
+            selected[name] = None
+            continue
+        fields = tuple(field.strip() for field in raw.split(",") if field.strip())
+        invalid = [field for field in fields if field not in SECTIONS[name].codec.fields]
+        if invalid or not fields:
+            raise HTTPException(status_code=400, detail=f"Invalid fields for {name}: {invalid or raw!r}")
+        selected[name] = fields
+    return selected
+
+
+async def fetch_bundle(store: Storage, selected: Dict[str, Optional[Tuple[str, ...]]]) -> Dict[str, Any]:
+    names = list(selected)
+    results = await asyncio.gather(*(SECTIONS[name].fetch(store) for name in names))
+    return {name: _select(result, selected[name]) for name, result in zip(names, results)}
+
+
+@router.get("/bundle", response_model=Dict[str, Any])
+async def get_bundle(request: Request, sections: Optional[str] = None, store: Storage = Depends(get_storage)):
+    """Get every homepage section in one cacheable document.
+
+    Use ``sections=stats,portfolio`` to pick sections and
+    ``fields[portfolio]=id,title`` to trim a section's rows.
+    """
+    try:
+        selected = parse_bundle_params(request, sections)
+        key = ("bundle", "list") + tuple(sorted(selected.items()))
+        return await cached_json_response(request, key, lambda: fetch_bundle(store, selected))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching bundle: {str(e)}")
@@ -1,89 +1,216 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Request, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional
 from datetime import datetime
-import os
-from motor.motor_asyncio import AsyncIOMotorClient
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
-from models import ContactForm, ContactFormCreate, ContactResponse, MessageResponse
+from models import ContactForm, ContactFormCreate, ContactResponse, ContactAnalytics, ContactImportResult, MessageResponse
+from storage import Storage, get_storage
+from pagination import Page, PageParams, fetch_page, ndjson_response
+from serialization import FastJSONResponse, ModelCodec
+from ingest import contact_queue, QueueFull
+from rate_limit import contact_guard
+from contact_analytics import INTERVALS, contact_rollups, live_analytics
+from contact_transfer import (CONTACT_STATUSES, EXPORTERS, MEDIA_TYPES, PARQUET_AVAILABLE, export_query,
+                              import_contacts, sniff_format)
 
 router = APIRouter()
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
-
 @router.post("/contact", response_model=ContactResponse)
-async def submit_contact_form(contact_data: ContactFormCreate):
+async def submit_contact_form(contact_data: ContactFormCreate, request: Request, store: Storage = Depends(get_storage)):
     """Submit contact form"""
+    # Throttle per IP and email and reject repeats before anything is spooled or written
+    dedup_key = await contact_guard.check(request, contact_data.email, contact_data.message)
     try:
         contact_dict = contact_data.dict()
         contact_obj = ContactForm(**contact_dict)
         
-        # Insert into database
-        result = await db.contacts.insert_one(contact_obj.dict())
-        
-        if result.inserted_id:
-            return ContactResponse(
-                message="Thank you for your message! I'll get back to you within 24 hours.",
-                contact_id=contact_obj.id,
-                success=True
-            )
+        if contact_queue.running:
+            # Spooled locally and written in batches; survives restarts
+            await contact_queue.submit(contact_obj.dict())
         else:
-            raise HTTPException(status_code=500, detail="Failed to submit contact form")
+            await store.contacts.insert(contact_obj.dict())
+            if store.mongo is not None:
+                await contact_rollups.record_inserted(store.mongo, [contact_obj.dict()])
+        
+        return ContactResponse(
+            message="Thank you for your message! I'll get back to you within 24 hours.",
+            contact_id=contact_obj.id,
+            success=True
+        )
             
+    except QueueFull:
+        await contact_guard.release(dedup_key)
+        raise HTTPException(status_code=503, detail="Too many submissions right now, please try again shortly",
+                            headers={"Retry-After": "5"})
+    except HTTPException:
+        await contact_guard.release(dedup_key)
+        raise
     except Exception as e:
+        await contact_guard.release(dedup_key)
         raise HTTPException(status_code=500, detail=f"Error submitting contact form: {str(e)}")
 
-@router.get("/contact", response_model=List[ContactForm])
-async def get_all_contacts():
-    """Get all contact form submissions (Admin only)"""
+CONTACTS_SORT = [("created_at", -1), ("id", -1)]
+CONTACTS_CODEC = ModelCodec(ContactForm)
+
+@router.get("/contact", response_model=Page[ContactForm])
+async def get_all_contacts(page: PageParams = Depends(), fields: Optional[str] = None, store: Storage = Depends(get_storage)):
+    """Get contact form submissions newest first, one page at a time (Admin only).
+
+    Contacts grow without bound, so this always returns a ``Page`` (50 rows
+    unless ``limit`` says otherwise). ``format=ndjson`` or ``/contact/export``
+    read the whole collection.
+    """
+    codec = CONTACTS_CODEC.select(fields)
     try:
-        contacts = await db.contacts.find().sort("created_at", -1).to_list(100)
-        return [ContactForm(**contact) for contact in contacts]
+        if page.format == "ndjson":
+            return ndjson_response(store.contacts, {}, CONTACTS_SORT, codec, page.limit, page.cursor)
+        return FastJSONResponse(await fetch_page(store.contacts, {}, CONTACTS_SORT, codec, page.limit, page.cursor))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching contacts: {str(e)}")
 
+@router.get("/contact/analytics", response_model=ContactAnalytics)
+async def get_contact_analytics(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    interval: str = "day",
+    top: int = Query(20, ge=1, le=100),
+    tz: str = "UTC",
+    live: bool = False,
+    store: Storage = Depends(get_storage)
+):
+    """Contact counts by status, service and company plus a day or week timeline (Admin only).
+
+    Served from the daily rollups when they are enabled (UTC days); pass
+    ``live=true`` or a non-UTC ``tz`` to aggregate the contacts directly.
+    """
+    if interval not in INTERVALS:
+        raise HTTPException(status_code=400, detail=f"Invalid interval. Must be one of: {list(INTERVALS)}")
+    try:
+        ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Invalid tz {tz!r}. Must be an IANA time zone such as Europe/Berlin")
+    if store.mongo is None:
+        raise HTTPException(status_code=501, detail=f"Contact analytics need MongoDB; storage backend is {store.backend}")
+    try:
+        if contact_rollups.enabled and not live and tz == "UTC":
+            return await contact_rollups.analytics(store.mongo, since, until, interval, top)
+        return await live_analytics(store.mongo, since, until, interval, top, tz)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing contact analytics: {str(e)}")
+
+@router.get("/contact/export")
+async def export_contacts(
+    format: str = "csv",
+    status: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    fields: Optional[str] = None,
+    store: Storage = Depends(get_storage)
+):
+    """Download every matching contact as CSV, NDJSON or Parquet (Admin only).
+
+    Rows stream newest first straight off the storage cursor, so there's no
+    row cap and the full result is never held in memory.
+    """
+    if format not in EXPORTERS:
+        raise HTTPException(status_code=400, detail=f"Invalid format. Must be one of: {list(EXPORTERS)}")
+    if status is not None and status not in CONTACT_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {CONTACT_STATUSES}")
+    if format == "parquet" and not PARQUET_AVAILABLE:
+        raise HTTPException(status_code=501, detail="Parquet export needs the pyarrow package")
+    codec = CONTACTS_CODEC.select(fields)
+    filename = f"contacts-{datetime.utcnow():%Y%m%d-%H%M%S}.{format}"
+    return StreamingResponse(
+        EXPORTERS[format](store.contacts, export_query(status, since, until), CONTACTS_SORT, codec),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.post("/contact/import", response_model=ContactImportResult)
+async def import_contacts_file(request: Request, format: Optional[str] = None, store: Storage = Depends(get_storage)):
+    """Bulk import contacts from a CSV, NDJSON or Parquet file sent as the request body (Admin only).
+
+    The format comes from ``format`` or the Content-Type. Every row is
+    validated like a contact form submission; ``id``, ``created_at`` and
+    ``status`` are kept when present, so an export imports back unchanged.
+    Invalid rows and existing ids are skipped and reported.
+    """
+    format = format or sniff_format(request.headers.get("content-type"))
+    if format not in EXPORTERS:
+        raise HTTPException(status_code=400, detail=f"Unknown format. Pass format= one of: {list(EXPORTERS)}")
+    if format == "parquet" and not PARQUET_AVAILABLE:
+        raise HTTPException(status_code=501, detail="Parquet import needs the pyarrow package")
+
+    async def record_inserted(contacts):
+        if store.mongo is not None:
+            await contact_rollups.record_inserted(store.mongo, contacts)
+
+    try:
+        return await import_contacts(store.contacts, request.stream(), format, record_inserted)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error importing contacts: {str(e)}")
+
 @router.get("/contact/{contact_id}", response_model=ContactForm)
-async def get_contact(contact_id: str):
+async def get_contact(contact_id: str, fields: Optional[str] = None, store: Storage = Depends(get_storage)):
     """Get specific contact form submission"""
+    codec = CONTACTS_CODEC.select(fields)
     try:
-        contact = await db.contacts.find_one({"id": contact_id})
+        contact = await store.contacts.get(contact_id, codec.projection) or contact_queue.pending(contact_id)
         if not contact:
             raise HTTPException(status_code=404, detail="Contact not found")
-        return ContactForm(**contact)
+        return FastJSONResponse(codec.load(contact))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching contact: {str(e)}")
 
 @router.put("/contact/{contact_id}/status", response_model=MessageResponse)
-async def update_contact_status(contact_id: str, status: str):
+async def update_contact_status(contact_id: str, status: str, store: Storage = Depends(get_storage)):
     """Update contact status"""
     try:
-        valid_statuses = ["new", "read", "replied"]
-        if status not in valid_statuses:
-            raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {valid_statuses}")
+        if status not in CONTACT_STATUSES:
+            raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {CONTACT_STATUSES}")
         
-        result = await db.contacts.update_one(
-            {"id": contact_id},
-            {"$set": {"status": status}}
+        # The pre-image tells the rollups which status bucket to move the contact from
+        before = await store.contacts.update(
+            contact_id,
+            {"status": status},
+            projection={"status": 1, "created_at": 1},
+            return_previous=True
         )
         
-        if result.matched_count == 0:
+        if before is None:
             raise HTTPException(status_code=404, detail="Contact not found")
+        if store.mongo is not None:
+            await contact_rollups.record_status_change(store.mongo, before, status)
         
         return MessageResponse(message=f"Contact status updated to {status}")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating contact status: {str(e)}")
 
 @router.delete("/contact/{contact_id}", response_model=MessageResponse)
-async def delete_contact(contact_id: str):
+async def delete_contact(contact_id: str, store: Storage = Depends(get_storage)):
     """Delete contact form submission"""
     try:
-        result = await db.contacts.delete_one({"id": contact_id})
+        deleted = await store.contacts.delete(
+            contact_id,
+            projection={"status": 1, "service": 1, "company": 1, "created_at": 1}
+        )
         
-        if result.deleted_count == 0:
+        if deleted is None:
             raise HTTPException(status_code=404, detail="Contact not found")
+        if store.mongo is not None:
+            await contact_rollups.record_deleted(store.mongo, deleted)
         
         return MessageResponse(message="Contact deleted successfully")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting contact: {str(e)}")
\ No newline at end of file
@@ -1,100 +1,134 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Header, Request
+from typing import List, Optional, Union
 from datetime import datetime
-import os
-from motor.motor_asyncio import AsyncIOMotorClient
 
-from models import Experience, ExperienceCreate, MessageResponse
+from models import Experience, ExperienceCreate, MessageResponse, BulkRequest, BulkResponse
+from storage import Storage, get_storage
+from http_cache import cached_json_response, mark_changed
+from pagination import Page, PageParams, fetch_list, list_response
+from serialization import ModelCodec
+from bulk import apply_bulk
+from search import search_index
+from versioning import parse_if_match, update_versioned
 
 router = APIRouter()
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+EXPERIENCE_SORT = [("order", 1), ("id", 1)]
+EXPERIENCE_CODEC = ModelCodec(Experience)
 
-@router.get("/experience", response_model=List[Experience])
-async def get_experience():
-    """Get all experience entries"""
+async def fetch_experience(store: Storage, codec: ModelCodec = EXPERIENCE_CODEC) -> List[dict]:
+    return await fetch_list(store.experience, {}, EXPERIENCE_SORT, codec)
+
+@router.get("/experience", response_model=Union[List[Experience], Page[Experience]])
+async def get_experience(request: Request, page: PageParams = Depends(), fields: Optional[str] = None, store: Storage = Depends(get_storage)):
+    """Get all experience entries with optional cursor pagination"""
+    codec = EXPERIENCE_CODEC.select(fields)
     try:
-        experience = await db.experience.find().sort("order", 1).to_list(100)
-        return [Experience(**exp) for exp in experience]
+        return await list_response(
+            request,
+            page,
+            ("experience", "list"),
+            store.experience,
+            {},
+            EXPERIENCE_SORT,
+            codec,
+            lambda: fetch_experience(store, codec=codec)
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching experience: {str(e)}")
 
 @router.get("/experience/{experience_id}", response_model=Experience)
-async def get_experience_item(experience_id: str):
+async def get_experience_item(request: Request, experience_id: str, fields: Optional[str] = None, store: Storage = Depends(get_storage)):
     """Get specific experience item"""
-    try:
-        experience = await db.experience.find_one({"id": experience_id})
+    codec = EXPERIENCE_CODEC.select(fields)
+    async def load():
+        experience = await store.experience.get(experience_id, codec.projection)
         if not experience:
             raise HTTPException(status_code=404, detail="Experience not found")
-        return Experience(**experience)
+        return codec.load(experience)
+    
+    try:
+        return await cached_json_response(request, ("experience", "detail", experience_id) + codec.key_suffix, load, document=True)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching experience: {str(e)}")
 
 @router.post("/experience", response_model=Experience)
-async def create_experience(experience_data: ExperienceCreate):
+async def create_experience(experience_data: ExperienceCreate, store: Storage = Depends(get_storage)):
     """Create new experience entry"""
     try:
         experience_dict = experience_data.dict()
         experience_obj = Experience(**experience_dict)
         
-        result = await db.experience.insert_one(experience_obj.dict())
+        await store.experience.insert(experience_obj.dict())
         
-        if result.inserted_id:
-            return experience_obj
-        else:
-            raise HTTPException(status_code=500, detail="Failed to create experience")
+        mark_changed("experience")
+        search_index.index_document("experience", experience_obj.dict())
+        return experience_obj
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating experience: {str(e)}")
 
+@router.post("/experience/bulk", response_model=BulkResponse)
+async def bulk_experience(payload: BulkRequest[ExperienceCreate], store: Storage = Depends(get_storage)):
+    """Create, update and delete experience entries in one batch"""
+    try:
+        return await apply_bulk(store.experience, payload, Experience)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error applying bulk experience changes: {str(e)}")
+
 @router.put("/experience/{experience_id}", response_model=Experience)
-async def update_experience(experience_id: str, experience_data: ExperienceCreate):
-    """Update experience entry"""
+async def update_experience(experience_id: str, experience_data: ExperienceCreate, if_match: Optional[str] = Header(None), store: Storage = Depends(get_storage)):
+    """Update experience; send If-Match with the current version to reject concurrent edits"""
     try:
         experience_dict = experience_data.dict()
         experience_dict["updated_at"] = datetime.utcnow()
         
-        result = await db.experience.update_one(
-            {"id": experience_id},
-            {"$set": experience_dict}
-        )
+        updated_experience = await update_versioned(store.experience, experience_id, experience_dict, parse_if_match(if_match), EXPERIENCE_CODEC.projection)
         
-        if result.matched_count == 0:
+        if updated_experience is None:
             raise HTTPException(status_code=404, detail="Experience not found")
+        mark_changed("experience", experience_id)
+        search_index.index_document("experience", updated_experience)
         
-        updated_experience = await db.experience.find_one({"id": experience_id})
-        return Experience(**updated_experience)
+        return EXPERIENCE_CODEC.load(updated_experience)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating experience: {str(e)}")
 
 @router.delete("/experience/{experience_id}", response_model=MessageResponse)
-async def delete_experience(experience_id: str):
+async def delete_experience(experience_id: str, store: Storage = Depends(get_storage)):
     """Delete experience entry"""
     try:
-        result = await db.experience.delete_one({"id": experience_id})
+        deleted = await store.experience.delete(experience_id, {"id": 1})
         
-        if result.deleted_count == 0:
+        if deleted is None:
             raise HTTPException(status_code=404, detail="Experience not found")
+        mark_changed("experience", experience_id)
+        search_index.remove("experience", experience_id)
         
         return MessageResponse(message="Experience deleted successfully")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting experience: {str(e)}")
 
 @router.put("/experience/{experience_id}/order", response_model=MessageResponse)
-async def update_experience_order(experience_id: str, order: int):
+async def update_experience_order(experience_id: str, order: int, store: Storage = Depends(get_storage)):
     """Update experience order"""
     try:
-        result = await db.experience.update_one(
-            {"id": experience_id},
-            {"$set": {"order": order}}
-        )
+        updated = await store.experience.update(experience_id, {"order": order, "updated_at": datetime.utcnow()}, projection={"id": 1})
         
-        if result.matched_count == 0:
+        if updated is None:
             raise HTTPException(status_code=404, detail="Experience not found")
+        mark_changed("experience", experience_id)
         
         return MessageResponse(message="Experience order updated successfully")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating experience order: {str(e)}")
\ No newline at end of file
@@ -1,99 +1,146 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Header, Request
+from typing import List, Optional, Union
 from datetime import datetime
-import os
-from motor.motor_asyncio import AsyncIOMotorClient
 
-from models import PortfolioItem, PortfolioItemCreate, MessageResponse
+from models import PortfolioItem, PortfolioItemCreate, MessageResponse, BulkRequest, BulkResponse
+from storage import Storage, get_storage
+from http_cache import cached_json_response, mark_changed
+from pagination import Page, PageParams, fetch_list, list_response
+from serialization import ModelCodec
+from bulk import apply_bulk
+from search import search_index
+from versioning import parse_if_match, update_versioned
 
 router = APIRouter()
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+PORTFOLIO_SORT = [("created_at", -1), ("id", -1)]
+PORTFOLIO_CODEC = ModelCodec(PortfolioItem)
 
-@router.get("/portfolio", response_model=List[PortfolioItem])
-async def get_portfolio_items(category: Optional[str] = None, featured_only: bool = False):
-    """Get portfolio items with optional filtering"""
+def portfolio_query(category: Optional[str] = None, featured_only: bool = False) -> dict:
+    query = {}
+    if category and category != "All":
+        query["category"] = category
+    if featured_only:
+        query["is_featured"] = True
+    return query
+
+async def fetch_portfolio_items(store: Storage, category: Optional[str] = None, featured_only: bool = False, codec: ModelCodec = PORTFOLIO_CODEC) -> List[dict]:
+    return await fetch_list(store.portfolio, portfolio_query(category, featured_only), PORTFOLIO_SORT, codec)
+
+async def fetch_portfolio_categories(store: Storage) -> List[str]:
+    categories = await store.portfolio.distinct("category")
+    return sorted(categories)
+
+@router.get("/portfolio", response_model=Union[List[PortfolioItem], Page[PortfolioItem]])
+async def get_portfolio_items(request: Request, category: Optional[str] = None, featured_only: bool = False, page: PageParams = Depends(), fields: Optional[str] = None, store: Storage = Depends(get_storage)):
+    """Get portfolio items with optional filtering and cursor pagination"""
+    codec = PORTFOLIO_CODEC.select(fields)
     try:
-        query = {}
-        if category and category != "All":
-            query["category"] = category
-        if featured_only:
-            query["is_featured"] = True
-        
-        items = await db.portfolio.find(query).sort("created_at", -1).to_list(100)
-        return [PortfolioItem(**item) for item in items]
+        if category == "All":
+            category = None
+        return await list_response(
+            request,
+            page,
+            ("portfolio", "list", category, featured_only),
+            store.portfolio,
+            portfolio_query(category, featured_only),
+            PORTFOLIO_SORT,
+            codec,
+            lambda: fetch_portfolio_items(store, category, featured_only, codec=codec)
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching portfolio items: {str(e)}")
 
 @router.get("/portfolio/categories", response_model=List[str])
-async def get_portfolio_categories():
+async def get_portfolio_categories(request: Request, store: Storage = Depends(get_storage)):
     """Get all unique portfolio categories"""
     try:
-        categories = await db.portfolio.distinct("category")
-        return sorted(categories)
+        return await cached_json_response(
+            request,
+            ("portfolio", "categories"),
+            lambda: fetch_portfolio_categories(store)
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching categories: {str(e)}")
 
 @router.get("/portfolio/{item_id}", response_model=PortfolioItem)
-async def get_portfolio_item(item_id: str):
+async def get_portfolio_item(request: Request, item_id: str, fields: Optional[str] = None, store: Storage = Depends(get_storage)):
     """Get specific portfolio item"""
-    try:
-        item = await db.portfolio.find_one({"id": item_id})
+    codec = PORTFOLIO_CODEC.select(fields)
+    async def load():
+        item = await store.portfolio.get(item_id, codec.projection)
         if not item:
             raise HTTPException(status_code=404, detail="Portfolio item not found")
-        return PortfolioItem(**item)
+        return codec.load(item)
+    
+    try:
+        return await cached_json_response(request, ("portfolio", "detail", item_id) + codec.key_suffix, load, document=True)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching portfolio item: {str(e)}")
 
 @router.post("/portfolio", response_model=PortfolioItem)
-async def create_portfolio_item(item_data: PortfolioItemCreate):
+async def create_portfolio_item(item_data: PortfolioItemCreate, store: Storage = Depends(get_storage)):
     """Create new portfolio item"""
     try:
         item_dict = item_data.dict()
         item_obj = PortfolioItem(**item_dict)
         
-        result = await db.portfolio.insert_one(item_obj.dict())
+        await store.portfolio.insert(item_obj.dict())
         
-        if result.inserted_id:
-            return item_obj
-        else:
-            raise HTTPException(status_code=500, detail="Failed to create portfolio item")
+        mark_changed("portfolio")
+        search_index.index_document("portfolio", item_obj.dict())
+        return item_obj
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating portfolio item: {str(e)}")
 
+@router.post("/portfolio/bulk", response_model=BulkResponse)
+async def bulk_portfolio_items(payload: BulkRequest[PortfolioItemCreate], store: Storage = Depends(get_storage)):
+    """Create, update and delete portfolio items in one batch"""
+    try:
+        return await apply_bulk(store.portfolio, payload, PortfolioItem)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error applying bulk portfolio changes: {str(e)}")
+
 @router.put("/portfolio/{item_id}", response_model=PortfolioItem)
-async def update_portfolio_item(item_id: str, item_data: PortfolioItemCreate):
-    """Update portfolio item"""
+async def update_portfolio_item(item_id: str, item_data: PortfolioItemCreate, if_match: Optional[str] = Header(None), store: Storage = Depends(get_storage)):
+    """Update portfolio item; send If-Match with the current version to reject concurrent edits"""
     try:
         item_dict = item_data.dict()
         item_dict["updated_at"] = datetime.utcnow()
         
-        result = await db.portfolio.update_one(
-            {"id": item_id},
-            {"$set": item_dict}
-        )
+        updated_item = await update_versioned(store.portfolio, item_id, item_dict, parse_if_match(if_match), PORTFOLIO_CODEC.projection)
         
-        if result.matched_count == 0:
+        if updated_item is None:
             raise HTTPException(status_code=404, detail="Portfolio item not found")
+        mark_changed("portfolio", item_id)
+        search_index.index_document("portfolio", updated_item)
         
-        updated_item = await db.portfolio.find_one({"id": item_id})
-        return PortfolioItem(**updated_item)
+        return PORTFOLIO_CODEC.load(updated_item)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating portfolio item: {str(e)}")
 
 @router.delete("/portfolio/{item_id}", response_model=MessageResponse)
-async def delete_portfolio_item(item_id: str):
+async def delete_portfolio_item(item_id: str, store: Storage = Depends(get_storage)):
     """Delete portfolio item"""
     try:
-        result = await db.portfolio.delete_one({"id": item_id})
+        deleted = await store.portfolio.delete(item_id, {"id": 1})
         
-        if result.deleted_count == 0:
+        if deleted is None:
             raise HTTPException(status_code=404, detail="Portfolio item not found")
+        mark_changed("portfolio", item_id)
+        search_index.remove("portfolio", item_id)
         
         return MessageResponse(message="Portfolio item deleted successfully")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting portfolio item: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+
+from models import SearchResponse
+from search import search_index, SEARCH_SOURCES
+
+router = APIRouter()
+
+@router.get("/search", response_model=SearchResponse)
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    type: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=50)
+):
+    """Search portfolio items, services, testimonials and experience.
+
+    Words also match as prefixes; ``type=portfolio,services`` restricts the
+    collections searched.
+    """
+    collections = None
+    if type:
+        collections = [name.strip() for name in type.split(",") if name.strip()]
+        unknown = [name for name in collections if name not in SEARCH_SOURCES]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown types: {unknown}. Must be among: {list(SEARCH_SOURCES)}")
+    return search_index.search(q, collections, limit)
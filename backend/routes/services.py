@@ -1,105 +1,141 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Header, Request
+from typing import List, Optional, Union
 from datetime import datetime
-import os
-from motor.motor_asyncio import AsyncIOMotorClient
 
-from models import Service, ServiceCreate, MessageResponse
+from models import Service, ServiceCreate, MessageResponse, BulkRequest, BulkResponse
+from storage import Storage, get_storage
+from http_cache import cached_json_response, mark_changed
+from pagination import Page, PageParams, fetch_list, list_response
+from serialization import ModelCodec
+from bulk import apply_bulk
+from search import search_index
+from versioning import parse_if_match, update_versioned
 
 router = APIRouter()
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+SERVICES_SORT = [("created_at", -1), ("id", -1)]
+SERVICES_CODEC = ModelCodec(Service)
 
-@router.get("/services", response_model=List[Service])
-async def get_services(active_only: bool = True):
-    """Get services with optional active filter"""
+def services_query(active_only: bool = True) -> dict:
+    query = {}
+    if active_only:
+        query["is_active"] = True
+    return query
+
+async def fetch_services(store: Storage, active_only: bool = True, codec: ModelCodec = SERVICES_CODEC) -> List[dict]:
+    return await fetch_list(store.services, services_query(active_only), SERVICES_SORT, codec)
+
+@router.get("/services", response_model=Union[List[Service], Page[Service]])
+async def get_services(request: Request, active_only: bool = True, page: PageParams = Depends(), fields: Optional[str] = None, store: Storage = Depends(get_storage)):
+    """Get services with optional active filter and cursor pagination"""
+    codec = SERVICES_CODEC.select(fields)
     try:
-        query = {}
-        if active_only:
-            query["is_active"] = True
-        
-        services = await db.services.find(query).sort("created_at", -1).to_list(100)
-        return [Service(**service) for service in services]
+        return await list_response(
+            request,
+            page,
+            ("services", "list", active_only),
+            store.services,
+            services_query(active_only),
+            SERVICES_SORT,
+            codec,
+            lambda: fetch_services(store, active_only, codec=codec)
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching services: {str(e)}")
 
 @router.get("/services/{service_id}", response_model=Service)
-async def get_service(service_id: str):
+async def get_service(request: Request, service_id: str, fields: Optional[str] = None, store: Storage = Depends(get_storage)):
     """Get specific service"""
-    try:
-        service = await db.services.find_one({"id": service_id})
+    codec = SERVICES_CODEC.select(fields)
+    async def load():
+        service = await store.services.get(service_id, codec.projection)
         if not service:
             raise HTTPException(status_code=404, detail="Service not found")
-        return Service(**service)
+        return codec.load(service)
+    
+    try:
+        return await cached_json_response(request, ("services", "detail", service_id) + codec.key_suffix, load, document=True)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching service: {str(e)}")
 
 @router.post("/services", response_model=Service)
-async def create_service(service_data: ServiceCreate):
+async def create_service(service_data: ServiceCreate, store: Storage = Depends(get_storage)):
     """Create new service"""
     try:
         service_dict = service_data.dict()
         service_obj = Service(**service_dict)
         
-        result = await db.services.insert_one(service_obj.dict())
+        await store.services.insert(service_obj.dict())
         
-        if result.inserted_id:
-            return service_obj
-        else:
-            raise HTTPException(status_code=500, detail="Failed to create service")
+        mark_changed("services")
+        search_index.index_document("services", service_obj.dict())
+        return service_obj
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating service: {str(e)}")
 
+@router.post("/services/bulk", response_model=BulkResponse)
+async def bulk_services(payload: BulkRequest[ServiceCreate], store: Storage = Depends(get_storage)):
+    """Create, update and delete services in one batch"""
+    try:
+        return await apply_bulk(store.services, payload, Service)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error applying bulk services changes: {str(e)}")
+
 @router.put("/services/{service_id}", response_model=Service)
-async def update_service(service_id: str, service_data: ServiceCreate):
-    """Update service"""
+async def update_service(service_id: str, service_data: ServiceCreate, if_match: Optional[str] = Header(None), store: Storage = Depends(get_storage)):
+    """Update service; send If-Match with the current version to reject concurrent edits"""
     try:
         service_dict = service_data.dict()
         service_dict["updated_at"] = datetime.utcnow()
         
-        result = await db.services.update_one(
-            {"id": service_id},
-            {"$set": service_dict}
-        )
+        updated_service = await update_versioned(store.services, service_id, service_dict, parse_if_match(if_match), SERVICES_CODEC.projection)
         
-        if result.matched_count == 0:
+        if updated_service is None:
             raise HTTPException(status_code=404, detail="Service not found")
+        mark_changed("services", service_id)
+        search_index.index_document("services", updated_service)
         
-        updated_service = await db.services.find_one({"id": service_id})
-        return Service(**updated_service)
+        return SERVICES_CODEC.load(updated_service)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating service: {str(e)}")
 
 @router.delete("/services/{service_id}", response_model=MessageResponse)
-async def delete_service(service_id: str):
+async def delete_service(service_id: str, store: Storage = Depends(get_storage)):
     """Delete service"""
     try:
-        result = await db.services.delete_one({"id": service_id})
+        deleted = await store.services.delete(service_id, {"id": 1})
         
-        if result.deleted_count == 0:
+        if deleted is None:
             raise HTTPException(status_code=404, detail="Service not found")
+        mark_changed("services", service_id)
+        search_index.remove("services", service_id)
         
         return MessageResponse(message="Service deleted successfully")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting service: {str(e)}")
 
 @router.put("/services/{service_id}/active", response_model=MessageResponse)
-async def toggle_service_active(service_id: str, is_active: bool):
+async def toggle_service_active(service_id: str, is_active: bool, store: Storage = Depends(get_storage)):
     """Toggle service active status"""
     try:
-        result = await db.services.update_one(
-            {"id": service_id},
-            {"$set": {"is_active": is_active}}
-        )
+        updated = await store.services.update(service_id, {"is_active": is_active, "updated_at": datetime.utcnow()}, projection={"id": 1})
         
-        if result.matched_count == 0:
+        if updated is None:
             raise HTTPException(status_code=404, detail="Service not found")
+        mark_changed("services", service_id)
         
         status = "activated" if is_active else "deactivated"
         return MessageResponse(message=f"Service {status} successfully")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating service: {str(e)}")
\ No newline at end of file
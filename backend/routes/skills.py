@@ -1,97 +1,138 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Header, Request
+from typing import List, Optional, Union
 from datetime import datetime
-import os
-from motor.motor_asyncio import AsyncIOMotorClient
 
-from models import Skill, SkillCreate, MessageResponse
+from models import Skill, SkillCreate, MessageResponse, BulkRequest, BulkResponse
+from storage import Storage, get_storage
+from http_cache import cached_json_response, mark_changed
+from pagination import Page, PageParams, fetch_list, list_response
+from serialization import ModelCodec
+from bulk import apply_bulk
+from versioning import parse_if_match, update_versioned
 
 router = APIRouter()
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+SKILLS_SORT = [("level", -1), ("id", -1)]
+SKILLS_CODEC = ModelCodec(Skill)
 
-@router.get("/skills", response_model=List[Skill])
-async def get_skills(category: str = None):
-    """Get all skills with optional category filter"""
+def skills_query(category: str = None) -> dict:
+    query = {}
+    if category:
+        query["category"] = category
+    return query
+
+async def fetch_skills(store: Storage, category: str = None, codec: ModelCodec = SKILLS_CODEC) -> List[dict]:
+    return await fetch_list(store.skills, skills_query(category), SKILLS_SORT, codec)
+
+async def fetch_skill_categories(store: Storage) -> List[str]:
+    categories = await store.skills.distinct("category")
+    return sorted(categories)
+
+@router.get("/skills", response_model=Union[List[Skill], Page[Skill]])
+async def get_skills(request: Request, category: str = None, page: PageParams = Depends(), fields: Optional[str] = None, store: Storage = Depends(get_storage)):
+    """Get all skills with optional category filter and cursor pagination"""
+    codec = SKILLS_CODEC.select(fields)
     try:
-        query = {}
-        if category:
-            query["category"] = category
-        
-        skills = await db.skills.find(query).sort("level", -1).to_list(100)
-        return [Skill(**skill) for skill in skills]
+        return await list_response(
+            request,
+            page,
+            ("skills", "list", category or None),
+            store.skills,
+            skills_query(category),
+            SKILLS_SORT,
+            codec,
+            lambda: fetch_skills(store, category, codec=codec)
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching skills: {str(e)}")
 
 @router.get("/skills/categories", response_model=List[str])
-async def get_skill_categories():
+async def get_skill_categories(request: Request, store: Storage = Depends(get_storage)):
     """Get all unique skill categories"""
     try:
-        categories = await db.skills.distinct("category")
-        return sorted(categories)
+        return await cached_json_response(
+            request,
+            ("skills", "categories"),
+            lambda: fetch_skill_categories(store)
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching categories: {str(e)}")
 
 @router.get("/skills/{skill_id}", response_model=Skill)
-async def get_skill(skill_id: str):
+async def get_skill(request: Request, skill_id: str, fields: Optional[str] = None, store: Storage = Depends(get_storage)):
     """Get specific skill"""
-    try:
-        skill = await db.skills.find_one({"id": skill_id})
+    codec = SKILLS_CODEC.select(fields)
+    async def load():
+        skill = await store.skills.get(skill_id, codec.projection)
         if not skill:
             raise HTTPException(status_code=404, detail="Skill not found")
-        return Skill(**skill)
+        return codec.load(skill)
+    
+    try:
+        return await cached_json_response(request, ("skills", "detail", skill_id) + codec.key_suffix, load, document=True)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching skill: {str(e)}")
 
 @router.post("/skills", response_model=Skill)
-async def create_skill(skill_data: SkillCreate):
+async def create_skill(skill_data: SkillCreate, store: Storage = Depends(get_storage)):
     """Create new skill"""
     try:
         skill_dict = skill_data.dict()
         skill_obj = Skill(**skill_dict)
         
-        result = await db.skills.insert_one(skill_obj.dict())
+        await store.skills.insert(skill_obj.dict())
         
-        if result.inserted_id:
-            return skill_obj
-        else:
-            raise HTTPException(status_code=500, detail="Failed to create skill")
+        mark_changed("skills")
+        return skill_obj
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating skill: {str(e)}")
 
+@router.post("/skills/bulk", response_model=BulkResponse)
+async def bulk_skills(payload: BulkRequest[SkillCreate], store: Storage = Depends(get_storage)):
+    """Create, update and delete skills in one batch"""
+    try:
+        return await apply_bulk(store.skills, payload, Skill)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error applying bulk skills changes: {str(e)}")
+
 @router.put("/skills/{skill_id}", response_model=Skill)
-async def update_skill(skill_id: str, skill_data: SkillCreate):
-    """Update skill"""
+async def update_skill(skill_id: str, skill_data: SkillCreate, if_match: Optional[str] = Header(None), store: Storage = Depends(get_storage)):
+    """Update skill; send If-Match with the current version to reject concurrent edits"""
     try:
         skill_dict = skill_data.dict()
         skill_dict["updated_at"] = datetime.utcnow()
         
-        result = await db.skills.update_one(
-            {"id": skill_id},
-            {"$set": skill_dict}
-        )
+        updated_skill = await update_versioned(store.skills, skill_id, skill_dict, parse_if_match(if_match), SKILLS_CODEC.projection)
         
-        if result.matched_count == 0:
+        if updated_skill is None:
             raise HTTPException(status_code=404, detail="Skill not found")
+        mark_changed("skills", skill_id)
         
-        updated_skill = await db.skills.find_one({"id": skill_id})
-        return Skill(**updated_skill)
+        return SKILLS_CODEC.load(updated_skill)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating skill: {str(e)}")
 
 @router.delete("/skills/{skill_id}", response_model=MessageResponse)
-async def delete_skill(skill_id: str):
+async def delete_skill(skill_id: str, store: Storage = Depends(get_storage)):
     """Delete skill"""
     try:
-        result = await db.skills.delete_one({"id": skill_id})
+        deleted = await store.skills.delete(skill_id, {"id": 1})
         
-        if result.deleted_count == 0:
+        if deleted is None:
             raise HTTPException(status_code=404, detail="Skill not found")
+        mark_changed("skills", skill_id)
         
         return MessageResponse(message="Skill deleted successfully")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting skill: {str(e)}")
\ No newline at end of file
@@ -1,52 +1,51 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends, Request, Query
 from typing import List
 from datetime import datetime
-import os
-from motor.motor_asyncio import AsyncIOMotorClient
 
-from models import Stats, StatsUpdate, MessageResponse
+from models import Stats, StatsUpdate, StatsHistoryPoint
+from storage import Storage, get_storage
+from http_cache import cached_json_response
+from serialization import ModelCodec
+from stats_store import stats_store, METRICS, months_ago
 
 router = APIRouter()
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+STATS_CODEC = ModelCodec(Stats)
+
+async def fetch_stats(store: Storage) -> dict:
+    # Served from memory once loaded at startup
+    return STATS_CODEC.load(await stats_store.current(store))
 
 @router.get("/stats", response_model=Stats)
-async def get_stats():
+async def get_stats(request: Request, store: Storage = Depends(get_storage)):
     """Get current portfolio stats"""
     try:
-        stats = await db.stats.find_one(sort=[("updated_at", -1)])
-        if not stats:
-            # Return default stats if none exist
-            default_stats = Stats(
-                total_sales=4000000,
-                clients_served=500,
-                years_experience=8,
-                projects_completed=750
-            )
-            await db.stats.insert_one(default_stats.dict())
-            return default_stats
-        return Stats(**stats)
+        return await cached_json_response(request, ("stats", "current"), lambda: fetch_stats(store))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching stats: {str(e)}")
 
+@router.get("/stats/history", response_model=List[StatsHistoryPoint])
+async def get_stats_history(
+    metric: str = "clients_served",
+    months: int = Query(12, ge=1, le=120),
+    store: Storage = Depends(get_storage)
+):
+    """Get monthly values of one stat, oldest month first"""
+    if metric not in METRICS:
+        raise HTTPException(status_code=400, detail=f"Invalid metric. Must be one of: {list(METRICS)}")
+    try:
+        return await stats_store.history(store, metric, months_ago(datetime.utcnow(), months))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching stats history: {str(e)}")
+
 @router.put("/stats", response_model=Stats)
-async def update_stats(stats_data: StatsUpdate):
+async def update_stats(stats_data: StatsUpdate, store: Storage = Depends(get_storage)):
     """Update portfolio stats"""
     try:
-        stats_dict = stats_data.dict()
-        stats_obj = Stats(**stats_dict)
-        
-        # Delete old stats and insert new ones
-        await db.stats.delete_many({})
-        result = await db.stats.insert_one(stats_obj.dict())
-        
-        if result.inserted_id:
-            return stats_obj
-        else:
-            raise HTTPException(status_code=500, detail="Failed to update stats")
-            
+        # Single-document upsert; readers never see a missing document
+        current = await stats_store.update(store, stats_data)
+        return STATS_CODEC.load(current)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error updating stats: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error updating stats: {str(e)}")
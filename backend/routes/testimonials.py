@@ -1,105 +1,141 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Header, Request
+from typing import List, Optional, Union
 from datetime import datetime
-import os
-from motor.motor_asyncio import AsyncIOMotorClient
 
-from models import Testimonial, TestimonialCreate, MessageResponse
+from models import Testimonial, TestimonialCreate, MessageResponse, BulkRequest, BulkResponse
+from storage import Storage, get_storage
+from http_cache import cached_json_response, mark_changed
+from pagination import Page, PageParams, fetch_list, list_response
+from serialization import ModelCodec
+from bulk import apply_bulk
+from search import search_index
+from versioning import parse_if_match, update_versioned
 
 router = APIRouter()
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+TESTIMONIALS_SORT = [("created_at", -1), ("id", -1)]
+TESTIMONIALS_CODEC = ModelCodec(Testimonial)
 
-@router.get("/testimonials", response_model=List[Testimonial])
-async def get_testimonials(featured_only: bool = False):
-    """Get testimonials with optional featured filter"""
+def testimonials_query(featured_only: bool = False) -> dict:
+    query = {}
+    if featured_only:
+        query["is_featured"] = True
+    return query
+
+async def fetch_testimonials(store: Storage, featured_only: bool = False, codec: ModelCodec = TESTIMONIALS_CODEC) -> List[dict]:
+    return await fetch_list(store.testimonials, testimonials_query(featured_only), TESTIMONIALS_SORT, codec)
+
+@router.get("/testimonials", response_model=Union[List[Testimonial], Page[Testimonial]])
+async def get_testimonials(request: Request, featured_only: bool = False, page: PageParams = Depends(), fields: Optional[str] = None, store: Storage = Depends(get_storage)):
+    """Get testimonials with optional featured filter and cursor pagination"""
+    codec = TESTIMONIALS_CODEC.select(fields)
     try:
-        query = {}
-        if featured_only:
-            query["is_featured"] = True
-        
-        testimonials = await db.testimonials.find(query).sort("created_at", -1).to_list(100)
-        return [Testimonial(**testimonial) for testimonial in testimonials]
+        return await list_response(
+            request,
+            page,
+            ("testimonials", "list", featured_only),
+            store.testimonials,
+            testimonials_query(featured_only),
+            TESTIMONIALS_SORT,
+            codec,
+            lambda: fetch_testimonials(store, featured_only, codec=codec)
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching testimonials: {str(e)}")
 
 @router.get("/testimonials/{testimonial_id}", response_model=Testimonial)
-async def get_testimonial(testimonial_id: str):
+async def get_testimonial(request: Request, testimonial_id: str, fields: Optional[str] = None, store: Storage = Depends(get_storage)):
     """Get specific testimonial"""
-    try:
-        testimonial = await db.testimonials.find_one({"id": testimonial_id})
+    codec = TESTIMONIALS_CODEC.select(fields)
+    async def load():
+        testimonial = await store.testimonials.get(testimonial_id, codec.projection)
         if not testimonial:
             raise HTTPException(status_code=404, detail="Testimonial not found")
-        return Testimonial(**testimonial)
+        return codec.load(testimonial)
+    
+    try:
+        return await cached_json_response(request, ("testimonials", "detail", testimonial_id) + codec.key_suffix, load, document=True)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching testimonial: {str(e)}")
 
 @router.post("/testimonials", response_model=Testimonial)
-async def create_testimonial(testimonial_data: TestimonialCreate):
+async def create_testimonial(testimonial_data: TestimonialCreate, store: Storage = Depends(get_storage)):
     """Create new testimonial"""
     try:
         testimonial_dict = testimonial_data.dict()
         testimonial_obj = Testimonial(**testimonial_dict)
         
-        result = await db.testimonials.insert_one(testimonial_obj.dict())
+        await store.testimonials.insert(testimonial_obj.dict())
         
-        if result.inserted_id:
-            return testimonial_obj
-        else:
-            raise HTTPException(status_code=500, detail="Failed to create testimonial")
+        mark_changed("testimonials")
+        search_index.index_document("testimonials", testimonial_obj.dict())
+        return testimonial_obj
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating testimonial: {str(e)}")
 
+@router.post("/testimonials/bulk", response_model=BulkResponse)
+async def bulk_testimonials(payload: BulkRequest[TestimonialCreate], store: Storage = Depends(get_storage)):
+    """Create, update and delete testimonials in one batch"""
+    try:
+        return await apply_bulk(store.testimonials, payload, Testimonial)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error applying bulk testimonials changes: {str(e)}")
+
 @router.put("/testimonials/{testimonial_id}", response_model=Testimonial)
-async def update_testimonial(testimonial_id: str, testimonial_data: TestimonialCreate):
-    """Update testimonial"""
+async def update_testimonial(testimonial_id: str, testimonial_data: TestimonialCreate, if_match: Optional[str] = Header(None), store: Storage = Depends(get_storage)):
+    """Update testimonial; send If-Match with the current version to reject concurrent edits"""
     try:
         testimonial_dict = testimonial_data.dict()
         testimonial_dict["updated_at"] = datetime.utcnow()
         
-        result = await db.testimonials.update_one(
-            {"id": testimonial_id},
-            {"$set": testimonial_dict}
-        )
+        updated_testimonial = await update_versioned(store.testimonials, testimonial_id, testimonial_dict, parse_if_match(if_match), TESTIMONIALS_CODEC.projection)
         
-        if result.matched_count == 0:
+        if updated_testimonial is None:
             raise HTTPException(status_code=404, detail="Testimonial not found")
+        mark_changed("testimonials", testimonial_id)
+        search_index.index_document("testimonials", updated_testimonial)
         
-        updated_testimonial = await db.testimonials.find_one({"id": testimonial_id})
-        return Testimonial(**updated_testimonial)
+        return TESTIMONIALS_CODEC.load(updated_testimonial)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating testimonial: {str(e)}")
 
 @router.delete("/testimonials/{testimonial_id}", response_model=MessageResponse)
-async def delete_testimonial(testimonial_id: str):
+async def delete_testimonial(testimonial_id: str, store: Storage = Depends(get_storage)):
     """Delete testimonial"""
     try:
-        result = await db.testimonials.delete_one({"id": testimonial_id})
+        deleted = await store.testimonials.delete(testimonial_id, {"id": 1})
         
-        if result.deleted_count == 0:
+        if deleted is None:
             raise HTTPException(status_code=404, detail="Testimonial not found")
+        mark_changed("testimonials", testimonial_id)
+        search_index.remove("testimonials", testimonial_id)
         
         return MessageResponse(message="Testimonial deleted successfully")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting testimonial: {str(e)}")
 
 @router.put("/testimonials/{testimonial_id}/featured", response_model=MessageResponse)
-async def toggle_testimonial_featured(testimonial_id: str, is_featured: bool):
+async def toggle_testimonial_featured(testimonial_id: str, is_featured: bool, store: Storage = Depends(get_storage)):
     """Toggle testimonial featured status"""
     try:
-        result = await db.testimonials.update_one(
-            {"id": testimonial_id},
-            {"$set": {"is_featured": is_featured}}
-        )
+        updated = await store.testimonials.update(testimonial_id, {"is_featured": is_featured, "updated_at": datetime.utcnow()}, projection={"id": 1})
         
-        if result.matched_count == 0:
+        if updated is None:
             raise HTTPException(status_code=404, detail="Testimonial not found")
+        mark_changed("testimonials", testimonial_id)
         
         status = "featured" if is_featured else "unfeatured"
         return MessageResponse(message=f"Testimonial {status} successfully")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating testimonial: {str(e)}")
\ No newline at end of file
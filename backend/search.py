@@ -0,0 +1,270 @@
+import re
+import html
+import math
+import heapq
+import time
+import asyncio
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from storage import Storage
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Prefix expansions score lower than exact term matches
+PREFIX_WEIGHT = 0.7
+MAX_PREFIX_EXPANSIONS = 50
+MIN_PREFIX_LENGTH = 2
+
+SNIPPET_CHARS = 160
+
+_TOKEN = re.compile(r"\w[\w+#]*")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it of on or that the to was were will with".split()
+)
+
+
+class SearchSource(NamedTuple):
+    fields: Dict[str, float]  # indexed field -> weight
+    title: Tuple[str, ...]  # fields joined for the result title
+
+
+# Searchable collections and what is indexed from each
+SEARCH_SOURCES: Dict[str, SearchSource] = {
+    "portfolio": SearchSource({"title": 2.0, "description": 1.0, "technologies": 1.5}, ("title",)),
+    "services": SearchSource({"title": 2.0, "features": 1.0}, ("title",)),
+    "testimonials": SearchSource({"testimonial": 1.0}, ("name", "company")),
+    "experience": SearchSource({"position": 2.0, "achievements": 1.0}, ("position", "company")),
+}
+
+DocKey = Tuple[str, str]  # (collection, id)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def _field_text(value: Any) -> str:
+    if isinstance(value, (list, tuple)):
+        return ", ".join(str(item) for item in value)
+    return "" if value is None else str(value)
+
+
+class IndexedDoc:
+    __slots__ = ("title", "texts", "terms", "length")
+
+    def __init__(self, title: str, texts: Dict[str, str], terms: Dict[str, float], length: float):
+        self.title = title
+        self.texts = texts
+        self.terms = terms
+        self.length = length
+
+
+class SearchIndex:
+    """In-memory inverted index over the public content collections.
+
+    Term frequencies are weighted per field (BM25F-style) and ranked with
+    BM25. Every query term also matches indexed terms it is a prefix of,
+    found by bisecting a sorted term list. Route handlers keep the index in
+    step with their writes through ``index_document`` and ``remove``.
+    """
+
+    def __init__(self, sources: Dict[str, SearchSource] = SEARCH_SOURCES):
+        self.sources = sources
+        self._docs: Dict[DocKey, IndexedDoc] = {}
+        self._postings: Dict[str, Dict[DocKey, float]] = {}
+        self._terms: List[str] = []
+        self._total_length = 0.0
+        self._lock = asyncio.Lock()
+        # Writes made while a rebuild or reload is reading storage; replayed once it is done
+        self._journal: Optional[List[Tuple[str, str, Optional[Dict[str, Any]]]]] = None
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    async def rebuild(self, store: Storage):
+        """Load every searchable collection; used on startup.
+
+        Searches keep using the current index until the new one is swapped
+        in. Writes indexed in the meantime land in both: the current index
+        straight away, the new one by replay just before the swap.
+        """
+        async with self._lock:
+            self._journal = []
+            try:
+                fresh = SearchIndex(self.sources)
+                for collection, source in self.sources.items():
+                    async for doc in store[collection].iterate(projection=self._projection(source)):
+                        fresh.index_document(collection, doc)
+            finally:
+                journal, self._journal = self._journal, None
+            fresh._replay(journal)
+            self._docs, self._postings = fresh._docs, fresh._postings
+            self._terms, self._total_length = fresh._terms, fresh._total_length
+
+    async def reload(self, store: Storage, collection: str):
+        """Re-read one collection, for writes whose document ids aren't known"""
+        source = self.sources.get(collection)
+        if source is None:
+            return
+        async with self._lock:
+            self._journal = []
+            try:
+                docs = await store[collection].find(projection=self._projection(source))
+            finally:
+                journal, self._journal = self._journal, None
+            self.remove(collection, *[key[1] for key in self._docs if key[0] == collection])
+            for doc in docs:
+                self.index_document(collection, doc)
+            self._replay(journal)
+
+    def _replay(self, journal: List[Tuple[str, str, Optional[Dict[str, Any]]]]):
+        for collection, item_id, doc in journal:
+            if doc is None:
+                self.remove(collection, item_id)
+            else:
+                self.index_document(collection, doc)
+
+    @staticmethod
+    def _projection(source: SearchSource) -> Dict[str, int]:
+        return {"_id": 0, "id": 1, **{name: 1 for name in (*source.fields, *source.title)}}
+
+    def index_document(self, collection: str, doc: Dict[str, Any]):
+        """Add or replace one document; ignores collections that aren't searchable"""
+        source = self.sources.get(collection)
+        if source is None:
+            return
+        key = (collection, doc["id"])
+        if self._journal is not None:
+            self._journal.append((collection, doc["id"], doc))
+        self._remove_key(key)
+
+        texts = {name: _field_text(doc.get(name)) for name in source.fields}
+        terms: Counter = Counter()
+        for name, weight in source.fields.items():
+            for token in tokenize(texts[name]):
+                terms[token] += weight
+        title = " · ".join(_field_text(doc.get(name)) for name in source.title if doc.get(name))
+        entry = IndexedDoc(title, texts, dict(terms), sum(terms.values()))
+
+        self._docs[key] = entry
+        self._total_length += entry.length
+        for term, frequency in entry.terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                insort(self._terms, term)
+            postings[key] = frequency
+
+    def remove(self, collection: str, *item_ids: str):
+        for item_id in item_ids:
+            if self._journal is not None:
+                self._journal.append((collection, item_id, None))
+            self._remove_key((collection, item_id))
+
+    def _remove_key(self, key: DocKey):
+        entry = self._docs.pop(key, None)
+        if entry is None:
+            return
+        self._total_length -= entry.length
+        for term in entry.terms:
+            postings = self._postings[term]
+            del postings[key]
+            if not postings:
+                del self._postings[term]
+                del self._terms[bisect_left(self._terms, term)]
+
+    def _expand(self, token: str) -> Dict[str, float]:
+        """Indexed terms matching ``token`` exactly or by prefix, with their weight"""
+        matches = {token: 1.0} if token in self._postings else {}
+        if len(token) >= MIN_PREFIX_LENGTH:
+            position = bisect_left(self._terms, token)
+            for term in self._terms[position:position + MAX_PREFIX_EXPANSIONS + 1]:
+                if not term.startswith(token):
+                    break
+                matches.setdefault(term, PREFIX_WEIGHT)
+        return matches
+
+    def search(self, query: str, collections: Optional[Sequence[str]] = None, limit: int = 10) -> Dict[str, Any]:
+        started = time.perf_counter()
+        tokens = list(dict.fromkeys(tokenize(query)))
+        allowed = set(collections) if collections else None
+        count = len(self._docs)
+        average_length = self._total_length / count if count else 0.0
+
+        scores: Dict[DocKey, float] = {}
+        norms: Dict[DocKey, float] = {}
+        matched_tokens: Dict[DocKey, int] = {}
+        hit_terms: Dict[DocKey, set] = {}
+        for token in tokens:
+            seen = set()
+            for term, weight in self._expand(token).items():
+                postings = self._postings[term]
+                boost = weight * math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5)) * (K1 + 1)
+                for key, frequency in postings.items():
+                    if allowed is not None and key[0] not in allowed:
+                        continue
+                    norm = norms.get(key)
+                    if norm is None:
+                        norm = norms[key] = K1 * (1 - B + B * self._docs[key].length / average_length)
+                    scores[key] = scores.get(key, 0.0) + boost * frequency / (frequency + norm)
+                    if key in hit_terms:
+                        hit_terms[key].add(term)
+                    else:
+                        hit_terms[key] = {term}
+                    seen.add(key)
+            for key in seen:
+                matched_tokens[key] = matched_tokens.get(key, 0) + 1
+
+        # Documents matching more of the query words rank first
+        ranked = heapq.nlargest(limit, scores, key=lambda key: (matched_tokens[key], scores[key]))
+        results = []
+        for key in ranked:
+            entry = self._docs[key]
+            field, snippet = self._snippet(entry, hit_terms[key])
+            results.append({
+                "collection": key[0],
+                "id": key[1],
+                "title": entry.title,
+                "score": round(scores[key] * matched_tokens[key] / len(tokens), 4),
+                "field": field,
+                "snippet": snippet,
+            })
+        return {
+            "query": query,
+            "total": len(scores),
+            "took_ms": round((time.perf_counter() - started) * 1000, 3),
+            "results": results,
+        }
+
+    def _snippet(self, entry: IndexedDoc, terms: Iterable[str]) -> Tuple[str, str]:
+        """HTML-escaped excerpt of the best matching field with hits wrapped in <mark>"""
+        terms = set(terms)
+        best_field, best_hits = next(iter(entry.texts)), []
+        for name, text in entry.texts.items():
+            hits = [match for match in _TOKEN.finditer(text) if match.group().lower() in terms]
+            if len(hits) > len(best_hits):
+                best_field, best_hits = name, hits
+        text = entry.texts[best_field]
+        start = max(0, best_hits[0].start() - SNIPPET_CHARS // 4) if best_hits else 0
+        if start:
+            # Don't start mid-word
+            space = text.find(" ", start)
+            start = space + 1 if 0 <= space < best_hits[0].start() else start
+        end = min(len(text), start + SNIPPET_CHARS)
+
+        parts, cursor = [], start
+        for match in best_hits:
+            if match.start() < start or match.end() > end:
+                continue
+            parts.append(html.escape(text[cursor:match.start()]))
+            parts.append(f"<mark>{html.escape(match.group())}</mark>")
+            cursor = match.end()
+        parts.append(html.escape(text[cursor:end]))
+        return best_field, ("…" if start else "") + "".join(parts) + ("…" if end < len(text) else "")
+
+
+search_index = SearchIndex()
@@ -1,6 +1,4 @@
 import asyncio
-import os
-from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -8,10 +6,8 @@ from pathlib import Path
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+from repository import WriteOp
+from storage import storage
 
 # Sample data
 sample_services = [
@@ -225,22 +221,24 @@ async def seed_database():
     """Seed the database with sample data"""
     print("🌱 Seeding database with sample data...")
     
+    # Seeds whichever backend STORAGE_BACKEND selects
+    store = storage.connect()
+    samples = {
+        "services": sample_services,
+        "portfolio": sample_portfolio,
+        "testimonials": sample_testimonials,
+        "experience": sample_experience,
+        "skills": sample_skills,
+        "stats": [sample_stats],
+    }
     try:
-        # Clear existing data
-        await db.services.delete_many({})
-        await db.portfolio.delete_many({})
-        await db.testimonials.delete_many({})
-        await db.experience.delete_many({})
-        await db.skills.delete_many({})
-        await db.stats.delete_many({})
-        
-        # Insert sample data
-        await db.services.insert_many(sample_services)
-        await db.portfolio.insert_many(sample_portfolio)
-        await db.testimonials.insert_many(sample_testimonials)
-        await db.experience.insert_many(sample_experience)
-        await db.skills.insert_many(sample_skills)
-        await db.stats.insert_one(sample_stats)
+        for collection, docs in samples.items():
+            # Clear existing data, then insert the samples in one batch
+            await store[collection].clear()
+            errors = await store[collection].apply_writes([WriteOp("insert", doc["id"], doc) for doc in docs])
+            failed = [error for error in errors if error]
+            if failed:
+                raise RuntimeError(f"{collection}: {failed[0]}")
         
         print("✅ Database seeded successfully!")
         print(f"   - {len(sample_services)} services")
@@ -253,7 +251,56 @@ async def seed_database():
     except Exception as e:
         print(f"❌ Error seeding database: {e}")
     finally:
-        client.close()
+        storage.close()
+
+async def seed_synthetic(counts, seed, batch_size, concurrency, append, days):
+    """Load generated documents at production scale; other collections are left alone"""
+    from synthetic_data import load
+
+    last_report = [0.0]
+
+    def progress(collection, inserted, elapsed):
+        if elapsed - last_report[0] >= 2:
+            last_report[0] = elapsed
+            print(f"   {collection}: {inserted:,} inserted ({inserted / elapsed:,.0f} docs/s)")
+
+    mode = "Appending" if append else "Loading"
+    print(f"🌱 {mode} synthetic data (seed {seed}, batches of {batch_size}, {concurrency} in flight)...")
+    store = storage.connect()
+    try:
+        report = await load(store, counts, seed=seed, batch_size=batch_size, concurrency=concurrency,
+                            append=append, days=days, progress=progress)
+    finally:
+        storage.close()
+
+    total = sum(result["inserted"] for result in report.values())
+    seconds = sum(result["seconds"] for result in report.values())
+    print(f"✅ Inserted {total:,} documents in {seconds:.1f}s ({total / seconds if seconds else 0:,.0f} docs/s)")
+    for collection, result in report.items():
+        failed = f", {result['failed']:,} failed" if result["failed"] else ""
+        print(f"   - {collection}: {result['inserted']:,} from #{result['start']:,} "
+              f"in {result['seconds']:.1f}s ({result['docs_per_second']:,} docs/s{failed})")
+
 
 if __name__ == "__main__":
-    asyncio.run(seed_database())
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Seed the sample data, or generate synthetic data when any count is given")
+    parser.add_argument("--contacts", type=int, default=0, help="synthetic contact forms to generate")
+    parser.add_argument("--portfolio", type=int, default=0, help="synthetic portfolio items to generate")
+    parser.add_argument("--testimonials", type=int, default=0, help="synthetic testimonials to generate")
+    parser.add_argument("--skills", type=int, default=0, help="synthetic skills to generate")
+    parser.add_argument("--seed", type=int, default=0, help="same seed, same documents")
+    parser.add_argument("--batch-size", type=int, default=1000, help="documents per insert")
+    parser.add_argument("--concurrency", type=int, default=4, help="insert batches in flight")
+    parser.add_argument("--append", action="store_true", help="add to the existing documents instead of replacing them")
+    parser.add_argument("--days", type=int, default=730, help="spread created_at over this many days")
+    args = parser.parse_args()
+
+    counts = {name: getattr(args, name) for name in ("contacts", "portfolio", "testimonials", "skills")}
+    counts = {name: count for name, count in counts.items() if count > 0}
+    if counts:
+        asyncio.run(seed_synthetic(counts, args.seed, args.batch_size, args.concurrency, args.append, args.days))
+    else:
+        asyncio.run(seed_database())
\ No newline at end of file
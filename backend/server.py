@@ -1,10 +1,13 @@
-from fastapi import FastAPI, APIRouter
+from fastapi import FastAPI, APIRouter, Header, HTTPException, Response
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from contextlib import asynccontextmanager
 import os
+import time
+import secrets
 import logging
 from pathlib import Path
+from typing import Optional
 
 # Load environment variables FIRST before importing routes
 ROOT_DIR = Path(__file__).parent
@@ -18,19 +21,108 @@ from routes.services import router as services_router
 from routes.stats import router as stats_router
 from routes.experience import router as experience_router
 from routes.skills import router as skills_router
+from routes.bundle import router as bundle_router
+from routes.search import router as search_router
+from database import database
+from storage import storage
+from cache import read_cache
+from serialization import FastJSONResponse
+from indexes import migrate_indexes, verify_indexes, log_index_report
+from stats_store import stats_store
+from ingest import contact_queue
+from rate_limit import RATE_LIMIT_COLLECTION, SHARED_BACKEND as SHARED_RATE_LIMITS, MongoRateLimitBackend, contact_guard
+from search import search_index
+from contact_analytics import contact_rollups, ROLLUP_COLLECTION
+from compression import CompressionMiddleware, compression_stats
+from health import health
+from warmup import cache_warmer
+from change_feed import change_feed
+from snapshot import SnapshotMiddleware, snapshot_server
+from pagination import NEXT_CURSOR_HEADER
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, gauge_collector, loop_lag_monitor, registry
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the configured storage on startup and close it on shutdown"""
+    logger.info("Starting up Portfolio API...")
+    store = storage.connect()
+    db = store.mongo
+    
+    if db is not None:
+        # Build registered indexes concurrently, then flag anything missing or redundant
+        if os.environ.get("DB_AUTO_MIGRATE_INDEXES", "true").lower() == "true":
+            for result in await migrate_indexes(db):
+                if result["error"]:
+                    logger.error("Index migration failed for %s: %s", result["collection"], result["error"])
+        log_index_report(await verify_indexes(db))
+        
+        logger.info("Database indexes verified")
+        if contact_rollups.enabled:
+            if not await db[ROLLUP_COLLECTION].count_documents({}, limit=1):
+                await contact_rollups.rebuild(db)
+            contact_queue.add_listener(lambda contacts: contact_rollups.record_inserted(db, contacts))
+        # The write-behind queue batches with insert_many; other backends insert inline
+        await contact_queue.start(db.contacts)
+        if SHARED_RATE_LIMITS:
+            # Every worker draws from the same contact buckets
+            contact_guard.backend = MongoRateLimitBackend(db[RATE_LIMIT_COLLECTION])
+    # Subscribe before warming so writes from other processes during warm-up aren't missed
+    change_feed.start(store)
+    # Snapshot files are only served for collections whose fingerprint still matches this storage
+    snapshot_server.attach(store)
+    # Stats, the search index and the public responses load in the background; readiness waits for them
+    cache_warmer.start(store)
+    loop_lag_monitor.start()
+    try:
+        yield
+    finally:
+        await loop_lag_monitor.stop()
+        await cache_warmer.stop()
+        await change_feed.stop()
+        await contact_queue.stop()
+        storage.close()
 
 # Create the main app without a prefix
 app = FastAPI(
     title="Sohaib Mushtaq Portfolio API",
     description="Portfolio website backend API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
+def _pool_metrics() -> dict:
+    stats = database.pool_stats()
+    return {**stats["totals"], "utilization": stats["utilization"], "max_size": stats["max_pool_size"] or 0}
+
+# Pool, cache and queue figures are read when /metrics is scraped
+gauge_collector("mongodb_pool", "Motor connection pool", _pool_metrics,
+                ("open", "checked_out", "waiting", "utilization", "max_size", "checkout_failed_total"))
+gauge_collector("read_cache", "Read cache", read_cache.stats,
+                ("entries", "bytes", "hits", "misses", "evictions", "invalidations"))
+gauge_collector("contact_queue", "Contact write-behind queue", contact_queue.stats,
+                ("depth", "accepted", "flushed", "dropped", "flush_failures", "last_flush_ms"))
+gauge_collector("change_feed", "Cross-process cache invalidation feed", change_feed.stats,
+                ("events", "reconnects", "resyncs", "last_lag_ms"))
+
+# Instrumentation is switched with METRICS_ENABLED; with METRICS_TOKEN set, scrapers must send it as a bearer token
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(authorization: Optional[str] = Header(None)):
+    """Prometheus text exposition of request, MongoDB and runtime metrics"""
+    if METRICS_TOKEN and not secrets.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Metrics require a bearer token",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return Response(content=registry.render(), media_type=METRICS_CONTENT_TYPE)
+
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
@@ -39,9 +131,109 @@ api_router = APIRouter(prefix="/api")
 async def root():
     return {"message": "Sohaib Mushtaq Portfolio API is running!", "version": "1.0.0"}
 
+async def _check_storage() -> dict:
+    store = storage.current
+    if store is None:
+        raise RuntimeError("Storage is not connected")
+    return await store.ping()
+
+_index_report: dict = {"missing": None, "checked_at": 0.0}
+
+async def _check_indexes() -> dict:
+    if storage.backend != "mongo":
+        # SQLite and in-memory indexes are created with their tables
+        return {"backend": storage.backend}
+    if database.db is None:
+        raise RuntimeError("Database is not connected")
+    # listIndexes on every collection is too heavy for each probe; refresh once a minute
+    if _index_report["missing"] is None or time.monotonic() - _index_report["checked_at"] > 60:
+        report = await verify_indexes(database.db)
+        _index_report["missing"] = [f"{entry['collection']}.{name}" for entry in report for name in entry["missing"]]
+        _index_report["checked_at"] = time.monotonic()
+    if _index_report["missing"]:
+        missing = _index_report["missing"]
+        raise RuntimeError(f"{len(missing)} missing indexes: {', '.join(missing[:5])}" + (", ..." if len(missing) > 5 else ""))
+    return {}
+
+async def _check_caches() -> dict:
+    details = {
+        "stats_loaded": stats_store.loaded,
+        "search_documents": len(search_index),
+        "read_cache_entries": len(read_cache),
+    }
+    if not stats_store.loaded:
+        raise RuntimeError("Stats have not been loaded")
+    return details
+
+health.register("storage", _check_storage, critical=True)
+health.register("warmup", cache_warmer.check, critical=True)
+health.register("indexes", _check_indexes, critical=False, timeout=2.0)
+health.register("caches", _check_caches, critical=False)
+health.register("change_feed", change_feed.check, critical=False)
+
+def _readiness_response(result: dict, legacy: bool = False) -> FastJSONResponse:
+    if legacy:
+        result = {
+            **result,
+            "status": "healthy" if result["status"] == "ready" else "unhealthy",
+            "database": "connected" if result["checks"]["storage"]["ok"] else "disconnected",
+        }
+    return FastJSONResponse(result, status_code=200 if result["status"] in ("ready", "healthy") else 503)
+
 @api_router.get("/health")
 async def health_check():
-    return {"status": "healthy", "database": "connected"}
+    """Readiness summary in the original health response shape"""
+    return _readiness_response(await health.readiness(), legacy=True)
+
+@api_router.get("/health/live")
+async def liveness_probe():
+    """Liveness: the process is up and serving; never touches dependencies"""
+    return health.liveness()
+
+@api_router.get("/health/ready")
+async def readiness_probe():
+    """Readiness: cached result of the dependency checks with per-check timings"""
+    return _readiness_response(await health.readiness())
+
+@api_router.get("/health/warmup")
+async def warmup_report():
+    """Startup warm-up progress, timing and any steps that failed or ran out of budget"""
+    return cache_warmer.report()
+
+@api_router.get("/health/changes")
+async def change_feed_stats():
+    """Change feed mode (stream or poll), event counts and reconnects"""
+    return change_feed.stats()
+
+@api_router.get("/health/snapshot")
+async def snapshot_stats():
+    """Static snapshot serving: manifest age, file count and served/stale counters"""
+    return snapshot_server.stats()
+
+@api_router.get("/health/pool")
+async def pool_stats():
+    """MongoDB connection pool statistics for pool sizing"""
+    return database.pool_stats()
+
+@api_router.get("/health/cache")
+async def cache_stats():
+    """Read cache hit/miss/eviction counters"""
+    return read_cache.stats()
+
+@api_router.get("/health/compression")
+async def compression_metrics():
+    """Compression ratio and CPU time per content-coding"""
+    return compression_stats.snapshot()
+
+@api_router.get("/health/queue")
+async def queue_stats():
+    """Contact write-behind queue depth, flush latency and drops"""
+    return contact_queue.stats()
+
+@api_router.get("/health/ratelimit")
+async def rate_limit_stats():
+    """Contact form throttling and duplicate counters"""
+    return contact_guard.stats()
 
 # Include route modules
 api_router.include_router(contact_router, tags=["Contact"])
@@ -51,44 +243,26 @@ api_router.include_router(services_router, tags=["Services"])
 api_router.include_router(stats_router, tags=["Stats"])
 api_router.include_router(experience_router, tags=["Experience"])
 api_router.include_router(skills_router, tags=["Skills"])
+api_router.include_router(bundle_router, tags=["Bundle"])
+api_router.include_router(search_router, tags=["Search"])
 
 # Include the router in the main app
 app.include_router(api_router)
 
+# Innermost, so snapshot files still get CORS headers and are passed through compression as-is
+app.add_middleware(SnapshotMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
-
-@app.on_event("startup")
-async def startup_event():
-    """Initialize database with sample data if empty"""
-    logger.info("Starting up Portfolio API...")
-    
-    # Create indexes for better performance
-    await db.contacts.create_index("email")
-    await db.contacts.create_index("created_at")
-    await db.portfolio.create_index("category")
-    await db.portfolio.create_index("is_featured")
-    await db.testimonials.create_index("is_featured")
-    await db.services.create_index("is_active")
-    await db.experience.create_index("order")
-    await db.skills.create_index("category")
-    await db.skills.create_index("level")
-    
-    logger.info("Database indexes created successfully")
+# Added last so it wraps everything, including CORS
+app.add_middleware(CompressionMiddleware)
+# Outermost, so latency includes compression
+app.add_middleware(MetricsMiddleware)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
-    logger.info("Database connection closed")
@@ -0,0 +1,483 @@
+"""Static snapshot of the public API for CDN or edge serving.
+
+``export`` renders every public endpoint and query variant to a directory of
+JSON files, each with precompressed copies, plus a ``manifest.json`` mapping
+request targets (path and sorted query string) to files, content hashes and
+ETags. Re-exports are incremental: each collection's content is
+fingerprinted, and only the responses that read a changed collection are
+rendered again; files whose bytes didn't change are left untouched.
+
+With ``SNAPSHOT_SERVE=true`` the app answers matching GET requests from the
+files before the routers run, falling back to storage for anything not in
+the snapshot or whose collection no longer matches its fingerprint.
+
+Usage:
+    python snapshot.py export [--out DIR] [--full]
+    python snapshot.py status [--out DIR]
+"""
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+from urllib.parse import parse_qsl, quote, urlencode
+
+import orjson
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from compression import ENCODERS, MIN_SIZE, encoding_etag, negotiate
+from http_cache import CACHE_CONTROL, _etag_matches, _http_date, _newest_timestamp, versions
+from serialization import dumps
+from versioning import document_etag
+
+if TYPE_CHECKING:
+    # Imported lazily at run time: the CLI loads .env before storage reads its settings
+    from storage import Storage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SNAPSHOT_DIR = Path(__file__).parent / "snapshot"
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# Collections the public endpoints read
+PUBLIC_COLLECTIONS = ("stats", "services", "portfolio", "testimonials", "experience", "skills")
+
+# File suffix per content-coding
+SUFFIXES = {"br": ".br", "zstd": ".zst", "gzip": ".gz"}
+
+
+class SnapshotTarget(NamedTuple):
+    target: str  # request path with its canonical query string
+    collections: Tuple[str, ...]  # what the response reads, for incremental export and staleness
+    load: Callable[["Storage"], Awaitable[Any]]
+
+
+def canonical_target(path: str, params: List[Tuple[str, str]]) -> str:
+    """Request target with sorted query parameters, as used for manifest keys"""
+    return path + ("?" + urlencode(sorted(params)) if params else "")
+
+
+def target_file(target: str) -> str:
+    """Relative file path for a target: each path is a directory, query variants sit beside index.json"""
+    path, _, query = target.partition("?")
+    name = "index@" + quote(query, safe="=&") + ".json" if query else "index.json"
+    return "/".join([*(quote(part, safe="") for part in path.strip("/").split("/")), name])
+
+
+async def snapshot_targets(store: "Storage", collections: Optional[Set[str]] = None) -> List[SnapshotTarget]:
+    """Every public request variant, or only those reading one of ``collections``"""
+    from routes.bundle import SECTIONS, fetch_bundle
+    from routes.stats import fetch_stats
+    from routes.services import fetch_services, SERVICES_CODEC
+    from routes.portfolio import fetch_portfolio_items, fetch_portfolio_categories, PORTFOLIO_CODEC
+    from routes.testimonials import fetch_testimonials, TESTIMONIALS_CODEC
+    from routes.experience import fetch_experience, EXPERIENCE_CODEC
+    from routes.skills import fetch_skills, fetch_skill_categories, SKILLS_CODEC
+
+    full_bundle = {name: None for name in SECTIONS}
+    targets = [
+        SnapshotTarget("/api/stats", ("stats",), fetch_stats),
+        SnapshotTarget("/api/services", ("services",), fetch_services),
+        SnapshotTarget("/api/services?active_only=false", ("services",), lambda store: fetch_services(store, active_only=False)),
+        SnapshotTarget("/api/portfolio", ("portfolio",), fetch_portfolio_items),
+        SnapshotTarget("/api/portfolio?featured_only=true", ("portfolio",), lambda store: fetch_portfolio_items(store, featured_only=True)),
+        SnapshotTarget("/api/portfolio/categories", ("portfolio",), fetch_portfolio_categories),
+        SnapshotTarget("/api/testimonials", ("testimonials",), fetch_testimonials),
+        SnapshotTarget("/api/testimonials?featured_only=true", ("testimonials",), lambda store: fetch_testimonials(store, featured_only=True)),
+        SnapshotTarget("/api/experience", ("experience",), fetch_experience),
+        SnapshotTarget("/api/skills", ("skills",), fetch_skills),
+        SnapshotTarget("/api/skills/categories", ("skills",), fetch_skill_categories),
+        SnapshotTarget("/api/bundle", tuple(sorted({section.collection for section in SECTIONS.values()})),
+                       lambda store: fetch_bundle(store, full_bundle)),
+    ]
+    wanted = set(PUBLIC_COLLECTIONS) if collections is None else collections
+    targets = [target for target in targets if wanted.intersection(target.collections)]
+
+    if "portfolio" in wanted:
+        for category in await fetch_portfolio_categories(store):
+            if category != "All":
+                targets.append(SnapshotTarget(canonical_target("/api/portfolio", [("category", category)]), ("portfolio",),
+                                              lambda store, category=category: fetch_portfolio_items(store, category)))
+    if "skills" in wanted:
+        for category in await fetch_skill_categories(store):
+            targets.append(SnapshotTarget(canonical_target("/api/skills", [("category", category)]), ("skills",),
+                                          lambda store, category=category: fetch_skills(store, category)))
+
+    details = {"services": SERVICES_CODEC, "portfolio": PORTFOLIO_CODEC, "testimonials": TESTIMONIALS_CODEC,
+               "experience": EXPERIENCE_CODEC, "skills": SKILLS_CODEC}
+    for collection, codec in details.items():
+        if collection not in wanted:
+            continue
+        async for doc in store[collection].iterate(projection=codec.projection):
+            targets.append(SnapshotTarget(f"/api/{collection}/{quote(doc['id'], safe='')}", (collection,),
+                                          lambda store, doc=doc, codec=codec: _loaded(codec, doc)))
+    return targets
+
+
+async def _loaded(codec, doc: dict) -> dict:
+    return codec.load(doc)
+
+
+async def fingerprint(store: "Storage", collection: str) -> str:
+    """Hash of a collection's documents in id order; changes whenever any stored value does"""
+    digest = hashlib.sha256()
+    async for doc in store[collection].iterate(sort=[("id", 1)]):
+        digest.update(orjson.dumps(doc, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def _write_atomic(path: Path, data: bytes):
+    # Readers (the serving middleware, a CDN sync) never see a half-written file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp = path.with_name(path.name + ".tmp")
+    temp.write_bytes(data)
+    os.replace(temp, path)
+
+
+def load_manifest(out: Path) -> Optional[Dict[str, Any]]:
+    try:
+        manifest = json.loads((out / MANIFEST_NAME).read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+    return manifest if manifest.get("version") == MANIFEST_VERSION else None
+
+
+def _last_modified(value: Any) -> Optional[str]:
+    newest = _newest_timestamp(value)
+    return newest.isoformat() if newest else None
+
+
+def _etag(sha256: str, value: Any) -> str:
+    etag = f'"{sha256[:24]}"'
+    # Detail pages carry the document version like the live responses, so their ETag works as If-Match
+    if isinstance(value, dict) and "version" in value:
+        etag = document_etag(etag, value["version"])
+    return etag
+
+
+async def _render(out: Path, target: SnapshotTarget, store: "Storage", previous: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], bool]:
+    value = await target.load(store)
+    body = dumps(value)
+    sha256 = hashlib.sha256(body).hexdigest()
+    if previous is not None and previous["sha256"] == sha256 and (out / previous["file"]).exists():
+        return previous, False
+
+    file = target_file(target.target)
+    _write_atomic(out / file, body)
+    encodings = {}
+    if len(body) >= MIN_SIZE:
+        for encoding, make in ENCODERS.items():
+            stream = make()
+            compressed = stream.compress(body) + stream.flush()
+            _write_atomic(out / (file + SUFFIXES[encoding]), compressed)
+            encodings[encoding] = {"file": file + SUFFIXES[encoding], "size": len(compressed)}
+    for encoding, suffix in SUFFIXES.items():
+        # Drop variants from an earlier, larger body
+        if encoding not in encodings and (out / (file + suffix)).exists():
+            (out / (file + suffix)).unlink()
+    return {
+        "file": file,
+        "size": len(body),
+        "sha256": sha256,
+        "etag": _etag(sha256, value),
+        "last_modified": _last_modified(value),
+        "collections": list(target.collections),
+        "encodings": encodings,
+        "headers": dict(getattr(value, "response_headers", None) or {}),
+    }, True
+
+
+def _remove_files(out: Path, entry: Dict[str, Any]):
+    for file in [entry["file"], *(variant["file"] for variant in entry["encodings"].values())]:
+        try:
+            (out / file).unlink()
+        except FileNotFoundError:
+            pass
+    # Detail pages get a directory each; drop it along with the last file
+    directory = (out / entry["file"]).parent
+    while directory != out and directory.is_dir() and not any(directory.iterdir()):
+        directory.rmdir()
+        directory = directory.parent
+
+
+async def export(store: "Storage", out: Path, full: bool = False) -> Dict[str, Any]:
+    """Render the snapshot into ``out``; returns counts of what was rendered, written and removed"""
+    started = time.perf_counter()
+    out.mkdir(parents=True, exist_ok=True)
+    previous = None if full else load_manifest(out)
+    from stats_store import stats_store
+    # Loading stats inserts the defaults into an empty store; do that before fingerprinting
+    await stats_store.load(store)
+    fingerprints = dict(zip(PUBLIC_COLLECTIONS, await asyncio.gather(
+        *(fingerprint(store, collection) for collection in PUBLIC_COLLECTIONS)
+    )))
+    if previous is None:
+        changed = set(PUBLIC_COLLECTIONS)
+    else:
+        changed = {name for name, value in fingerprints.items() if previous["fingerprints"].get(name) != value}
+
+    files: Dict[str, Dict[str, Any]] = {}
+    old_files = previous["files"] if previous else {}
+    for target, entry in old_files.items():
+        if not changed.intersection(entry["collections"]):
+            files[target] = entry
+
+    written = 0
+    targets = await snapshot_targets(store, changed) if changed else []
+    for target in targets:
+        files[target.target], wrote = await _render(out, target, store, old_files.get(target.target))
+        written += wrote
+
+    removed = [target for target in old_files if target not in files]
+    for target in removed:
+        _remove_files(out, old_files[target])
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "generated_at": datetime.utcnow().isoformat(),
+        "backend": store.backend,
+        "fingerprints": fingerprints,
+        "files": dict(sorted(files.items())),
+    }
+    _write_atomic(out / MANIFEST_NAME, json.dumps(manifest, indent=1).encode())
+    return {
+        "changed": sorted(changed),
+        "rendered": len(targets),
+        "written": written,
+        "removed": len(removed),
+        "files": len(files),
+        "took_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+class SnapshotServer:
+    """Looks up exported responses for incoming requests.
+
+    The manifest's per-collection fingerprints are checked against storage
+    when it is loaded and every ``verify_seconds`` after; only collections
+    that still match are served, so writes made before a restart or by
+    another process never leave stale files in front of the routers. An
+    entry is also skipped once this process sees a write to a collection it
+    reads (route writes and the change feed both record them). The
+    manifest is re-read when it changes on disk.
+    """
+
+    def __init__(self, directory: Path = DEFAULT_SNAPSHOT_DIR, enabled: bool = False, recheck_seconds: float = 1.0,
+                 verify_seconds: float = 30.0):
+        self.directory = Path(directory)
+        self.enabled = enabled
+        self.recheck_seconds = recheck_seconds
+        self.verify_seconds = verify_seconds
+        self._store: Optional["Storage"] = None
+        self._manifest: Optional[Dict[str, Any]] = None
+        self._mtime = 0.0
+        self._checked_at = 0.0
+        # Collections whose fingerprint matched storage, and when that check started
+        self._verified: Set[str] = set()
+        self._verified_at: Optional[datetime] = None
+        self._verify_due = 0.0
+        self._verify_lock = asyncio.Lock()
+        self.served = 0
+        self.not_modified = 0
+        self.stale = 0
+        self.missed = 0
+
+    @classmethod
+    def from_env(cls) -> "SnapshotServer":
+        return cls(
+            directory=Path(os.environ.get("SNAPSHOT_DIR", DEFAULT_SNAPSHOT_DIR)),
+            enabled=os.environ.get("SNAPSHOT_SERVE", "false").lower() == "true",
+            recheck_seconds=float(os.environ.get("SNAPSHOT_RECHECK_SECONDS", 1.0)),
+            verify_seconds=float(os.environ.get("SNAPSHOT_VERIFY_SECONDS", 30.0)),
+        )
+
+    def attach(self, store: "Storage"):
+        """Storage to verify fingerprints against; nothing is served until it is attached"""
+        self._store = store
+        self._verify_due = 0.0
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.recheck_seconds:
+            return
+        self._checked_at = now
+        try:
+            mtime = (self.directory / MANIFEST_NAME).stat().st_mtime
+        except FileNotFoundError:
+            self._manifest = None
+            self._mtime = 0.0
+            return
+        if mtime != self._mtime:
+            self._mtime = mtime
+            self._manifest = load_manifest(self.directory)
+            self._verified = set()
+            self._verify_due = 0.0
+            if self._manifest:
+                logger.info("Loaded %d snapshot files from %s", len(self._manifest["files"]), self.directory)
+
+    async def verify(self, force: bool = False) -> Set[str]:
+        """Compare the manifest's fingerprints with storage; returns the collections that still match"""
+        async with self._verify_lock:
+            manifest = self._manifest
+            if manifest is None or self._store is None:
+                return set()
+            if not force and time.monotonic() < self._verify_due:
+                # Another request checked while this one waited for the lock
+                return self._verified
+            started_at = datetime.utcnow()
+            matching = set()
+            for collection, expected in manifest["fingerprints"].items():
+                if await fingerprint(self._store, collection) == expected:
+                    matching.add(collection)
+            if manifest is self._manifest:
+                self._verified, self._verified_at = matching, started_at
+                self._verify_due = time.monotonic() + self.verify_seconds
+            out_of_date = sorted(set(manifest["fingerprints"]) - matching)
+            if out_of_date:
+                logger.warning("Snapshot is out of date for %s; serving them from storage", ", ".join(out_of_date))
+            return matching
+
+    def _fresh(self, entry: Dict[str, Any]) -> bool:
+        for collection in entry["collections"]:
+            if collection not in self._verified:
+                return False
+            changed_at = versions.changed_at(collection)
+            if changed_at is not None and changed_at >= self._verified_at:
+                return False
+        return True
+
+    async def lookup(self, path: str, query_string: bytes = b"") -> Optional[Dict[str, Any]]:
+        """The fresh manifest entry for a request, or None"""
+        self._refresh()
+        if self._manifest is None:
+            return None
+        params = parse_qsl(query_string.decode("latin-1"), keep_blank_values=True)
+        entry = self._manifest["files"].get(canonical_target(path, params))
+        if entry is None:
+            return None
+        if time.monotonic() >= self._verify_due:
+            try:
+                await self.verify()
+            except Exception as e:
+                # Unverified entries aren't served; the routers report the storage error if there is one
+                logger.warning("Snapshot fingerprint check failed: %s", e)
+        if not self._fresh(entry):
+            self.stale += 1
+            return None
+        return entry
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "directory": str(self.directory),
+            "generated_at": self._manifest["generated_at"] if self._manifest else None,
+            "files": len(self._manifest["files"]) if self._manifest else 0,
+            "out_of_date": sorted(set(self._manifest["fingerprints"]) - self._verified) if self._manifest else [],
+            "served": self.served,
+            "not_modified": self.not_modified,
+            "stale": self.stale,
+            "missed": self.missed,
+        }
+
+
+snapshot_server = SnapshotServer.from_env()
+
+
+class SnapshotMiddleware:
+    """Answer GET and HEAD requests from the exported snapshot before the routers.
+
+    Files go out as ``FileResponse``, which hands the path to the server
+    (``http.response.pathsend``) where it supports zero-copy sends and
+    streams the file otherwise. A precompressed variant is picked by
+    Accept-Encoding, so the compression middleware passes it through.
+    """
+
+    def __init__(self, app: ASGIApp, snapshots: SnapshotServer = snapshot_server):
+        self.app = app
+        self.snapshots = snapshots
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        snapshots = self.snapshots
+        if not snapshots.enabled or scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+        entry = await snapshots.lookup(scope["path"], scope["query_string"])
+        if entry is None:
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        headers = {**entry.get("headers", {}),
+                   "ETag": entry["etag"], "Cache-Control": CACHE_CONTROL, "Vary": "Accept-Encoding"}
+        if entry["last_modified"]:
+            headers["Last-Modified"] = _http_date(datetime.fromisoformat(entry["last_modified"]))
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None and _etag_matches(if_none_match, entry["etag"]):
+            snapshots.not_modified += 1
+            await Response(status_code=304, headers=headers)(scope, receive, send)
+            return
+
+        file = entry["file"]
+        encoding = negotiate(request_headers.get("accept-encoding"))
+        if encoding is not None and entry["encodings"]:
+            variant = entry["encodings"].get(encoding)
+            if variant is None:
+                # Exported without this coding; the routers will compress it
+                snapshots.missed += 1
+                await self.app(scope, receive, send)
+                return
+            file = variant["file"]
+            headers["ETag"] = encoding_etag(entry["etag"], encoding)
+            headers["Content-Encoding"] = encoding
+        snapshots.served += 1
+        await FileResponse(snapshots.directory / file, media_type="application/json", headers=headers)(scope, receive, send)
+
+
+async def _main(args) -> int:
+    from storage import storage
+
+    out = Path(args.out)
+    if args.command == "status":
+        manifest = load_manifest(out)
+        if manifest is None:
+            print(f"No snapshot in {out}")
+            return 1
+        store = storage.connect()
+        try:
+            stale = [name for name in PUBLIC_COLLECTIONS
+                     if manifest["fingerprints"].get(name) != await fingerprint(store, name)]
+        finally:
+            storage.close()
+        print(f"{len(manifest['files'])} files generated {manifest['generated_at']} from {manifest['backend']}")
+        print(f"Changed since: {', '.join(stale) or 'nothing'}")
+        return 0
+
+    store = storage.connect()
+    try:
+        report = await export(store, out, full=args.full)
+    finally:
+        storage.close()
+    print(f"✅ Snapshot in {out}: {report['files']} files; rendered {report['rendered']}, "
+          f"wrote {report['written']}, removed {report['removed']} in {report['took_ms']:.0f} ms")
+    print(f"   changed collections: {', '.join(report['changed']) or 'none'}")
+    return 0
+
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+
+    load_dotenv(Path(__file__).parent / '.env')
+    parser = argparse.ArgumentParser(description="Export the public API as static files")
+    parser.add_argument("command", choices=["export", "status"])
+    parser.add_argument("--out", default=os.environ.get("SNAPSHOT_DIR", str(DEFAULT_SNAPSHOT_DIR)), help="snapshot directory")
+    parser.add_argument("--full", action="store_true", help="render everything, ignoring the previous manifest")
+    raise SystemExit(asyncio.run(_main(parser.parse_args())))
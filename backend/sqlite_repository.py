@@ -0,0 +1,326 @@
+"""SQLite implementation of the repository interface.
+
+Each collection is a table of ``(id TEXT PRIMARY KEY, doc TEXT)`` holding the
+document as JSON; the registered indexes become expression indexes over
+``json_extract``, and filters and sorts are translated to SQL on the same
+expressions so SQLite can use them. The database runs in WAL mode, so readers
+never block the writer. Calls run on a worker thread; the connection is
+shared behind a lock and writes that read first use ``BEGIN IMMEDIATE`` so
+they stay atomic across processes.
+"""
+import json
+import sqlite3
+import asyncio
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from indexes import IndexSpec
+from repository import (COMPARISONS, FIELD_OPERATORS, VERSION_CONFLICT, DuplicateKey, Repository, SortSpec, WriteOp,
+                        _is_operator_dict, bson_precision, next_version, project)
+from versioning import INITIAL_VERSION, VersionConflict
+
+DATE_KEY = "$date"
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+
+def _date_text(value: datetime) -> str:
+    # Fixed-width text, so tagged dates compare and sort in time order
+    return bson_precision(value).strftime(DATE_FORMAT)
+
+
+def _encode_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {DATE_KEY: _date_text(value)}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _decode_hook(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1 and DATE_KEY in obj:
+        return datetime.strptime(obj[DATE_KEY], DATE_FORMAT)
+    return obj
+
+
+def encode(doc: Dict[str, Any]) -> str:
+    return json.dumps(doc, default=_encode_default, ensure_ascii=False, separators=(",", ":"))
+
+
+def decode(text: str) -> Dict[str, Any]:
+    return json.loads(text, object_hook=_decode_hook)
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _path(field: str, date: bool = False) -> str:
+    parts = field.split(".") + ([DATE_KEY] if date else [])
+    return "'$" + "".join(f'."{part}"' for part in parts) + "'"
+
+
+def extract(field: str, date: bool = False) -> str:
+    """SQL for a field's value; index definitions and filters must use the identical text"""
+    return f"json_extract(doc, {_path(field, date)})"
+
+
+class _Translator:
+    """Builds a WHERE clause and its parameters from a filter document"""
+
+    def __init__(self):
+        self.params: List[Any] = []
+
+    def where(self, query: Optional[Dict[str, Any]]) -> str:
+        clauses = []
+        for key, condition in (query or {}).items():
+            if key == "$and":
+                clauses.append("(" + " AND ".join(self.where(clause) for clause in condition) + ")" if condition else "1")
+            elif key == "$or":
+                clauses.append("(" + " OR ".join(self.where(clause) for clause in condition) + ")" if condition else "0")
+            elif key.startswith("$"):
+                raise ValueError(f"Unsupported query operator: {key}")
+            elif _is_operator_dict(condition):
+                clauses.extend(self._operator(key, operator, argument) for operator, argument in condition.items())
+            else:
+                clauses.append(self._equals(key, condition))
+        return " AND ".join(clauses) if clauses else "1"
+
+    def _equals(self, field: str, value: Any) -> str:
+        if value is None:
+            return f"{extract(field)} IS NULL"
+        if isinstance(value, bool):
+            self.params.append(int(value))
+            return f"({extract(field)} = ? AND json_type(doc, {_path(field)}) = '{'true' if value else 'false'}')"
+        if isinstance(value, datetime):
+            self.params.append(_date_text(value))
+            return f"{extract(field, date=True)} = ?"
+        if isinstance(value, (dict, list)):
+            raise ValueError("Equality on objects and arrays is not supported")
+        self.params.append(value)
+        return f"{extract(field)} = ?"
+
+    def _in(self, field: str, values: Sequence[Any]) -> str:
+        if not values:
+            return "0"
+        if all(isinstance(value, (str, int, float)) and not isinstance(value, bool) for value in values):
+            self.params.extend(values)
+            return f"{extract(field)} IN ({', '.join('?' for _ in values)})"
+        return "(" + " OR ".join(self._equals(field, value) for value in values) + ")"
+
+    def _operator(self, field: str, operator: str, argument: Any) -> str:
+        if operator not in FIELD_OPERATORS:
+            raise ValueError(f"Unsupported query operator: {operator}")
+        if operator == "$eq":
+            return self._equals(field, argument)
+        if operator == "$ne":
+            return f"NOT IFNULL({self._equals(field, argument)}, 0)"
+        if operator == "$in":
+            return self._in(field, argument)
+        if operator == "$nin":
+            return f"NOT IFNULL({self._in(field, argument)}, 0)"
+        return self._compare(field, COMPARISONS_SQL[operator], argument)
+
+    def _compare(self, field: str, sql_operator: str, value: Any) -> str:
+        # Like MongoDB, a range only matches values of the same type
+        if value is None:
+            return "0"
+        if isinstance(value, datetime):
+            self.params.append(_date_text(value))
+            return f"{extract(field, date=True)} {sql_operator} ?"
+        if isinstance(value, bool):
+            types = "('true', 'false')"
+        elif isinstance(value, (int, float)):
+            types = "('integer', 'real')"
+        elif isinstance(value, str):
+            types = "('text')"
+        else:
+            raise ValueError(f"Unsupported comparison value: {value!r}")
+        self.params.append(int(value) if isinstance(value, bool) else value)
+        return f"({extract(field)} {sql_operator} ? AND json_type(doc, {_path(field)}) IN {types})"
+
+
+COMPARISONS_SQL = dict(zip(COMPARISONS, (">", ">=", "<", "<=")))
+
+
+def _order_by(sort: Optional[SortSpec]) -> str:
+    if not sort:
+        return ""
+    return " ORDER BY " + ", ".join(f"{extract(field)} {'DESC' if direction < 0 else 'ASC'}" for field, direction in sort)
+
+
+class SqliteDatabase:
+    """One SQLite file in WAL mode, shared by the repositories of every collection"""
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = self._connect()
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    async def run(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        def locked():
+            with self._lock:
+                return fn(self._conn)
+        return await asyncio.to_thread(locked)
+
+    def reader(self) -> sqlite3.Connection:
+        """A separate connection for long reads, so a stream doesn't hold the shared one"""
+        if self.path == ":memory:":
+            return self._conn
+        return self._connect()
+
+    def ensure_table(self, table: str, specs: Iterable[IndexSpec]):
+        with self._lock:
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS {_quote(table)} (id TEXT PRIMARY KEY, doc TEXT NOT NULL)")
+            for spec in specs:
+                if [field for field, _ in spec.keys] == ["id"]:
+                    continue  # the primary key
+                columns = ", ".join(f"{extract(field)} {'DESC' if direction < 0 else 'ASC'}" for field, direction in spec.keys)
+                self._conn.execute(
+                    f"CREATE {'UNIQUE ' if spec.unique else ''}INDEX IF NOT EXISTS "
+                    f"{_quote(f'{table}_{spec.name}')} ON {_quote(table)} ({columns})"
+                )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, rolled back on error"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+class SqliteRepository(Repository):
+    def __init__(self, database: SqliteDatabase, name: str, specs: Iterable[IndexSpec] = ()):
+        super().__init__(name)
+        self.database = database
+        self.table = _quote(name)
+        database.ensure_table(name, specs)
+
+    def _select_sql(self, query, sort, limit, columns: str = "doc") -> Tuple[str, List[Any]]:
+        translator = _Translator()
+        sql = f"SELECT {columns} FROM {self.table} WHERE {translator.where(query)}{_order_by(sort)}"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return sql, translator.params
+
+    async def find(self, query=None, sort=None, limit=None, projection=None):
+        sql, params = self._select_sql(query, sort, limit)
+        rows = await self.database.run(lambda conn: conn.execute(sql, params).fetchall())
+        return [project(decode(row[0]), projection) for row in rows]
+
+    async def iterate(self, query=None, sort=None, limit=None, projection=None, batch_size=200):
+        sql, params = self._select_sql(query, sort, limit)
+        conn = self.database.reader()
+        cursor = await asyncio.to_thread(conn.execute, sql, params)
+        try:
+            while True:
+                rows = await asyncio.to_thread(cursor.fetchmany, batch_size)
+                if not rows:
+                    return
+                for row in rows:
+                    yield project(decode(row[0]), projection)
+        finally:
+            cursor.close()
+            if conn is not self.database._conn:
+                conn.close()
+
+    async def distinct(self, field, query=None):
+        translator = _Translator()
+        where = translator.where(query)
+        # json_each yields a scalar once and each element of an array
+        sql = (f"SELECT DISTINCT item.value, item.type FROM {self.table}, json_each({self.table}.doc, {_path(field)}) AS item "
+               f"WHERE {where} AND item.type != 'null'")
+        rows = await self.database.run(lambda conn: conn.execute(sql, translator.params).fetchall())
+        return [bool(value) if kind in ("true", "false") else value for value, kind in rows]
+
+    async def count(self, query=None, limit=None):
+        sql, params = self._select_sql(query, None, limit, columns="1")
+        return await self.database.run(lambda conn: conn.execute(f"SELECT COUNT(*) FROM ({sql})", params).fetchone()[0])
+
+    def _insert(self, conn: sqlite3.Connection, doc: Dict[str, Any]):
+        stored = {key: value for key, value in doc.items() if key != "_id"}
+        try:
+            conn.execute(f"INSERT INTO {self.table} (id, doc) VALUES (?, ?)", (stored["id"], encode(stored)))
+        except sqlite3.IntegrityError as e:
+            raise DuplicateKey(f"{self.name}: {e}")
+
+    def _update(self, conn: sqlite3.Connection, item_id: str, changes: Dict[str, Any],
+                expected_version: Optional[int]) -> Tuple[Optional[dict], Optional[dict]]:
+        row = conn.execute(f"SELECT doc FROM {self.table} WHERE id = ?", (item_id,)).fetchone()
+        if row is None:
+            return None, None
+        before = decode(row[0])
+        if expected_version is not None and (before.get("version") or INITIAL_VERSION) != expected_version:
+            raise VersionConflict(item_id)
+        after = {**before, **changes, "version": next_version(before)}
+        try:
+            conn.execute(f"UPDATE {self.table} SET doc = ? WHERE id = ?", (encode(after), item_id))
+        except sqlite3.IntegrityError as e:
+            raise DuplicateKey(f"{self.name}: {e}")
+        return before, after
+
+    async def insert(self, doc):
+        await self.database.run(lambda conn: self._insert(conn, doc))
+
+    async def update(self, item_id, changes, expected_version=None, projection=None, return_previous=False):
+        def run(conn):
+            with _Transaction(conn):
+                return self._update(conn, item_id, changes, expected_version)
+        before, after = await self.database.run(run)
+        if after is None:
+            return None
+        return project(before if return_previous else after, projection)
+
+    async def delete(self, item_id, projection=None):
+        def run(conn):
+            with _Transaction(conn):
+                row = conn.execute(f"SELECT doc FROM {self.table} WHERE id = ?", (item_id,)).fetchone()
+                if row is not None:
+                    conn.execute(f"DELETE FROM {self.table} WHERE id = ?", (item_id,))
+                return row
+        row = await self.database.run(run)
+        return project(decode(row[0]), projection) if row else None
+
+    async def apply_writes(self, writes: List[WriteOp]):
+        def run(conn):
+            errors: List[Optional[str]] = []
+            # One transaction; a failed statement is undone on its own and the rest still commit
+            with _Transaction(conn):
+                for write in writes:
+                    try:
+                        if write.op == "insert":
+                            self._insert(conn, write.doc)
+                        elif write.op == "update":
+                            self._update(conn, write.item_id, write.doc, write.expected_version)
+                        else:
+                            conn.execute(f"DELETE FROM {self.table} WHERE id = ?", (write.item_id,))
+                        errors.append(None)
+                    except VersionConflict:
+                        errors.append(VERSION_CONFLICT)
+                    except DuplicateKey as e:
+                        errors.append(str(e))
+            return errors
+        return await self.database.run(run)
+
+    async def clear(self):
+        await self.database.run(lambda conn: conn.execute(f"DELETE FROM {self.table}"))
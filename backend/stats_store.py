@@ -0,0 +1,176 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from http_cache import mark_changed
+from models import Stats, StatsHistoryPoint, StatsUpdate
+from repository import DuplicateKey
+from storage import Storage
+
+logger = logging.getLogger(__name__)
+
+# The current stats live in a single upserted document with this id
+CURRENT_STATS_ID = "current"
+METRICS = tuple(StatsUpdate.model_fields)
+
+DEFAULT_STATS = StatsUpdate(
+    total_sales=4000000,
+    clients_served=500,
+    years_experience=8,
+    projects_completed=750
+)
+
+
+def month_bucket(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1)
+
+
+def months_ago(moment: datetime, months: int) -> datetime:
+    """Start of the month ``months - 1`` months before ``moment``'s month"""
+    index = moment.year * 12 + (moment.month - 1) - (months - 1)
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+class StatsStore:
+    """Serves the current stats from memory and records monthly history.
+
+    Reads never reach storage once loaded; ``update`` writes the current
+    document, refreshes the in-memory copy and caches, then records the
+    history bucket. History is best effort: a failed sample is logged and
+    never fails the update that has already been written.
+    """
+
+    def __init__(self):
+        self._current: Optional[dict] = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _projection() -> dict:
+        return {"_id": 0, **{name: 1 for name in Stats.model_fields}}
+
+    async def load(self, store: Storage) -> dict:
+        """Load the current stats, adopting legacy documents or defaults if needed"""
+        async with self._lock:
+            current = await store.stats.get(CURRENT_STATS_ID, self._projection())
+            if current is None:
+                # Adopt the newest document written by the old delete+insert scheme
+                legacy = await store.stats.find_one({}, self._projection(), sort=[("updated_at", -1)])
+                values = {name: legacy[name] for name in METRICS} if legacy else DEFAULT_STATS.dict()
+                try:
+                    await store.stats.insert({**values, "id": CURRENT_STATS_ID, "updated_at": datetime.utcnow()})
+                except DuplicateKey:
+                    # Another worker inserted it first
+                    pass
+                current = await store.stats.get(CURRENT_STATS_ID, self._projection())
+            self._current = current
+            return current
+
+    @property
+    def loaded(self) -> bool:
+        return self._current is not None
+
+    async def current(self, store: Storage) -> dict:
+        if self._current is None:
+            return await self.load(store)
+        return self._current
+
+    def invalidate(self):
+        """Forget the in-memory copy so the next read reloads it"""
+        self._current = None
+
+    async def update(self, store: Storage, stats_data: StatsUpdate) -> dict:
+        now = datetime.utcnow()
+        values = {**stats_data.dict(), "updated_at": now}
+        for attempt in range(2):
+            current = await store.stats.update(CURRENT_STATS_ID, values, projection=self._projection())
+            if current is not None:
+                break
+            try:
+                await store.stats.insert({**values, "id": CURRENT_STATS_ID})
+                current = await store.stats.get(CURRENT_STATS_ID, self._projection())
+                break
+            except DuplicateKey:
+                # Two first-time writers raced on the unique id; the retry updates
+                if attempt:
+                    raise
+        self._current = current
+        mark_changed("stats")
+        await self._record_history(store, stats_data.dict(), now)
+        return current
+
+    async def _record_history(self, store: Storage, values: dict, now: datetime):
+        for attempt in range(2):
+            try:
+                await self._write_history(store, values, now)
+                return
+            except (DuplicateKey, DuplicateKeyError) as e:
+                # Two writers created the month's bucket at once; the retry updates it
+                if attempt:
+                    logger.warning("Stats history sample for %s lost: %s", now, e)
+            except Exception:
+                logger.exception("Stats history sample for %s lost", now)
+                return
+
+    async def _write_history(self, store: Storage, values: dict, now: datetime):
+        bucket_start = month_bucket(now)
+        if store.mongo is None:
+            await self._merge_history(store, bucket_start, values, now)
+            return
+        # One atomic upsert, so concurrent writers can't lose a sample
+        await store.mongo.stats_history.update_one(
+            {"bucket_start": bucket_start},
+            {
+                "$set": {"last": values, "updated_at": now},
+                "$min": {f"min.{name}": value for name, value in values.items()},
+                "$max": {f"max.{name}": value for name, value in values.items()},
+                "$inc": {"samples": 1},
+            },
+            upsert=True
+        )
+
+    async def _merge_history(self, store: Storage, bucket_start: datetime, values: dict, now: datetime):
+        # Read-modify-write under the store lock; fine for a single admin writer
+        bucket_id = bucket_start.strftime("%Y-%m")
+        async with self._lock:
+            bucket = await store.stats_history.get(bucket_id)
+            if bucket is None:
+                await store.stats_history.insert({
+                    "id": bucket_id,
+                    "bucket_start": bucket_start,
+                    "last": values,
+                    "min": dict(values),
+                    "max": dict(values),
+                    "samples": 1,
+                    "updated_at": now,
+                })
+                return
+            await store.stats_history.update(bucket_id, {
+                "last": values,
+                "min": {name: min(value, bucket["min"].get(name, value)) for name, value in values.items()},
+                "max": {name: max(value, bucket["max"].get(name, value)) for name, value in values.items()},
+                "samples": bucket["samples"] + 1,
+                "updated_at": now,
+            })
+
+    async def history(self, store: Storage, metric: str, since: datetime) -> List[StatsHistoryPoint]:
+        docs = await store.stats_history.find(
+            {"bucket_start": {"$gte": month_bucket(since)}},
+            [("bucket_start", 1)],
+            projection={"bucket_start": 1, "samples": 1, f"last.{metric}": 1, f"min.{metric}": 1, f"max.{metric}": 1}
+        )
+        return [
+            StatsHistoryPoint(
+                bucket_start=doc["bucket_start"],
+                value=doc["last"][metric],
+                min=doc["min"][metric],
+                max=doc["max"][metric],
+                samples=doc["samples"]
+            )
+            for doc in docs
+        ]
+
+
+stats_store = StatsStore()
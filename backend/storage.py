@@ -0,0 +1,165 @@
+"""Selects the storage backend the routers read and write through.
+
+``STORAGE_BACKEND`` picks one of:
+
+- ``mongo`` (default): the shared Motor client from ``database.py``
+- ``memory``: per-process dicts, for tests and demos; nothing is persisted
+- ``sqlite``: one WAL-mode file at ``SQLITE_PATH``
+
+Routers take ``store: Storage = Depends(get_storage)`` and use
+``store.portfolio`` (or ``store["portfolio"]``) as a ``Repository``.
+Features built on MongoDB itself — the contact write-behind queue, contact
+rollups and analytics, index migration and the change feed — check
+``store.mongo`` and stay off on the other backends.
+"""
+import os
+import logging
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from database import database
+from indexes import INDEX_REGISTRY
+from repository import MemoryRepository, MongoRepository, Repository
+from sqlite_repository import SqliteDatabase, SqliteRepository
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("mongo", "memory", "sqlite")
+DEFAULT_SQLITE_PATH = Path(__file__).parent / "data" / "portfolio.db"
+
+
+class Storage(ABC):
+    """Repositories by collection name for one backend"""
+
+    backend = ""
+
+    def __init__(self):
+        self._repositories: Dict[str, Repository] = {}
+
+    @property
+    def mongo(self) -> Optional[AsyncIOMotorDatabase]:
+        """The Motor database when the backend is MongoDB, else None"""
+        return None
+
+    @abstractmethod
+    def _create(self, name: str) -> Repository:
+        """A new repository for collection ``name``"""
+
+    def __getitem__(self, name: str) -> Repository:
+        repository = self._repositories.get(name)
+        if repository is None:
+            repository = self._repositories[name] = self._create(name)
+        return repository
+
+    def __getattr__(self, name: str) -> Repository:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def ping(self) -> dict:
+        return {"backend": self.backend}
+
+    def close(self):
+        pass
+
+
+class MongoStorage(Storage):
+    backend = "mongo"
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        super().__init__()
+        self.db = db
+
+    @property
+    def mongo(self) -> AsyncIOMotorDatabase:
+        return self.db
+
+    def _create(self, name: str) -> Repository:
+        return MongoRepository(self.db[name])
+
+    async def ping(self) -> dict:
+        await self.db.command("ping")
+        return {"backend": self.backend, "pool_utilization": database.pool_stats()["utilization"]}
+
+
+class MemoryStorage(Storage):
+    backend = "memory"
+
+    def _create(self, name: str) -> Repository:
+        return MemoryRepository(name, INDEX_REGISTRY.get(name, ()))
+
+
+class SqliteStorage(Storage):
+    backend = "sqlite"
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.database = SqliteDatabase(path)
+
+    def _create(self, name: str) -> Repository:
+        return SqliteRepository(self.database, name, INDEX_REGISTRY.get(name, ()))
+
+    async def ping(self) -> dict:
+        await self.database.run(lambda conn: conn.execute("SELECT 1").fetchone())
+        return {"backend": self.backend, "path": self.database.path}
+
+    def close(self):
+        self.database.close()
+
+
+class StorageManager:
+    """Opens the configured backend at startup and hands it to requests"""
+
+    def __init__(self, backend: str = "mongo", sqlite_path: str = str(DEFAULT_SQLITE_PATH)):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown storage backend: {backend}. Must be one of: {list(BACKENDS)}")
+        self.backend = backend
+        self.sqlite_path = sqlite_path
+        self._store: Optional[Storage] = None
+
+    @classmethod
+    def from_env(cls) -> "StorageManager":
+        return cls(
+            backend=os.environ.get("STORAGE_BACKEND", "mongo").lower(),
+            sqlite_path=os.environ.get("SQLITE_PATH", str(DEFAULT_SQLITE_PATH)),
+        )
+
+    def connect(self) -> Storage:
+        if self.backend == "mongo":
+            database.connect()
+        elif self._store is None:
+            self._store = MemoryStorage() if self.backend == "memory" else SqliteStorage(self.sqlite_path)
+            logger.info("Storage backend: %s", self.backend)
+        return self.current
+
+    @property
+    def current(self) -> Optional[Storage]:
+        if self.backend != "mongo":
+            return self._store
+        # Follow the shared client, so anything that swaps database.db is picked up
+        if database.db is None:
+            return None
+        if not isinstance(self._store, MongoStorage) or self._store.db is not database.db:
+            self._store = MongoStorage(database.db)
+        return self._store
+
+    def close(self):
+        if self.backend == "mongo":
+            database.close()
+        elif self._store is not None:
+            self._store.close()
+        self._store = None
+
+
+storage = StorageManager.from_env()
+
+
+def get_storage() -> Storage:
+    """FastAPI dependency returning the configured storage"""
+    store = storage.current
+    if store is None:
+        raise RuntimeError("Storage is not connected; the app lifespan has not started")
+    return store
@@ -0,0 +1,287 @@
+"""Synthetic contacts, portfolio items, testimonials and skills at any scale.
+
+Documents are drawn from RNG streams seeded per (seed, collection, block of
+BLOCK_SIZE), so the same seed always produces the same documents whatever
+the batch size, and appending continues the sequence rather than repeating
+it. Timestamps are spread over the ``days`` before ``until``, skewed towards
+recent ones the way real traffic is.
+
+``load`` streams the documents into storage in unordered batches with a
+bounded number of batches in flight: ``insert_many(ordered=False)`` on
+MongoDB, ``apply_writes`` on the other backends.
+"""
+import time
+import uuid
+import random
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from itertools import islice
+from string import Formatter
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from pymongo.errors import BulkWriteError
+
+from contact_analytics import ROLLUP_COLLECTION, contact_rollups
+from repository import WriteOp
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SIZE = 1000
+
+FIRST_NAMES = ["Aisha", "Ben", "Carlos", "Chloe", "Daniel", "Elena", "Fatima", "George", "Hana", "Ivan",
+               "Jasmine", "Kenji", "Laura", "Mateo", "Nadia", "Omar", "Priya", "Quinn", "Rosa", "Samuel",
+               "Tariq", "Uma", "Victor", "Wei", "Yara", "Zoe"]
+LAST_NAMES = ["Adeyemi", "Brown", "Chen", "Dubois", "Evans", "Fischer", "Garcia", "Hughes", "Ito", "Johnson",
+              "Kowalski", "Lopez", "Martin", "Nguyen", "O'Brien", "Patel", "Rossi", "Silva", "Smith", "Tanaka",
+              "Walker", "Yilmaz", "Zhang"]
+DOMAINS = ["gmail.com", "outlook.com", "yahoo.com", "icloud.com", "proton.me", "example.com"]
+COMPANY_WORDS = ["Atlas", "Bloom", "Cedar", "Drift", "Ember", "Fable", "Harbor", "Juniper", "Lumen", "Nomad",
+                 "Orbit", "Pebble", "Quill", "Summit", "Tidal", "Verve"]
+COMPANY_SUFFIXES = ["Co", "Goods", "Labs", "Studio", "Supply", "Collective", "Brands", "Outfitters"]
+SERVICES = ["Business Consulting", "Shopify Store Development", "Amazon Store Setup", "Brand Design"]
+POSITIONS = ["Founder", "CEO", "Co-founder", "Marketing Director", "Head of E-commerce", "Owner", "COO"]
+CATEGORIES = ["E-commerce", "Amazon", "Dropshipping", "Branding", "Marketing", "Consulting"]
+TECHNOLOGIES = ["Shopify", "Amazon Seller Central", "Klaviyo", "Facebook Ads", "Google Ads", "Helium 10",
+                "Google Analytics", "Figma", "Canva", "WooCommerce", "TikTok Ads", "Zapier", "Gorgias", "Yotpo"]
+SKILL_CATEGORIES = ["Business", "Development", "E-commerce", "Marketing", "Design"]
+SKILL_TOPICS = ["Conversion Optimization", "Email Marketing", "PPC Management", "Store Design", "Supply Chain",
+                "Product Research", "Copywriting", "Analytics", "Brand Strategy", "Customer Retention",
+                "Marketplace SEO", "Paid Social", "Pricing Strategy", "Fulfillment"]
+SKILL_LEVELS = ["Advanced", "Applied", "Enterprise", "Practical", "Strategic"]
+OPENERS = ["Hi,", "Hello there,", "Good morning,", "Hey!", "Hi team,"]
+ASKS = [
+    "I'm looking for help scaling our {service} efforts.",
+    "We run a small {category} business and need advice on growth.",
+    "Could you share pricing for {service}?",
+    "Our conversion rate dropped last quarter and we'd like an audit.",
+    "We're launching a new product line and want a store that converts.",
+    "A friend recommended you for {service}.",
+]
+DETAILS = [
+    "Our revenue is around ${revenue}K a year.",
+    "We currently sell on {technology}.",
+    "Timeline is flexible but we'd like to start next month.",
+    "Happy to jump on a call this week.",
+    "We have a team of {team} people.",
+]
+PRAISE = [
+    "Working with them transformed our {category} business.",
+    "Revenue grew {growth}% within six months.",
+    "Clear communication and real results from week one.",
+    "They rebuilt our {technology} setup and our conversion rate doubled.",
+    "I'd recommend them to any founder serious about growth.",
+]
+RESULTS = {
+    "revenue": "{n}% increase",
+    "conversion": "{n}% improvement",
+    "traffic": "{n}% growth",
+    "roi": "{n}% ROAS",
+    "orders": "{n}% more orders",
+}
+
+
+def _created_at(rng: random.Random, until: datetime, days: int) -> datetime:
+    # Skewed towards recent, truncated to the millisecond precision BSON stores
+    moment = until - timedelta(seconds=days * 86400 * rng.betavariate(1, 3))
+    return moment.replace(microsecond=moment.microsecond // 1000 * 1000)
+
+
+def _id(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _company(rng: random.Random) -> str:
+    return f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_SUFFIXES)}"
+
+
+PLACEHOLDERS: Dict[str, Callable[[random.Random], Any]] = {
+    "service": lambda rng: rng.choice(SERVICES).lower(),
+    "category": lambda rng: rng.choice(CATEGORIES).lower(),
+    "technology": lambda rng: rng.choice(TECHNOLOGIES),
+    "revenue": lambda rng: rng.randint(20, 2000),
+    "team": lambda rng: rng.randint(2, 40),
+    "growth": lambda rng: rng.randint(30, 400),
+}
+_template_fields: Dict[str, List[str]] = {}
+
+
+def _fill(rng: random.Random, template: str) -> str:
+    # Only draw the values a template uses; this runs a few times per document
+    fields = _template_fields.get(template)
+    if fields is None:
+        fields = _template_fields[template] = [name for _, name, _, _ in Formatter().parse(template) if name]
+    return template.format(**{name: PLACEHOLDERS[name](rng) for name in fields})
+
+
+def contact(rng: random.Random, i: int, until: datetime, days: int) -> Dict[str, Any]:
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    sentences = [rng.choice(OPENERS), _fill(rng, rng.choice(ASKS))]
+    sentences += [_fill(rng, detail) for detail in rng.sample(DETAILS, rng.randint(0, 3))]
+    return {
+        "id": _id(rng),
+        "name": f"{first} {last}",
+        "email": f"{first}.{last}{i}@{rng.choice(DOMAINS)}".lower().replace("'", ""),
+        "company": _company(rng) if rng.random() < 0.6 else None,
+        "service": rng.choice(SERVICES) if rng.random() < 0.7 else None,
+        "message": " ".join(sentences),
+        "created_at": _created_at(rng, until, days),
+        "status": rng.choices(["new", "read", "replied"], weights=[5, 3, 2])[0],
+    }
+
+
+def portfolio_item(rng: random.Random, i: int, until: datetime, days: int) -> Dict[str, Any]:
+    category = rng.choice(CATEGORIES)
+    return {
+        "id": _id(rng),
+        "title": f"{_company(rng)} {rng.choice(['Scale-up', 'Relaunch', 'Optimization', 'Rebrand', 'Launch'])}",
+        "category": category,
+        "description": f"{_fill(rng, rng.choice(PRAISE))} {_fill(rng, rng.choice(DETAILS))}",
+        "results": {key: RESULTS[key].format(n=rng.randint(20, 900)) for key in rng.sample(sorted(RESULTS), 3)},
+        "technologies": rng.sample(TECHNOLOGIES, rng.randint(2, 5)),
+        "image_url": None,
+        "project_url": f"https://example.com/projects/{i}" if rng.random() < 0.3 else None,
+        "is_featured": rng.random() < 0.1,
+        "created_at": _created_at(rng, until, days),
+        "updated_at": None,
+        "version": 1,
+    }
+
+
+def testimonial(rng: random.Random, i: int, until: datetime, days: int) -> Dict[str, Any]:
+    return {
+        "id": _id(rng),
+        "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        "position": rng.choice(POSITIONS),
+        "company": _company(rng),
+        "testimonial": " ".join(_fill(rng, praise) for praise in rng.sample(PRAISE, rng.randint(1, 3))),
+        "rating": rng.choices([3, 4, 5], weights=[1, 3, 6])[0],
+        "avatar_url": None,
+        "is_featured": rng.random() < 0.15,
+        "created_at": _created_at(rng, until, days),
+        "updated_at": None,
+        "version": 1,
+    }
+
+
+def skill(rng: random.Random, i: int, until: datetime, days: int) -> Dict[str, Any]:
+    return {
+        "id": _id(rng),
+        "name": f"{rng.choice(SKILL_LEVELS)} {rng.choice(SKILL_TOPICS)}",
+        "level": rng.randint(40, 100),
+        "category": rng.choice(SKILL_CATEGORIES),
+        "created_at": _created_at(rng, until, days),
+        "updated_at": None,
+        "version": 1,
+    }
+
+
+GENERATORS: Dict[str, Callable[[random.Random, int, datetime, int], Dict[str, Any]]] = {
+    "contacts": contact,
+    "portfolio": portfolio_item,
+    "testimonials": testimonial,
+    "skills": skill,
+}
+
+
+def generate(collection: str, count: int, seed: int = 0, start: int = 0,
+             until: Optional[datetime] = None, days: int = 730) -> Iterator[Dict[str, Any]]:
+    """Documents ``start`` to ``start + count`` of a collection's sequence for ``seed``"""
+    build = GENERATORS[collection]
+    until = until or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    end = start + count
+    for block in range(start // BLOCK_SIZE, (end - 1) // BLOCK_SIZE + 1 if count else 0):
+        rng = random.Random(f"{seed}:{collection}:{block}")
+        for i in range(block * BLOCK_SIZE, (block + 1) * BLOCK_SIZE):
+            # Build the whole block so each document only depends on its position
+            doc = build(rng, i, until, days)
+            if start <= i < end:
+                yield doc
+
+
+async def _insert_batch(store, collection: str, docs: List[Dict[str, Any]], rollups: Optional[Counter]) -> int:
+    """Insert one batch; returns how many documents failed"""
+    db = store.mongo
+    if db is None:
+        errors = await store[collection].apply_writes([WriteOp("insert", doc["id"], doc) for doc in docs])
+        return sum(1 for error in errors if error)
+
+    failed = set()
+    try:
+        await db[collection].insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        failed = {error["index"] for error in e.details.get("writeErrors", [])}
+    if rollups is not None:
+        rollups.update(contact_rollups.inserted_deltas(doc for index, doc in enumerate(docs) if index not in failed))
+    return len(failed)
+
+
+async def load(store, counts: Dict[str, int], seed: int = 0, batch_size: int = 1000, concurrency: int = 4,
+               append: bool = False, until: Optional[datetime] = None, days: int = 730,
+               progress: Optional[Callable[[str, int, float], None]] = None) -> Dict[str, Dict[str, Any]]:
+    """Stream generated documents into storage; returns throughput per collection.
+
+    Without ``append`` each collection is cleared first. With it, generation
+    starts at the collection's current size, so repeated runs add new
+    documents instead of colliding with earlier ones.
+    """
+    report: Dict[str, Dict[str, Any]] = {}
+    for collection, count in counts.items():
+        repository = store[collection]
+        if append:
+            start = await repository.count()
+        else:
+            start = 0
+            await repository.clear()
+            if collection == "contacts" and store.mongo is not None and contact_rollups.enabled:
+                await store.mongo[ROLLUP_COLLECTION].delete_many({})
+
+        # Contact rollups are summed across batches and written once at the end
+        rollups = Counter() if collection == "contacts" and store.mongo is not None and contact_rollups.enabled else None
+        batches: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+        totals = {"inserted": 0, "failed": 0}
+        started = time.perf_counter()
+
+        async def worker():
+            while True:
+                docs = await batches.get()
+                if docs is None:
+                    return
+                failed = await _insert_batch(store, collection, docs, rollups)
+                totals["failed"] += failed
+                totals["inserted"] += len(docs) - failed
+                if progress is not None:
+                    progress(collection, totals["inserted"], time.perf_counter() - started)
+
+        async def produce():
+            docs = generate(collection, count, seed, start, until, days)
+            while True:
+                batch = list(islice(docs, batch_size))
+                if not batch:
+                    break
+                # Blocks while every worker is busy, which bounds memory to a few batches
+                await batches.put(batch)
+            for _ in range(concurrency):
+                await batches.put(None)
+
+        tasks = [asyncio.create_task(produce()), *(asyncio.create_task(worker()) for _ in range(concurrency))]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            # A failed batch stops the rest rather than leaving the producer blocked
+            for task in tasks:
+                task.cancel()
+        if rollups:
+            await contact_rollups.record_deltas(store.mongo, rollups)
+
+        seconds = time.perf_counter() - started
+        report[collection] = {
+            "start": start,
+            "inserted": totals["inserted"],
+            "failed": totals["failed"],
+            "seconds": round(seconds, 3),
+            "docs_per_second": round(totals["inserted"] / seconds) if seconds else 0,
+        }
+        logger.info("Loaded %d %s (%d failed) in %.1fs", totals["inserted"], collection, totals["failed"], seconds)
+    return report
@@ -0,0 +1,78 @@
+import re
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+
+# Documents written before the version field existed count as version 1
+INITIAL_VERSION = 1
+
+
+class VersionConflict(Exception):
+    """The document exists but its version differs from the expected one"""
+
+
+def versioned_update(changes: Dict[str, Any]) -> List[dict]:
+    """Pipeline update that applies ``changes`` and increments ``version``.
+
+    Values are wrapped in $literal so user text starting with "$" is never
+    read as a field path.
+    """
+    fields = {name: {"$literal": value} for name, value in changes.items()}
+    fields["version"] = {"$add": [{"$ifNull": ["$version", INITIAL_VERSION]}, 1]}
+    return [{"$set": fields}]
+
+
+def version_filter(expected_version: int) -> Any:
+    if expected_version == INITIAL_VERSION:
+        return {"$in": [INITIAL_VERSION, None]}
+    return expected_version
+
+
+# Detail ETags end in the document version, before any content-coding suffix: "...-v3" or "...-v3-gzip"
+_DOCUMENT_VERSION = re.compile(r'-v(\d+)(?:-[a-z]+)?"$')
+
+
+def document_etag(etag: str, version: int) -> str:
+    """ETag for one document: ``etag`` plus the document version, which If-Match reads back"""
+    return f'{etag[:-1]}-v{version}"'
+
+
+def strip_document_version(etag: str) -> str:
+    return re.sub(r'-v\d+"$', '"', etag)
+
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """Read the expected document version from an If-Match header.
+
+    Accepts the ETag a detail GET returned (``"portfolio-...-v3"``), or the
+    version as a bare number or entity tag (``3``, ``"3"``, ``W/"3"``);
+    ``*`` means any version.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    value = if_match.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    match = _DOCUMENT_VERSION.search(value)
+    if match:
+        return int(match.group(1))
+    try:
+        return int(value.strip('"'))
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail="If-Match must carry the ETag of a detail GET or the document version, e.g. If-Match: \"3\""
+        )
+
+
+async def update_versioned(repository, item_id: str, changes: Dict[str, Any],
+                           expected_version: Optional[int], projection: Dict[str, int]) -> Optional[dict]:
+    """Apply ``changes`` through ``repository`` and return the post-image.
+
+    Returns None when the id doesn't exist. Raises 412 when ``expected_version``
+    is given and another writer got there first.
+    """
+    try:
+        return await repository.update(item_id, changes, expected_version, projection)
+    except VersionConflict:
+        raise HTTPException(status_code=412, detail="Document was modified by another request; reload and retry")
@@ -0,0 +1,139 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+from cache import CacheKey
+from compression import ENCODERS
+from http_cache import prerender
+from search import search_index
+from stats_store import stats_store
+from storage import Storage
+from routes.bundle import SECTIONS, fetch_bundle
+from routes.stats import fetch_stats
+from routes.services import fetch_services
+from routes.portfolio import fetch_portfolio_items, fetch_portfolio_categories
+from routes.testimonials import fetch_testimonials
+from routes.experience import fetch_experience
+from routes.skills import fetch_skills, fetch_skill_categories
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupTarget(NamedTuple):
+    key: CacheKey  # must match the key the route builds for the same request
+    load: Callable[[Storage], Awaitable[Any]]
+
+
+_FULL_BUNDLE = {name: None for name in SECTIONS}
+
+# The responses a first visitor requests: default list views, categories and the homepage bundle
+WARMUP_TARGETS: List[WarmupTarget] = [
+    WarmupTarget(("stats", "current"), fetch_stats),
+    WarmupTarget(("services", "list", True), fetch_services),
+    WarmupTarget(("portfolio", "list", None, False), fetch_portfolio_items),
+    WarmupTarget(("portfolio", "list", None, True), lambda store: fetch_portfolio_items(store, featured_only=True)),
+    WarmupTarget(("portfolio", "categories"), fetch_portfolio_categories),
+    WarmupTarget(("testimonials", "list", False), fetch_testimonials),
+    WarmupTarget(("testimonials", "list", True), lambda store: fetch_testimonials(store, featured_only=True)),
+    WarmupTarget(("experience", "list"), fetch_experience),
+    WarmupTarget(("skills", "list", None), fetch_skills),
+    WarmupTarget(("skills", "categories"), fetch_skill_categories),
+    WarmupTarget(("bundle", "list") + tuple(sorted(_FULL_BUNDLE.items())), lambda store: fetch_bundle(store, _FULL_BUNDLE)),
+]
+
+
+class CacheWarmer:
+    """Startup phase that loads in-memory state and pre-renders public responses.
+
+    Runs in the background so liveness answers straight away; the readiness
+    check fails until it finishes. Whatever hasn't finished when ``budget``
+    seconds run out is cancelled and left to fill on first request.
+    """
+
+    def __init__(self, budget: float = 15.0, enabled: bool = True):
+        self.budget = budget
+        self.enabled = enabled
+        self.state = "pending"
+        self._task: Optional[asyncio.Task] = None
+        self._report: Dict[str, Any] = {}
+
+    @classmethod
+    def from_env(cls) -> "CacheWarmer":
+        return cls(
+            budget=float(os.environ.get("WARMUP_BUDGET_SECONDS", 15)),
+            enabled=os.environ.get("WARMUP_ENABLED", "true").lower() == "true",
+        )
+
+    @property
+    def done(self) -> bool:
+        return self.state in ("complete", "timed_out")
+
+    def start(self, store: Storage, targets: List[WarmupTarget] = WARMUP_TARGETS):
+        if self._task is None:
+            self.state = "running"
+            # In-memory state is always loaded; WARMUP_ENABLED only controls pre-rendering
+            self._task = asyncio.create_task(self._run(store, targets if self.enabled else []))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, store: Storage, targets: List[WarmupTarget]):
+        started = time.perf_counter()
+        encodings = list(ENCODERS)
+        steps: Dict[str, Awaitable[Any]] = {
+            "stats": stats_store.load(store),
+            "search_index": search_index.rebuild(store),
+        }
+        for target in targets:
+            steps[":".join(str(part) for part in target.key)] = prerender(
+                target.key, lambda target=target: target.load(store), encodings
+            )
+        tasks = {asyncio.ensure_future(step): name for name, step in steps.items()}
+
+        finished, pending = await asyncio.wait(tasks, timeout=self.budget)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending)
+
+        failed = {}
+        rendered_bytes = 0
+        for task in finished:
+            if task.exception() is not None:
+                failed[tasks[task]] = str(task.exception()) or type(task.exception()).__name__
+            elif isinstance(task.result(), int):
+                rendered_bytes += task.result()
+        self.state = "timed_out" if pending else "complete"
+        self._report = {
+            "took_ms": round((time.perf_counter() - started) * 1000, 2),
+            "warmed": len(finished) - len(failed),
+            "rendered_bytes": rendered_bytes,
+            "failed": failed,
+            "unfinished": sorted(tasks[task] for task in pending),
+        }
+        for name, error in failed.items():
+            logger.warning("Warm-up step %s failed: %s", name, error)
+        if pending:
+            logger.warning("Warm-up exceeded its %.1fs budget; unfinished: %s",
+                           self.budget, ", ".join(self._report["unfinished"]))
+        logger.info("Warm-up %s in %.0f ms (%d steps)", self.state, self._report["took_ms"], len(tasks))
+
+    def report(self) -> Dict[str, Any]:
+        return {"state": self.state, "prerender": self.enabled, "budget_seconds": self.budget, **self._report}
+
+    async def check(self) -> Dict[str, Any]:
+        """Readiness check: fails while warm-up is still running"""
+        if not self.done:
+            raise RuntimeError(f"Warm-up {self.state}")
+        return self.report()
+
+
+cache_warmer = CacheWarmer.from_env()
@@ -0,0 +1,40 @@
+"""Shared fixtures: the API running on the in-memory storage backend.
+
+The environment is set before any backend module is imported, since the
+module singletons read their settings at import time.
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+os.environ.update(
+    STORAGE_BACKEND="memory",
+    CONTACT_QUEUE_ENABLED="false",
+    RATE_LIMIT_ENABLED="false",
+    SNAPSHOT_SERVE="false",
+)
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def client():
+    """A TestClient with a fresh in-memory store and empty read cache"""
+    from fastapi.testclient import TestClient
+    from cache import read_cache
+    import server
+
+    read_cache.clear()
+    with TestClient(server.app) as client:
+        deadline = time.monotonic() + 5
+        while not server.cache_warmer.done and time.monotonic() < deadline:
+            time.sleep(0.01)
+        yield client
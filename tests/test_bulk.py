@@ -0,0 +1,69 @@
+"""Bulk create/update/delete: per-item results, version checks and cache invalidation."""
+import pytest
+
+SKILL = {"name": "Python", "level": 90, "category": "Backend"}
+
+
+def bulk(client, **payload):
+    response = client.post("/api/skills/bulk", json=payload)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_mixed_batch_reports_each_item(client):
+    created = bulk(client, create=[SKILL, {**SKILL, "name": "Go"}, {**SKILL, "name": "Rust"}])
+    assert (created["created"], created["failed"]) == (3, 0)
+    python, go, rust = (result["id"] for result in created["results"])
+
+    result = bulk(
+        client,
+        create=[{**SKILL, "name": "Zig"}],
+        update=[{"id": python, "data": {**SKILL, "level": 95}, "version": 1}, {"id": "missing", "data": SKILL}],
+        delete=[rust, "missing"],
+    )
+    assert (result["created"], result["updated"], result["deleted"], result["failed"]) == (1, 1, 1, 2)
+    assert [(item["op"], item["index"], item["success"], item["error"]) for item in result["results"]] == [
+        ("create", 0, True, None),
+        ("update", 0, True, None),
+        ("update", 1, False, "Not found"),
+        ("delete", 0, True, None),
+        ("delete", 1, False, "Not found"),
+    ]
+
+    skills = {skill["name"]: skill for skill in client.get("/api/skills").json()}
+    assert sorted(skills) == ["Go", "Python", "Zig"]
+    assert (skills["Python"]["level"], skills["Python"]["version"]) == (95, 2)
+    assert skills["Go"]["id"] == go
+
+
+def test_stale_versions_are_rejected_per_item(client):
+    [created] = bulk(client, create=[SKILL])["results"]
+    client.put(f"/api/skills/{created['id']}", json={**SKILL, "level": 50})
+
+    result = bulk(client, update=[{"id": created["id"], "data": {**SKILL, "level": 10}, "version": 1}])
+    assert result["results"][0]["error"] == "Version conflict"
+    assert client.get(f"/api/skills/{created['id']}").json()["level"] == 50
+
+
+def test_bulk_writes_invalidate_cached_reads(client):
+    [created] = bulk(client, create=[SKILL])["results"]
+    list_etag = client.get("/api/skills").headers["etag"]
+    detail = client.get(f"/api/skills/{created['id']}")
+
+    bulk(client, update=[{"id": created["id"], "data": {**SKILL, "level": 10}}])
+    assert client.get("/api/skills", headers={"If-None-Match": list_etag}).json()[0]["level"] == 10
+    response = client.get(f"/api/skills/{created['id']}", headers={"If-None-Match": detail.headers["etag"]})
+    assert response.status_code == 200
+    assert response.json()["level"] == 10
+
+
+@pytest.mark.parametrize("collection", ["services", "portfolio", "testimonials", "experience", "skills"])
+def test_every_resource_has_a_bulk_endpoint(client, collection):
+    result = client.post(f"/api/{collection}/bulk", json={"delete": ["missing"]}).json()
+    assert result["failed"] == 1
+
+
+def test_invalid_items_fail_the_whole_request(client):
+    response = client.post("/api/skills/bulk", json={"create": [SKILL, {**SKILL, "level": 500}]})
+    assert response.status_code == 422
+    assert client.get("/api/skills").json() == []
@@ -0,0 +1,53 @@
+"""Homepage bundle: the sections match their endpoints, can be trimmed and follow writes."""
+import pytest
+
+SERVICE = {"title": "Audits", "description": "Store audits", "icon": "A", "features": ["Speed"], "price": "$1"}
+PORTFOLIO = {"title": "Scale-up", "category": "E-commerce", "description": "Scaled a store",
+             "results": {"revenue": "900%"}, "technologies": ["Shopify"]}
+
+
+@pytest.fixture
+def content(client):
+    client.post("/api/services", json=SERVICE)
+    client.post("/api/services", json={**SERVICE, "title": "Retired", "is_active": False})
+    client.post("/api/portfolio", json={**PORTFOLIO, "is_featured": True})
+    client.post("/api/portfolio", json={**PORTFOLIO, "title": "Side project"})
+    client.post("/api/skills", json={"name": "Python", "level": 90, "category": "Backend"})
+
+
+def test_bundle_matches_the_homepage_endpoints(client, content):
+    bundle = client.get("/api/bundle").json()
+
+    assert list(bundle) == ["stats", "services", "portfolio", "testimonials", "experience", "skills"]
+    assert bundle["stats"] == client.get("/api/stats").json()
+    assert bundle["services"] == client.get("/api/services").json()
+    assert [service["title"] for service in bundle["services"]] == ["Audits"]
+    assert bundle["portfolio"] == client.get("/api/portfolio", params={"featured_only": "true"}).json()
+    assert [item["title"] for item in bundle["portfolio"]] == ["Scale-up"]
+    assert bundle["skills"] == client.get("/api/skills").json()
+
+
+def test_sections_and_fields_trim_the_bundle(client, content):
+    bundle = client.get("/api/bundle", params={"sections": "stats,skills", "fields[skills]": "name,level"}).json()
+
+    assert list(bundle) == ["stats", "skills"]
+    assert bundle["skills"] == [{"name": "Python", "level": 90}]
+
+
+@pytest.mark.parametrize("params", [
+    {"sections": "stats,blog"},
+    {"sections": "skills", "fields[skills]": "name,password"},
+    {"sections": "skills", "fields[skills]": ","},
+])
+def test_unknown_sections_and_fields_are_400(client, params):
+    assert client.get("/api/bundle", params=params).status_code == 400
+
+
+def test_writes_to_any_section_invalidate_the_bundle(client, content):
+    etag = client.get("/api/bundle").headers["etag"]
+    assert client.get("/api/bundle", headers={"If-None-Match": etag}).status_code == 304
+
+    client.post("/api/skills", json={"name": "Go", "level": 80, "category": "Backend"})
+    response = client.get("/api/bundle", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert [skill["name"] for skill in response.json()["skills"]] == ["Python", "Go"]
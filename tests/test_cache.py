@@ -0,0 +1,120 @@
+"""Read cache: single-flight loads, invalidation, eviction and expiry."""
+import asyncio
+
+import pytest
+
+from cache import ENTRY_OVERHEAD_BYTES, ResponseCache
+
+pytestmark = pytest.mark.anyio
+
+SKILL = {"name": "Python", "level": 90, "category": "Backend"}
+
+
+class Loader:
+    """Counts calls and holds each load until released"""
+
+    def __init__(self, value="value", error=None):
+        self.value = value
+        self.error = error
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value, 10
+
+
+async def test_concurrent_misses_share_one_load():
+    cache = ResponseCache()
+    loader = Loader()
+    waiters = [asyncio.ensure_future(cache.get_or_load(("skills", "list"), loader)) for _ in range(5)]
+    await asyncio.sleep(0)
+    loader.release.set()
+
+    assert await asyncio.gather(*waiters) == ["value"] * 5
+    assert loader.calls == 1
+    assert await cache.get_or_load(("skills", "list"), loader) == "value"
+    assert loader.calls == 1
+    assert cache.stats()["hits"] == 1
+
+
+async def test_failed_load_reaches_every_waiter_and_is_retried():
+    cache = ResponseCache()
+    loader = Loader(error=RuntimeError("database down"))
+    waiters = [asyncio.ensure_future(cache.get_or_load(("skills", "list"), loader)) for _ in range(3)]
+    await asyncio.sleep(0)
+    loader.release.set()
+
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(cache) == 0
+
+    loader.error = None
+    assert await cache.get_or_load(("skills", "list"), loader) == "value"
+    assert loader.calls == 2
+
+
+async def test_write_during_load_is_not_cached():
+    cache = ResponseCache()
+    loader = Loader(value="stale")
+    pending = asyncio.ensure_future(cache.get_or_load(("skills", "list"), loader))
+    await asyncio.sleep(0)
+    cache.invalidate("skills")
+    loader.release.set()
+
+    # The caller that started the load still gets its result, but nobody after it
+    assert await pending == "stale"
+    assert len(cache) == 0
+
+
+def test_invalidate_keeps_other_details():
+    cache = ResponseCache()
+    for key in [("skills", "list", None), ("skills", "detail", "a"), ("skills", "detail", "b"), ("services", "list")]:
+        cache.set(key, "value", 10)
+
+    cache.invalidate("skills", "a")
+    assert cache.get(("skills", "list", None)) is None
+    assert cache.get(("skills", "detail", "a")) is None
+    assert cache.get(("skills", "detail", "b")) == "value"
+    assert cache.get(("services", "list")) == "value"
+
+    cache.invalidate_all("skills")
+    assert cache.get(("skills", "detail", "b")) is None
+    assert cache.stats()["invalidations"] == 2
+
+
+def test_eviction_by_entries_bytes_and_ttl():
+    cache = ResponseCache(max_entries=2)
+    cache.set(("a", "list"), 1, 10)
+    cache.set(("b", "list"), 2, 10)
+    cache.get(("a", "list"))
+    cache.set(("c", "list"), 3, 10)
+    # "b" was least recently used
+    assert cache.get(("b", "list")) is None
+    assert cache.stats()["evictions"] == 1
+
+    cache = ResponseCache(max_bytes=2 * ENTRY_OVERHEAD_BYTES + 100)
+    cache.set(("a", "list"), 1, 50)
+    cache.set(("b", "list"), 2, 60)
+    assert cache.get(("a", "list")) is None
+    assert cache.stats()["bytes"] == ENTRY_OVERHEAD_BYTES + 60
+    # Too big to ever fit: not cached at all
+    cache.set(("c", "list"), 3, 1000)
+    assert cache.get(("c", "list")) is None
+
+    cache = ResponseCache(ttl_seconds=0)
+    cache.set(("a", "list"), 1, 10)
+    assert cache.get(("a", "list")) is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_writes_through_the_api_invalidate_lists(client):
+    assert client.get("/api/skills").json() == []
+    assert client.get("/api/skills").json() == []
+    assert client.get("/api/health/cache").json()["hits"] >= 1
+
+    client.post("/api/skills", json=SKILL)
+    assert [skill["name"] for skill in client.get("/api/skills").json()] == ["Python"]
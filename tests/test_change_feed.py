@@ -0,0 +1,160 @@
+"""Change feed: applying stream events and the polling fallback, on a MongoDB test double."""
+import asyncio
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+import change_feed as change_feed_module
+from change_feed import ChangeFeed
+from http_cache import versions
+from search import SearchIndex
+from stats_store import stats_store
+from storage import MongoStorage
+
+pytestmark = pytest.mark.anyio
+
+PORTFOLIO = {"id": "p1", "title": "Shopify migration", "description": "Moved a store", "technologies": ["Shopify"],
+             "category": "E-commerce", "results": {}, "version": 1}
+
+
+@pytest.fixture
+def store():
+    return MongoStorage(AsyncMongoMockClient().db)
+
+
+@pytest.fixture
+def search(monkeypatch):
+    index = SearchIndex()
+    monkeypatch.setattr(change_feed_module, "search_index", index)
+    return index
+
+
+def event(operation, collection, doc=None):
+    change = {"operationType": operation, "ns": {"db": "portfolio", "coll": collection}}
+    if doc is not None:
+        change["fullDocument"] = doc
+    return change
+
+
+async def test_document_events_invalidate_and_reindex(store, search):
+    feed = ChangeFeed(reload_delay=0)
+    before = versions.get("portfolio")
+    feed._apply(store, event("insert", "portfolio", PORTFOLIO))
+
+    assert versions.get("portfolio") == before + 1
+    assert [hit["id"] for hit in search.search("shopify")["results"]] == ["p1"]
+
+    feed._apply(store, event("update", "portfolio", {**PORTFOLIO, "title": "Magento rebuild", "technologies": []}))
+    assert search.search("shopify")["results"] == []
+    assert feed.stats()["events"] == 2
+
+
+async def test_deletes_reload_the_whole_collection(store, search):
+    await store.portfolio.insert(dict(PORTFOLIO))
+    search.index_document("portfolio", {**PORTFOLIO, "id": "gone"})
+    feed = ChangeFeed(reload_delay=0)
+    before = versions.get("portfolio")
+
+    # Delete events only carry the _id
+    feed._apply(store, event("delete", "portfolio"))
+    await feed._reload_task
+    assert versions.get("portfolio") == before + 1
+    assert [hit["id"] for hit in search.search("shopify")["results"]] == ["p1"]
+
+
+async def test_stats_events_drop_the_in_memory_stats(store, search):
+    await stats_store.load(store)
+    ChangeFeed()._apply(store, event("update", "stats", {"id": "current"}))
+    assert not stats_store.loaded
+
+
+async def test_polling_sees_writes_from_other_processes(store, search):
+    # The test double has no change streams at all
+    feed = ChangeFeed(collections=("skills",), mode="poll", poll_interval=0.01)
+    feed.start(store)
+    try:
+        for _ in range(100):
+            if feed.active_mode == "poll":
+                break
+            await asyncio.sleep(0.01)
+        assert (await feed.check())["mode"] == "poll"
+        await asyncio.sleep(0.05)
+
+        before = versions.get("skills")
+        # Written by another process, bypassing this one's routes
+        await store.mongo.skills.insert_one({"id": "k1", "name": "Go", "level": 80, "category": "Backend"})
+        for _ in range(100):
+            if versions.get("skills") > before:
+                break
+            await asyncio.sleep(0.01)
+        assert versions.get("skills") > before
+        assert feed.stats()["events"] >= 1
+    finally:
+        await feed.stop()
+
+
+async def test_feed_stays_off_without_mongodb():
+    from storage import MemoryStorage
+
+    feed = ChangeFeed()
+    feed.start(MemoryStorage())
+    assert not feed.enabled
+    assert await feed.check() == {"mode": None, "events": 0}
+
+
+class FakeStream:
+    def __init__(self, changes, error):
+        self.changes = changes
+        self.error = error
+        self.resume_token = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.changes:
+            raise self.error
+        change = self.changes.pop(0)
+        self.resume_token = {"_data": change["ns"]["coll"] + change["fullDocument"]["id"]}
+        return change
+
+
+class FakeDatabase:
+    """Hands out one scripted stream per watch() call and records where each resumed"""
+
+    def __init__(self, *streams):
+        self.streams = list(streams)
+        self.resumed_after = []
+
+    def watch(self, pipeline, full_document=None, resume_after=None):
+        self.resumed_after.append(resume_after)
+        return self.streams.pop(0)
+
+
+class StreamingStorage(MongoStorage):
+    @property
+    def mongo(self):
+        return self.db
+
+
+async def test_stream_resumes_after_the_last_event(search):
+    from pymongo.errors import AutoReconnect, OperationFailure
+
+    db = FakeDatabase(
+        FakeStream([event("insert", "skills", {"id": "k1"})], AutoReconnect("primary stepped down")),
+        FakeStream([event("update", "skills", {"id": "k2"})], OperationFailure("oplog rolled over", code=286)),
+        FakeStream([], asyncio.CancelledError()),
+    )
+    feed = ChangeFeed(collections=("skills",), mode="stream", reload_delay=0)
+    with pytest.raises(asyncio.CancelledError):
+        await feed._stream(StreamingStorage(db))
+
+    # Resumed after the reconnect, but started over once the history was lost
+    assert db.resumed_after == [None, {"_data": "skillsk1"}, None]
+    assert (feed.events, feed.reconnects, feed.resyncs) == (2, 1, 1)
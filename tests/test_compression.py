@@ -0,0 +1,96 @@
+"""Content-coding negotiation, per-coding ETags and revalidation across codings."""
+import pytest
+
+import compression
+from compression import encoding_etag, negotiate, strip_encoding
+
+IDENTITY = {"Accept-Encoding": "identity"}
+GZIP = {"Accept-Encoding": "gzip"}
+
+
+@pytest.fixture
+def encoders(monkeypatch):
+    # Whatever codecs are installed, negotiate over a known set in server preference order
+    monkeypatch.setattr(compression, "ENCODERS", {"br": None, "zstd": None, "gzip": None})
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("gzip, br", "br"),
+    ("gzip;q=1.0, br;q=0.5", "gzip"),
+    ("br;q=0, *", "zstd"),
+    ("*;q=0", None),
+    ("gzip;q=bogus", None),
+    ("GZIP", "gzip"),
+])
+def test_negotiate(encoders, header, expected):
+    assert negotiate(header) == expected
+
+
+def test_encoding_etags_round_trip(encoders):
+    assert encoding_etag('"skills-1"', None) == '"skills-1"'
+    assert encoding_etag('"skills-1"', "gzip") == '"skills-1-gzip"'
+    assert strip_encoding('"skills-1-br"') == '"skills-1"'
+    assert strip_encoding('"skills-1"') == '"skills-1"'
+
+
+def create_skills(client, count=20):
+    for i in range(count):
+        response = client.post("/api/skills", json={"name": f"Skill number {i}", "level": 50, "category": "Backend"})
+        assert response.status_code == 200
+
+
+def test_large_responses_are_compressed_with_their_own_etag(client):
+    create_skills(client)
+    plain = client.get("/api/skills", headers=IDENTITY)
+    gzipped = client.get("/api/skills", headers=GZIP)
+
+    assert "content-encoding" not in plain.headers
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in gzipped.headers["vary"]
+    assert gzipped.headers["etag"] == encoding_etag(plain.headers["etag"], "gzip")
+    assert gzipped.json() == plain.json()
+
+
+def test_any_coding_of_an_etag_revalidates(client):
+    create_skills(client)
+    gzip_etag = client.get("/api/skills", headers=GZIP).headers["etag"]
+
+    assert client.get("/api/skills", headers={**IDENTITY, "If-None-Match": gzip_etag}).status_code == 304
+    assert client.get("/api/skills", headers={**GZIP, "If-None-Match": f"W/{gzip_etag}"}).status_code == 304
+
+    client.post("/api/skills", json={"name": "Go", "level": 50, "category": "Backend"})
+    assert client.get("/api/skills", headers={**GZIP, "If-None-Match": gzip_etag}).status_code == 200
+
+
+def test_detail_etag_keeps_version_and_coding(client):
+    item_id = client.post("/api/portfolio", json={
+        "title": "Scale-up", "category": "E-commerce", "description": "Scaled a store",
+        "results": {"revenue": "x" * 2000}, "technologies": ["Shopify"],
+    }).json()["id"]
+    etag = client.get(f"/api/portfolio/{item_id}", headers=GZIP).headers["etag"]
+    assert etag.endswith('-v1-gzip"')
+
+    response = client.get(f"/api/portfolio/{item_id}", headers={**GZIP, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+
+def test_small_responses_go_out_uncompressed(client):
+    before = client.get("/api/health/compression").json()["skipped_small"]
+    response = client.get("/api/skills", headers=GZIP)
+
+    assert "content-encoding" not in response.headers
+    assert client.get("/api/health/compression").json()["skipped_small"] > before
+
+
+def test_streamed_responses_are_compressed_chunk_by_chunk(client):
+    create_skills(client)
+    response = client.get("/api/skills", params={"format": "ndjson"}, headers=GZIP)
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert len(response.text.splitlines()) == 20
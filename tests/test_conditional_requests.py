@@ -0,0 +1,138 @@
+"""Conditional requests: ETag revalidation on reads and If-Match on updates."""
+from datetime import datetime
+
+import pytest
+
+from models import PortfolioItem
+
+
+PORTFOLIO = {
+    "title": "Fashion Brand Scale-up",
+    "category": "E-commerce",
+    "description": "Scaled a fashion startup",
+    "results": {"revenue": "900% increase"},
+    "technologies": ["Shopify"],
+}
+
+
+def create(client, **changes):
+    response = client.post("/api/portfolio", json={**PORTFOLIO, **changes})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def test_put_with_etag_from_get(client):
+    item_id = create(client)
+    etag = client.get(f"/api/portfolio/{item_id}").headers["etag"]
+
+    response = client.put(f"/api/portfolio/{item_id}", json={**PORTFOLIO, "title": "Edited"}, headers={"If-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["version"] == 2
+
+    # The same ETag is now stale
+    response = client.put(f"/api/portfolio/{item_id}", json={**PORTFOLIO, "title": "Lost"}, headers={"If-Match": etag})
+    assert response.status_code == 412
+    assert client.get(f"/api/portfolio/{item_id}").json()["title"] == "Edited"
+
+
+def test_compressed_etag_works_as_if_match(client):
+    item_id = create(client, results={"revenue": "x" * 2000})
+    response = client.get(f"/api/portfolio/{item_id}", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    response = client.put(f"/api/portfolio/{item_id}", json=PORTFOLIO, headers={"If-Match": response.headers["etag"]})
+    assert response.status_code == 200
+
+
+def test_if_match_accepts_bare_versions(client):
+    item_id = create(client)
+    assert client.put(f"/api/portfolio/{item_id}", json=PORTFOLIO, headers={"If-Match": '"1"'}).status_code == 200
+    assert client.put(f"/api/portfolio/{item_id}", json=PORTFOLIO, headers={"If-Match": "1"}).status_code == 412
+    assert client.put(f"/api/portfolio/{item_id}", json=PORTFOLIO, headers={"If-Match": "*"}).status_code == 200
+
+
+def test_if_match_rejects_list_etags(client):
+    item_id = create(client)
+    list_etag = client.get("/api/portfolio").headers["etag"]
+    assert client.put(f"/api/portfolio/{item_id}", json=PORTFOLIO, headers={"If-Match": list_etag}).status_code == 400
+
+
+def test_list_revalidates_until_a_write(client):
+    create(client)
+    response = client.get("/api/portfolio")
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"]
+
+    response = client.get("/api/portfolio", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+    assert client.get("/api/portfolio", headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+    assert client.get("/api/portfolio", headers={"If-None-Match": "*"}).status_code == 304
+
+    create(client, title="Another")
+    response = client.get("/api/portfolio", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert len(response.json()) == 2
+
+
+def test_if_modified_since(client):
+    create(client)
+    last_modified = client.get("/api/portfolio").headers["last-modified"]
+
+    assert client.get("/api/portfolio", headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get("/api/portfolio", headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"}).status_code == 200
+    assert client.get("/api/portfolio", headers={"If-Modified-Since": "yesterday"}).status_code == 200
+    # If-None-Match wins when both are sent
+    headers = {"If-Modified-Since": last_modified, "If-None-Match": '"other"'}
+    assert client.get("/api/portfolio", headers=headers).status_code == 200
+
+
+def test_delete_changes_last_modified(client):
+    from storage import storage
+
+    for item_id, year in [("older", 2020), ("newer", 2021)]:
+        item = PortfolioItem(**PORTFOLIO, id=item_id, created_at=datetime(year, 1, 1))
+        client.portal.call(storage.current.portfolio.insert, item.dict())
+    # Revalidating a copy fetched before the delete, which is newer than the item that's left
+    since = "Sat, 01 Jan 2022 00:00:00 GMT"
+
+    # The remaining item is older than the deleted one, but the list still changed
+    assert client.delete("/api/portfolio/newer").status_code == 200
+    response = client.get("/api/portfolio", headers={"If-Modified-Since": since})
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()] == ["older"]
+
+
+def test_detail_revalidates_until_the_document_changes(client):
+    item_id = create(client)
+    etag = client.get(f"/api/portfolio/{item_id}").headers["etag"]
+    assert etag.endswith('-v1"')
+    assert client.get(f"/api/portfolio/{item_id}", headers={"If-None-Match": etag}).status_code == 304
+
+    client.put(f"/api/portfolio/{item_id}", json={**PORTFOLIO, "title": "Edited"})
+    response = client.get(f"/api/portfolio/{item_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"].endswith('-v2"')
+
+
+@pytest.mark.parametrize("collection, payload", [
+    ("services", {"title": "Audits", "description": "Store audits", "icon": "A", "features": ["Speed"], "price": "$1"}),
+    ("testimonials", {"name": "Grace", "position": "CTO", "company": "Acme", "testimonial": "Great work, on time.",
+                      "rating": 5}),
+    ("experience", {"company": "Acme", "position": "Lead", "duration": "2020-2023", "description": "Led the team",
+                    "achievements": ["Shipped"]}),
+    ("skills", {"name": "Python", "level": 90, "category": "Backend"}),
+])
+def test_stale_if_match_is_412_everywhere(client, collection, payload):
+    item_id = client.post(f"/api/{collection}", json=payload).json()["id"]
+    etag = client.get(f"/api/{collection}/{item_id}").headers["etag"]
+
+    assert client.put(f"/api/{collection}/{item_id}", json=payload, headers={"If-Match": etag}).status_code == 200
+    assert client.put(f"/api/{collection}/{item_id}", json=payload, headers={"If-Match": etag}).status_code == 412
+    # Without If-Match the last writer wins
+    assert client.put(f"/api/{collection}/{item_id}", json=payload).status_code == 200
+
+
+def test_if_match_on_unknown_id_is_404(client):
+    assert client.put("/api/portfolio/missing", json=PORTFOLIO, headers={"If-Match": '"1"'}).status_code == 404
@@ -0,0 +1,62 @@
+"""Contact analytics: incremental rollups, rebuilds and request validation."""
+from datetime import datetime
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from contact_analytics import ContactRollups
+
+CONTACTS = [
+    {"id": str(i), "status": "replied" if i % 2 else "new", "service": "Audit" if i < 3 else None,
+     "company": "Acme", "created_at": datetime(2026, 3, 1 + i % 3, 23)}
+    for i in range(6)
+]
+
+
+@pytest.fixture
+async def db():
+    db = AsyncMongoMockClient().db
+    await db.contacts.insert_many([dict(contact) for contact in CONTACTS])
+    return db
+
+
+@pytest.mark.anyio
+async def test_incremental_rollups_match_a_rebuild(db):
+    rollups = ContactRollups(enabled=True)
+    await rollups.record_inserted(db, CONTACTS)
+    await rollups.record_status_change(db, CONTACTS[0], "replied")
+    await db.contacts.update_one({"id": "0"}, {"$set": {"status": "replied"}})
+    await rollups.record_deleted(db, CONTACTS[5])
+    await db.contacts.delete_one({"id": "5"})
+    incremental = await rollups.analytics(db, None, None)
+
+    assert incremental["total"] == 5
+    assert incremental["by_status"] == {"new": 2, "replied": 3}
+    assert incremental["by_service"] == {"Audit": 3, "unspecified": 2}
+    assert incremental["timeline"] == [{"bucket": "2026-03-01", "count": 2}, {"bucket": "2026-03-02", "count": 2},
+                                       {"bucket": "2026-03-03", "count": 1}]
+
+    await rollups.rebuild(db)
+    rebuilt = await rollups.analytics(db, None, None)
+    assert rebuilt == incremental
+
+
+@pytest.mark.anyio
+async def test_rollups_bucket_by_week_and_fold_the_tail(db):
+    rollups = ContactRollups(enabled=True)
+    await rollups.record_inserted(db, CONTACTS)
+    result = await rollups.analytics(db, datetime(2026, 3, 2, 12), None, interval="week", top=1)
+
+    assert result["timeline"] == [{"bucket": "2026-W10", "count": 4}]
+    assert result["by_service"] == {"Audit": 2, "other": 2}
+
+
+@pytest.mark.parametrize("tz", ["Mars/Olympus_Mons", "../../etc/passwd", ""])
+def test_unknown_time_zones_are_400(client, tz):
+    response = client.get("/api/contact/analytics", params={"tz": tz, "live": "true"})
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Invalid tz")
+
+
+def test_analytics_need_mongodb(client):
+    assert client.get("/api/contact/analytics", params={"tz": "Europe/Berlin"}).status_code == 501
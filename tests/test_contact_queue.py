@@ -0,0 +1,170 @@
+"""Contact write-behind queue: batching, spool replay after a crash and adoption."""
+import asyncio
+import fcntl
+
+import pytest
+from bson import json_util
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from ingest import ContactQueue
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeContacts:
+    """Just enough of a Motor collection for the queue; unique on ``id``"""
+
+    def __init__(self):
+        self.docs = {}
+        self.down = False
+        self.fail_with = None
+
+    async def insert_many(self, docs, ordered=False):
+        if self.down:
+            raise AutoReconnect("connection refused")
+        if self.fail_with is not None:
+            error, self.fail_with = self.fail_with, None
+            raise error
+        errors = []
+        for index, doc in enumerate(docs):
+            if doc["id"] in self.docs:
+                errors.append({"index": index, "code": 11000, "errmsg": "E11000 duplicate key"})
+            elif doc.get("invalid"):
+                errors.append({"index": index, "code": 121, "errmsg": "Document failed validation"})
+            else:
+                self.docs[doc["id"]] = doc
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+
+def contact(contact_id, **fields):
+    return {"id": contact_id, "name": "Ada", "email": "ada@example.com", "message": "Hello there!", **fields}
+
+
+def queue_in(spool_dir, **options):
+    return ContactQueue(spool_dir, flush_interval=0.01, drain_timeout=1.0, **options)
+
+
+async def drained(queue):
+    for _ in range(200):
+        if not queue.depth:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"{queue.depth} submissions still queued")
+
+
+def crash(queue):
+    """Stop the writer without draining, as a killed process would"""
+    queue._task.cancel()
+    queue._spool.close()
+    queue._lock.close()
+
+
+def write_spool(path, *records):
+    path.write_text("".join(json_util.dumps(record) + "\n" for record in records))
+
+
+async def test_submissions_are_flushed_in_batches(tmp_path):
+    collection = FakeContacts()
+    queue = queue_in(tmp_path, batch_size=2)
+    written = []
+    queue.add_listener(lambda docs: asyncio.sleep(0, written.extend(docs)))
+    await queue.start(collection)
+    for i in range(5):
+        await queue.submit(contact(str(i)))
+    await drained(queue)
+    await queue.stop()
+
+    assert sorted(collection.docs) == ["0", "1", "2", "3", "4"]
+    assert len(written) == 5
+    assert queue.stats()["flushed"] == 5
+    # A clean stop leaves nothing to replay
+    assert list(tmp_path.iterdir()) == []
+
+
+async def test_unflushed_submissions_survive_a_crash(tmp_path):
+    collection = FakeContacts()
+    collection.down = True
+    queue = queue_in(tmp_path)
+    await queue.start(collection)
+    await queue.submit(contact("a"))
+    await queue.submit(contact("b"))
+    await asyncio.sleep(0.05)
+    assert queue.stats()["flush_failures"] >= 1
+    assert queue.pending("a") is not None
+    crash(queue)
+
+    collection.down = False
+    restarted = queue_in(tmp_path)
+    await restarted.start(collection)
+    assert restarted.stats()["replayed"] == 2
+    await drained(restarted)
+    await restarted.stop()
+    assert sorted(collection.docs) == ["a", "b"]
+
+
+async def test_spools_of_dead_workers_are_adopted(tmp_path):
+    # Another worker acknowledged "a", accepted "b" and "c", then died mid-write
+    (tmp_path / "contacts-99999.lock").touch()
+    write_spool(
+        tmp_path / "contacts-99999.log",
+        {"op": "add", "doc": contact("a")},
+        {"op": "add", "doc": contact("b")},
+        {"op": "ack", "ids": ["a"]},
+        {"op": "add", "doc": contact("c")},
+    )
+    with open(tmp_path / "contacts-99999.log", "a") as spool:
+        spool.write('{"op": "add", "doc": {"id": "torn"')
+
+    collection = FakeContacts()
+    collection.docs["c"] = contact("c")  # already written before the crash: replay is harmless
+    queue = queue_in(tmp_path)
+    await queue.start(collection)
+    await drained(queue)
+    await queue.stop()
+
+    assert sorted(collection.docs) == ["b", "c"]
+    assert queue.stats()["discarded"] == 0
+    assert not (tmp_path / "contacts-99999.log").exists()
+
+
+async def test_live_workers_keep_their_spool(tmp_path):
+    write_spool(tmp_path / "contacts-99999.log", {"op": "add", "doc": contact("a")})
+    with open(tmp_path / "contacts-99999.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        collection = FakeContacts()
+        queue = queue_in(tmp_path)
+        await queue.start(collection)
+        await queue.stop()
+
+    assert collection.docs == {}
+    assert (tmp_path / "contacts-99999.log").exists()
+
+
+async def test_rejected_documents_are_dropped_not_retried(tmp_path):
+    collection = FakeContacts()
+    queue = queue_in(tmp_path)
+    await queue.start(collection)
+    await queue.submit(contact("bad", invalid=True))
+    await queue.submit(contact("good"))
+    await drained(queue)
+    await queue.stop()
+
+    assert list(collection.docs) == ["good"]
+    assert queue.stats()["discarded"] == 1
+
+
+async def test_unexpected_errors_do_not_stop_the_writer(tmp_path):
+    collection = FakeContacts()
+    collection.fail_with = TypeError("cannot encode object")
+    queue = queue_in(tmp_path)
+    await queue.start(collection)
+    await queue.submit(contact("a"))
+    await drained(queue)
+
+    assert queue.running
+    assert queue.stats()["flush_failures"] == 1
+    await queue.submit(contact("b"))
+    await drained(queue)
+    await queue.stop()
+    assert sorted(collection.docs) == ["a", "b"]
@@ -0,0 +1,129 @@
+"""Contact export and import: CSV quoting, formula escaping and round trips."""
+import csv
+import io
+
+import orjson
+import pytest
+
+from contact_transfer import PARQUET_AVAILABLE, import_contacts
+from repository import MemoryRepository
+
+CONTACT = {"name": "Ada Lovelace", "email": "ada@example.com", "message": "I'd like to talk about a project."}
+
+TRICKY = [
+    {**CONTACT, "company": "Acme, Inc.", "message": 'She said "ship it" and left'},
+    {**CONTACT, "company": "=HYPERLINK(\"http://evil\")", "message": "Line one\nline two\r\nline three"},
+    {**CONTACT, "service": "-5 discount", "message": "@channel please review this"},
+    {**CONTACT, "company": "'=already quoted", "message": "'leading apostrophe kept"},
+    {**CONTACT, "name": "Zoë Ångström", "message": "Ünïcödé all the way 🚀"},
+]
+
+
+def submit(client, contacts):
+    ids = [client.post("/api/contact", json=contact).json()["contact_id"] for contact in contacts]
+    client.put(f"/api/contact/{ids[0]}/status", params={"status": "replied"})
+    return ids
+
+
+def all_contacts(client):
+    return client.get("/api/contact", params={"limit": 500}).json()["items"]
+
+
+def test_csv_export_quotes_and_escapes_formulas(client):
+    submit(client, TRICKY)
+    response = client.get("/api/contact/export", params={"format": "csv"})
+    assert response.headers["content-type"].startswith("text/csv")
+    assert 'filename="contacts-' in response.headers["content-disposition"]
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    by_message = {row["message"]: row for row in rows}
+    assert by_message['She said "ship it" and left']["company"] == "Acme, Inc."
+    assert by_message["Line one\nline two\r\nline three"]["company"] == "'=HYPERLINK(\"http://evil\")"
+    assert by_message["'@channel please review this"]["service"] == "'-5 discount"
+    # Values that already start with an apostrophe get one more, so import can undo exactly one
+    assert by_message["''leading apostrophe kept"]["company"] == "''=already quoted"
+    assert by_message["Ünïcödé all the way 🚀"]["service"] == ""
+
+
+@pytest.mark.parametrize("format, content_type", [
+    ("csv", "text/csv"),
+    ("ndjson", "application/x-ndjson"),
+    ("parquet", "application/vnd.apache.parquet"),
+])
+def test_export_imports_back_unchanged(client, format, content_type):
+    if format == "parquet":
+        pytest.importorskip("pyarrow")
+    submit(client, TRICKY)
+    original = all_contacts(client)
+    exported = client.get("/api/contact/export", params={"format": format}).content
+
+    # Everything is already there: each row is reported as a duplicate
+    result = client.post("/api/contact/import", content=exported, headers={"Content-Type": content_type}).json()
+    assert result["imported"] == 0
+    assert {error["error"] for error in result["errors"]} == {"Duplicate id"}
+
+    for contact in original:
+        client.delete(f"/api/contact/{contact['id']}")
+    result = client.post("/api/contact/import", content=exported, headers={"Content-Type": content_type}).json()
+    assert result == {"imported": len(TRICKY), "failed": 0, "errors": []}
+    assert all_contacts(client) == original
+
+
+def test_export_filters_and_fields(client):
+    submit(client, TRICKY)
+    response = client.get("/api/contact/export", params={"format": "ndjson", "status": "replied", "fields": "id,status"})
+    rows = [orjson.loads(line) for line in response.text.splitlines()]
+    assert rows == [{"id": rows[0]["id"], "status": "replied"}]
+
+    assert client.get("/api/contact/export", params={"format": "xml"}).status_code == 400
+    assert client.get("/api/contact/export", params={"status": "archived"}).status_code == 400
+
+
+def test_import_reports_bad_rows_by_number(client):
+    body = (
+        "name,email,message,status\n"
+        "Ada,ada@example.com,A perfectly fine message,new\n"
+        "Bob,not-an-email,Another fine message,new\n"
+        "Cy,cy@example.com,short,new\n"
+        "Di,di@example.com,A message with a bad status,archived\n"
+    )
+    result = client.post("/api/contact/import", params={"format": "csv"}, content=body).json()
+    assert result["imported"] == 1
+    assert result["failed"] == 3
+    assert [error["row"] for error in result["errors"]] == [2, 3, 4]
+    assert result["errors"][0]["error"].startswith("email:")
+    assert result["errors"][2]["error"].startswith("Invalid status")
+
+
+def test_import_rejects_unknown_formats_and_broken_records(client):
+    assert client.post("/api/contact/import", content=b"{}").status_code == 400
+    if not PARQUET_AVAILABLE:
+        assert client.post("/api/contact/import", params={"format": "parquet"}, content=b"PAR1").status_code == 501
+
+    body = b'{"name": "Ada", "email": "ada@example.com", "message": "Valid JSON line"}\n{"name": \n[1, 2]\n'
+    result = client.post("/api/contact/import", params={"format": "ndjson"}, content=body).json()
+    assert result["imported"] == 1
+    assert [error["row"] for error in result["errors"]] == [2, 3]
+    assert result["errors"][0]["error"].startswith("Invalid JSON")
+    assert result["errors"][1]["error"] == "Expected an object"
+
+    body = b'name,email,message\nAda,ada@example.com,"Never closed\n'
+    result = client.post("/api/contact/import", params={"format": "csv"}, content=body).json()
+    assert result["errors"] == [{"row": 1, "error": "CSV ends inside a quoted field"}]
+
+
+@pytest.mark.anyio
+async def test_import_survives_any_chunking():
+    """Multi-byte characters and quoted line breaks split across body chunks parse the same"""
+    body = '﻿name,email,message\r\nZoë,zoe@example.com,"Ünïcödé ""quoted""\nacross lines"\r\n'.encode()
+
+    async def one_byte_at_a_time():
+        for i in range(len(body)):
+            yield body[i:i + 1]
+
+    contacts = MemoryRepository("contacts")
+    result = await import_contacts(contacts, one_byte_at_a_time(), "csv")
+    assert result.imported == 1
+    [doc] = await contacts.find()
+    assert doc["name"] == "Zoë"
+    assert doc["message"] == 'Ünïcödé "quoted"\nacross lines'
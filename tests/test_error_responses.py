@@ -0,0 +1,44 @@
+"""Client errors raised inside handlers keep their status instead of turning into 500s."""
+import pytest
+
+PAYLOADS = {
+    "portfolio": {"title": "Scale-up", "category": "E-commerce", "description": "Scaled a store",
+                  "results": {"revenue": "2x"}, "technologies": ["Shopify"]},
+    "testimonials": {"name": "Grace", "position": "CTO", "company": "Acme", "testimonial": "Great work, on time.",
+                     "rating": 5},
+    "services": {"title": "Audits", "description": "Store audits", "icon": "A", "features": ["Speed"], "price": "$1"},
+    "experience": {"company": "Acme", "position": "Lead", "duration": "2020-2023", "description": "Led the team",
+                   "achievements": ["Shipped"]},
+    "skills": {"name": "Python", "level": 90, "category": "Backend"},
+}
+
+CONTACT = {"name": "Ada Lovelace", "email": "ada@example.com", "message": "I'd like to talk about a project."}
+
+
+@pytest.mark.parametrize("collection", list(PAYLOADS))
+def test_delete_twice_is_404(client, collection):
+    item_id = client.post(f"/api/{collection}", json=PAYLOADS[collection]).json()["id"]
+
+    assert client.delete(f"/api/{collection}/{item_id}").status_code == 200
+    response = client.delete(f"/api/{collection}/{item_id}")
+    assert response.status_code == 404
+    assert response.json()["detail"].endswith("not found")
+
+
+@pytest.mark.parametrize("path", [
+    "/api/experience/missing/order?order=1",
+    "/api/services/missing/active?is_active=false",
+    "/api/testimonials/missing/featured?is_featured=true",
+    "/api/contact/missing/status?status=read",
+])
+def test_toggles_on_unknown_ids_are_404(client, path):
+    assert client.put(path).status_code == 404
+
+
+def test_contact_status_and_delete(client):
+    contact_id = client.post("/api/contact", json=CONTACT).json()["contact_id"]
+
+    assert client.put(f"/api/contact/{contact_id}/status", params={"status": "archived"}).status_code == 400
+    assert client.put(f"/api/contact/{contact_id}/status", params={"status": "read"}).status_code == 200
+    assert client.delete(f"/api/contact/{contact_id}").status_code == 200
+    assert client.delete(f"/api/contact/{contact_id}").status_code == 404
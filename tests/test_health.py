@@ -0,0 +1,59 @@
+"""Health probes: concurrent checks, result caching, timeouts and the HTTP endpoints."""
+import asyncio
+
+import pytest
+
+from health import HealthChecker
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_probes_share_one_run_and_its_cached_result():
+    calls = []
+
+    async def storage():
+        calls.append("storage")
+        await asyncio.sleep(0.01)
+        return {"latency_ms": 1}
+
+    checker = HealthChecker(ttl=60)
+    checker.register("storage", storage)
+    results = await asyncio.gather(*(checker.readiness() for _ in range(5)))
+
+    assert calls == ["storage"]
+    assert {result["status"] for result in results} == {"ready"}
+    assert results[0]["checks"]["storage"]["latency_ms"] == 1
+    cached = await checker.readiness()
+    assert cached["cached"] and calls == ["storage"]
+
+
+async def test_only_critical_failures_make_it_not_ready():
+    async def broken():
+        raise RuntimeError("index build pending")
+
+    async def hung():
+        await asyncio.sleep(1)
+
+    checker = HealthChecker(ttl=0, default_timeout=0.01)
+    checker.register("indexes", broken, critical=False)
+    result = await checker.readiness()
+    assert result["status"] == "ready"
+    assert result["checks"]["indexes"] == {"critical": False, "ok": False, "error": "index build pending",
+                                           "duration_ms": result["checks"]["indexes"]["duration_ms"]}
+
+    checker.register("storage", hung)
+    result = await checker.readiness()
+    assert result["status"] == "not_ready"
+    assert result["checks"]["storage"]["error"] == "Timed out after 10 ms"
+
+
+def test_http_probes(client):
+    assert client.get("/api/health/live").json()["status"] == "alive"
+
+    ready = client.get("/api/health/ready")
+    assert ready.status_code == 200
+    assert ready.json()["checks"]["storage"]["ok"]
+    assert ready.json()["checks"]["warmup"]["ok"]
+
+    legacy = client.get("/api/health").json()
+    assert (legacy["status"], legacy["database"]) == ("healthy", "connected")
@@ -0,0 +1,21 @@
+"""Prometheus exposition and who may read it."""
+import server
+
+
+def test_metrics_are_exposed_in_text_format(client):
+    client.get("/api/skills")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE" in response.text
+
+
+def test_metrics_token_is_required_when_configured(client, monkeypatch):
+    monkeypatch.setattr(server, "METRICS_TOKEN", "s3cret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
+
+
+def test_instrumentation_cannot_be_switched_over_http(client):
+    assert client.put("/api/health/metrics", params={"enabled": "false"}).status_code == 404
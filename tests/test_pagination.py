@@ -0,0 +1,122 @@
+"""List endpoints: bounded unpaged reads, keyset pages and NDJSON streaming."""
+import base64
+
+import orjson
+import pytest
+from bson import json_util
+
+import pagination
+
+CONTACT = {
+    "name": "Ada Lovelace",
+    "email": "ada@example.com",
+    "message": "I'd like to talk about a project.",
+}
+
+SKILL = {"name": "Python", "category": "Backend", "level": 90}
+
+
+def submit_contacts(client, count):
+    for i in range(count):
+        response = client.post("/api/contact", json={**CONTACT, "message": f"{CONTACT['message']} #{i}"})
+        assert response.status_code == 200
+
+
+def test_contacts_default_to_one_page(client):
+    submit_contacts(client, pagination.DEFAULT_PAGE_SIZE + 5)
+
+    page = client.get("/api/contact").json()
+    assert len(page["items"]) == pagination.DEFAULT_PAGE_SIZE
+    assert page["next_cursor"]
+
+    rest = client.get("/api/contact", params={"cursor": page["next_cursor"]}).json()
+    assert len(rest["items"]) == 5
+    assert rest["next_cursor"] is None
+
+
+def test_contacts_stream_everything_as_ndjson(client):
+    submit_contacts(client, pagination.DEFAULT_PAGE_SIZE + 5)
+
+    response = client.get("/api/contact", params={"format": "ndjson"})
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert len([orjson.loads(line) for line in response.text.splitlines()]) == pagination.DEFAULT_PAGE_SIZE + 5
+
+
+def test_unpaged_list_is_capped(client, monkeypatch):
+    monkeypatch.setattr(pagination, "MAX_LIST_SIZE", 3)
+    for i in range(5):
+        assert client.post("/api/skills", json={**SKILL, "name": f"Skill {i}"}).status_code == 200
+
+    capped = client.get("/api/skills")
+    assert len(capped.json()) == 3
+    assert len(client.get("/api/skills", params={"limit": 10}).json()["items"]) == 5
+
+    # The truncation is visible, and the header continues the list where it stopped
+    rest = client.get("/api/skills", params={"cursor": capped.headers[pagination.NEXT_CURSOR_HEADER]}).json()
+    assert sorted(skill["name"] for skill in capped.json() + rest["items"]) == [f"Skill {i}" for i in range(5)]
+    assert rest["next_cursor"] is None
+
+    monkeypatch.setattr(pagination, "MAX_LIST_SIZE", 6)
+    client.post("/api/skills", json={**SKILL, "name": "Skill 5"})
+    assert pagination.NEXT_CURSOR_HEADER not in client.get("/api/skills", params={"category": "Backend"}).headers
+
+
+def create_skills(client, levels):
+    return [client.post("/api/skills", json={**SKILL, "name": f"Skill {i}", "level": level}).json()["id"]
+            for i, level in enumerate(levels)]
+
+
+def walk(client, path, **params):
+    items, cursor = [], None
+    while True:
+        page = client.get(path, params={**params, **({"cursor": cursor} if cursor else {})}).json()
+        items += page["items"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items
+
+
+def test_cursor_pages_match_the_full_list(client):
+    create_skills(client, [90, 70, 70, 70, 40, 40, 10])
+
+    walked = walk(client, "/api/skills", limit=2)
+    assert [skill["id"] for skill in walked] == [skill["id"] for skill in client.get("/api/skills").json()]
+    assert [skill["level"] for skill in walked] == [90, 70, 70, 70, 40, 40, 10]
+
+
+def test_writes_between_pages_do_not_repeat_rows(client):
+    create_skills(client, [90, 80, 70, 60])
+    first = client.get("/api/skills", params={"limit": 2}).json()
+    # Sorts before the cursor, so an offset-based next page would repeat a row
+    create_skills(client, [95])
+
+    rest = client.get("/api/skills", params={"limit": 2, "cursor": first["next_cursor"]}).json()
+    assert [skill["level"] for skill in first["items"] + rest["items"]] == [90, 80, 70, 60]
+
+
+def test_ndjson_continues_from_a_cursor(client):
+    create_skills(client, [90, 80, 70, 60])
+    first = client.get("/api/skills", params={"limit": 1}).json()
+
+    response = client.get("/api/skills", params={"format": "ndjson", "cursor": first["next_cursor"]})
+    assert [orjson.loads(line)["level"] for line in response.text.splitlines()] == [80, 70, 60]
+
+
+def cursor_of(*values):
+    return base64.urlsafe_b64encode(json_util.dumps(list(values)).encode()).decode()
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    "bm90IGpzb24",
+    "WzFd",
+    # Values that would turn into query operators or match nothing by type
+    cursor_of({"$ne": None}, "id"),
+    cursor_of(90, {"$gt": ""}),
+    cursor_of([90], "id"),
+    cursor_of(90, 7),
+])
+def test_invalid_cursors_are_400(client, cursor):
+    response = client.get("/api/skills", params={"cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
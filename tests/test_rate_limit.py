@@ -0,0 +1,172 @@
+"""Token buckets, duplicate markers and pruning, driven by a fake clock."""
+from datetime import timezone
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from rate_limit import BucketLimit, ContactGuard, MemoryRateLimitBackend, MongoRateLimitBackend
+
+pytestmark = pytest.mark.anyio
+
+PER_HOUR = BucketLimit.per(1, 3600)
+PER_SECOND = BucketLimit.per(1, 1)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def backend(clock):
+    return MemoryRateLimitBackend(clock=clock, prune_interval=60)
+
+
+async def test_bucket_refills_over_time(backend, clock):
+    limit = BucketLimit.per(1, 10, burst=2)
+    assert await backend.take("ip:a", limit) == (True, 0.0)
+    assert await backend.take("ip:a", limit) == (True, 0.0)
+    assert await backend.take("ip:a", limit) == (False, pytest.approx(10))
+
+    clock.advance(5)
+    assert await backend.take("ip:a", limit) == (False, pytest.approx(5))
+    clock.advance(5)
+    assert await backend.take("ip:a", limit) == (True, 0.0)
+    # Other keys have buckets of their own
+    assert await backend.take("ip:b", limit) == (True, 0.0)
+
+
+async def test_marker_expires_after_ttl(backend, clock):
+    assert await backend.add_if_absent("dedup:x", 600)
+    assert not await backend.add_if_absent("dedup:x", 600)
+    clock.advance(599)
+    assert not await backend.add_if_absent("dedup:x", 600)
+    clock.advance(1)
+    assert await backend.add_if_absent("dedup:x", 600)
+
+    await backend.discard("dedup:x")
+    assert await backend.add_if_absent("dedup:x", 600)
+
+
+async def test_prune_keeps_buckets_that_have_not_refilled(backend, clock):
+    await backend.take("email:slow", PER_HOUR)
+    await backend.take("ip:fast", PER_SECOND)
+    await backend.add_if_absent("dedup:x", 30)
+
+    clock.advance(61)
+    # The sweep runs here, on a key with a much faster refill than the hourly bucket
+    assert await backend.take("ip:fast", PER_SECOND) == (True, 0.0)
+    assert list(backend._buckets) == ["email:slow", "ip:fast"]
+    assert list(backend._markers) == []
+    assert await backend.take("email:slow", PER_HOUR) == (False, pytest.approx(3600 - 61))
+
+
+async def test_prune_drops_refilled_buckets(backend, clock):
+    await backend.take("ip:a", PER_SECOND)
+    clock.advance(30)
+    await backend.take("ip:b", PER_SECOND)
+    # Not due yet: both stay until the interval has passed
+    assert list(backend._buckets) == ["ip:a", "ip:b"]
+
+    clock.advance(31)
+    await backend.take("ip:c", PER_SECOND)
+    assert list(backend._buckets) == ["ip:c"]
+
+
+async def test_max_keys_evicts_least_recently_used(clock):
+    backend = MemoryRateLimitBackend(max_keys=2, clock=clock)
+    await backend.take("ip:a", PER_HOUR)
+    await backend.take("ip:b", PER_HOUR)
+    await backend.take("ip:a", PER_HOUR)
+    await backend.take("ip:c", PER_HOUR)
+
+    assert list(backend._buckets) == ["ip:a", "ip:c"]
+    # "b" was forgotten, so it gets a fresh bucket
+    assert await backend.take("ip:b", PER_HOUR) == (True, 0.0)
+
+
+def request(ip: str) -> Request:
+    return Request({"type": "http", "method": "POST", "path": "/api/contact", "headers": [], "client": (ip, 1234)})
+
+
+async def test_guard_throttles_and_suppresses_duplicates(backend, clock):
+    guard = ContactGuard(backend, ip_limit=BucketLimit.per(1, 60, burst=2), email_limit=BucketLimit.per(5, 3600),
+                         dedup_window=600)
+    key = await guard.check(request("10.0.0.1"), "ada@example.com", "Hello  there")
+
+    with pytest.raises(HTTPException) as raised:
+        await guard.check(request("10.0.0.1"), "Ada@Example.com ", "hello there")
+    assert raised.value.status_code == 409
+
+    # The duplicate gave its tokens back, so the burst still has room for one more
+    await guard.check(request("10.0.0.1"), "ada@example.com", "Another message")
+    with pytest.raises(HTTPException) as raised:
+        await guard.check(request("10.0.0.1"), "ada@example.com", "A third message")
+    assert raised.value.status_code == 429
+    assert raised.value.headers["Retry-After"] == "60"
+
+    # A released submission can be retried once the bucket allows it
+    await guard.release(key)
+    clock.advance(60)
+    assert await guard.check(request("10.0.0.1"), "ada@example.com", "Hello there") == key
+    assert guard.stats()["limited"] == 1
+    assert guard.stats()["duplicates"] == 1
+
+
+async def test_rejections_refund_the_buckets_that_allowed_them(backend):
+    guard = ContactGuard(backend, ip_limit=BucketLimit.per(1, 60, burst=2), email_limit=BucketLimit.per(1, 3600),
+                         dedup_window=600)
+    await guard.check(request("10.0.0.1"), "ada@example.com", "Hello there")
+    for _ in range(3):
+        # The email bucket is empty; the IP bucket gets its token back each time
+        with pytest.raises(HTTPException) as raised:
+            await guard.check(request("10.0.0.1"), "ada@example.com", "Hello again")
+        assert raised.value.status_code == 429
+
+    assert await guard.check(request("10.0.0.1"), "grace@example.com", "Hello there")
+
+
+@pytest.fixture
+def mongo_backend(clock):
+    from mongomock_motor import AsyncMongoMockClient
+
+    return MongoRateLimitBackend(AsyncMongoMockClient().db.rate_limits, clock=clock)
+
+
+async def test_mongo_buckets_refill_and_refund(mongo_backend, clock):
+    limit = BucketLimit.per(1, 10, burst=2)
+    assert await mongo_backend.take("ip:a", limit) == (True, 0.0)
+    assert await mongo_backend.take("ip:a", limit) == (True, 0.0)
+    assert await mongo_backend.take("ip:a", limit) == (False, pytest.approx(10))
+
+    clock.advance(5)
+    assert await mongo_backend.take("ip:a", limit) == (False, pytest.approx(5))
+    await mongo_backend.refund("ip:a", limit)
+    assert await mongo_backend.take("ip:a", limit) == (True, 0.0)
+    assert await mongo_backend.take("ip:b", limit) == (True, 0.0)
+
+    bucket = await mongo_backend.collection.find_one({"_id": "ip:a"})
+    # Kept by the TTL index until it would have refilled from empty
+    assert bucket["expires_at"].replace(tzinfo=timezone.utc).timestamp() == pytest.approx(clock.now + 20)
+
+
+async def test_mongo_markers_expire_before_the_ttl_sweep(mongo_backend, clock):
+    assert await mongo_backend.add_if_absent("dedup:x", 600)
+    assert not await mongo_backend.add_if_absent("dedup:x", 600)
+    clock.advance(600)
+    assert await mongo_backend.add_if_absent("dedup:x", 600)
+
+    await mongo_backend.discard("dedup:x")
+    assert await mongo_backend.add_if_absent("dedup:x", 600)
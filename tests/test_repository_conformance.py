@@ -0,0 +1,299 @@
+"""Behaviour every repository backend must share.
+
+Runs against the in-memory and SQLite repositories, and MongoDB through
+mongomock-motor; set TEST_MONGO_URL to use a real server instead (a scratch
+database is created and dropped).
+"""
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+import pytest
+from pydantic import BaseModel
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from indexes import INDEX_REGISTRY  # noqa: E402
+from pagination import fetch_page  # noqa: E402
+from repository import VERSION_CONFLICT, DuplicateKey, MemoryRepository, MongoRepository, WriteOp  # noqa: E402
+from serialization import ModelCodec  # noqa: E402
+from sqlite_repository import SqliteDatabase, SqliteRepository  # noqa: E402
+from versioning import VersionConflict  # noqa: E402
+
+BASE = datetime(2024, 1, 1)
+
+DOCS = [
+    {"id": "a", "title": "Alpha", "category": "Branding", "level": 90, "is_featured": True,
+     "created_at": BASE, "tags": ["x", "y"]},
+    {"id": "b", "title": "Beta", "category": "Marketing", "level": 70, "is_featured": False,
+     "created_at": BASE + timedelta(days=1)},
+    {"id": "c", "title": "Gamma", "category": "Branding", "level": 70, "is_featured": True,
+     "created_at": BASE + timedelta(days=2), "version": 3},
+    {"id": "d", "title": "Delta", "category": None, "level": 40, "is_featured": False,
+     "created_at": BASE + timedelta(days=3)},
+    {"id": "e", "title": "Epsilon", "level": "high", "is_featured": False,
+     "created_at": BASE + timedelta(days=4)},
+]
+
+SPECS = INDEX_REGISTRY["portfolio"] + INDEX_REGISTRY["skills"][1:]
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(params=["memory", "sqlite", "mongo"])
+async def repo(request, tmp_path):
+    if request.param == "memory":
+        yield MemoryRepository("items", SPECS)
+    elif request.param == "sqlite":
+        database = SqliteDatabase(str(tmp_path / "test.db"))
+        yield SqliteRepository(database, "items", SPECS)
+        database.close()
+    else:
+        url = os.environ.get("TEST_MONGO_URL")
+        if url:
+            from motor.motor_asyncio import AsyncIOMotorClient
+            client = AsyncIOMotorClient(url)
+        else:
+            mongomock_motor = pytest.importorskip("mongomock_motor")
+            client = mongomock_motor.AsyncMongoMockClient()
+        name = f"conformance_{uuid.uuid4().hex[:8]}"
+        collection = client[name]["items"]
+        await collection.create_indexes([spec.to_model() for spec in SPECS])
+        yield MongoRepository(collection)
+        await client.drop_database(name)
+
+
+@pytest.fixture
+async def seeded(repo):
+    for doc in DOCS:
+        await repo.insert(dict(doc))
+    return repo
+
+
+def ids(docs):
+    return [doc["id"] for doc in docs]
+
+
+def xfail_on_mongomock(repo):
+    # mongomock re-reads the post-image with the update's filter, which no longer matches once the version moved
+    if isinstance(repo, MongoRepository) and not os.environ.get("TEST_MONGO_URL"):
+        pytest.xfail("mongomock can't return the post-image of a version-filtered update")
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize("query, expected", [
+    ({}, ["a", "b", "c", "d", "e"]),
+    ({"category": "Branding"}, ["a", "c"]),
+    ({"is_featured": True}, ["a", "c"]),
+    ({"category": None}, ["d", "e"]),
+    ({"category": {"$ne": None}}, ["a", "b", "c"]),
+    ({"category": {"$ne": "Branding"}}, ["b", "d", "e"]),
+    ({"category": {"$in": ["Marketing", "Branding"]}}, ["a", "b", "c"]),
+    ({"category": {"$in": []}}, []),
+    ({"category": {"$nin": ["Branding"]}}, ["b", "d", "e"]),
+    ({"level": {"$gte": 70}}, ["a", "b", "c"]),
+    ({"level": {"$gt": 40, "$lt": 90}}, ["b", "c"]),
+    ({"level": {"$lte": 40}}, ["d"]),
+    ({"level": {"$gt": "a"}}, ["e"]),
+    ({"created_at": {"$gt": BASE + timedelta(days=2)}}, ["d", "e"]),
+    ({"created_at": BASE}, ["a"]),
+    ({"$or": [{"category": "Marketing"}, {"level": 40}]}, ["b", "d"]),
+    ({"$and": [{"category": "Branding"}, {"level": 70}]}, ["c"]),
+    ({"category": "Branding", "is_featured": True, "level": {"$in": [90]}}, ["a"]),
+])
+async def test_find_filters(seeded, query, expected):
+    assert sorted(ids(await seeded.find(query))) == expected
+
+
+async def test_find_sort_limit_and_projection(seeded):
+    docs = await seeded.find({"level": {"$in": [90, 70, 40]}}, [("level", -1), ("id", -1)], limit=3)
+    assert ids(docs) == ["a", "c", "b"]
+    assert ids(await seeded.find({}, [("created_at", -1), ("id", -1)])) == ["e", "d", "c", "b", "a"]
+    # Missing and null values sort lowest
+    assert ids(await seeded.find({}, [("category", 1), ("id", 1)])) == ["d", "e", "a", "c", "b"]
+
+    docs = await seeded.find({"id": "a"}, projection={"_id": 0, "title": 1, "created_at": 1})
+    assert docs == [{"title": "Alpha", "created_at": BASE}]
+
+
+async def test_documents_round_trip(seeded):
+    doc = await seeded.get("a")
+    assert doc == DOCS[0]
+    assert isinstance(doc["created_at"], datetime)
+    assert doc["is_featured"] is True
+    assert await seeded.get("missing") is None
+    assert (await seeded.find_one({"category": "Branding"}, sort=[("level", 1)]))["id"] == "c"
+
+
+async def test_iterate_streams_in_order(seeded):
+    streamed = [doc["id"] async for doc in seeded.iterate({}, [("created_at", 1)], batch_size=2)]
+    assert streamed == ["a", "b", "c", "d", "e"]
+    limited = [doc async for doc in seeded.iterate({"is_featured": False}, [("id", 1)], limit=2, projection={"id": 1})]
+    assert limited == [{"id": "b"}, {"id": "d"}]
+
+
+class Row(BaseModel):
+    id: str
+    category: Optional[str] = None
+    created_at: datetime
+
+
+@pytest.mark.parametrize("sort", [
+    [("created_at", -1), ("id", -1)],
+    [("category", 1), ("id", 1)],
+    [("category", -1), ("id", 1)],
+    [("category", -1), ("created_at", -1), ("id", -1)],
+])
+async def test_keyset_pages_walk_the_full_order(seeded, sort):
+    """Following next_cursor visits every document once, in sort order, across ties and missing values"""
+    walked, cursor = [], None
+    while True:
+        page = await fetch_page(seeded, {"is_featured": {"$in": [True, False]}}, sort, ModelCodec(Row), 2, cursor)
+        walked += ids(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert walked == ids(await seeded.find({}, sort))
+
+
+async def test_keyset_page_after_last_document_is_empty(seeded):
+    sort = [("created_at", 1), ("id", 1)]
+    page = await fetch_page(seeded, {}, sort, ModelCodec(Row), 4, None)
+    assert ids(page["items"]) == ["a", "b", "c", "d"]
+    last = await fetch_page(seeded, {}, sort, ModelCodec(Row), 4, page["next_cursor"])
+    assert ids(last["items"]) == ["e"]
+    assert last["next_cursor"] is None
+
+
+async def test_distinct_and_count(seeded):
+    assert sorted(await seeded.distinct("category")) == ["Branding", "Marketing"]
+    assert sorted(await seeded.distinct("category", {"level": 70})) == ["Branding", "Marketing"]
+    assert sorted(await seeded.distinct("tags")) == ["x", "y"]
+    assert await seeded.count() == 5
+    assert await seeded.count({"is_featured": False}) == 3
+    assert await seeded.count({"is_featured": False}, limit=2) == 2
+
+
+async def test_insert_rejects_duplicate_id(seeded):
+    with pytest.raises(DuplicateKey):
+        await seeded.insert({"id": "a", "title": "Again"})
+    assert (await seeded.get("a"))["title"] == "Alpha"
+
+
+async def test_insert_does_not_modify_argument(repo):
+    doc = {"id": "z", "title": "Zeta"}
+    await repo.insert(doc)
+    assert doc == {"id": "z", "title": "Zeta"}
+
+
+async def test_update_increments_version(seeded):
+    updated = await seeded.update("a", {"title": "Alpha 2"})
+    assert updated["title"] == "Alpha 2"
+    assert updated["version"] == 2
+    assert updated["category"] == "Branding"
+    assert await seeded.update("missing", {"title": "x"}) is None
+    assert await seeded.update("missing", {"title": "x"}, expected_version=1) is None
+
+
+async def test_update_with_expected_version(seeded):
+    xfail_on_mongomock(seeded)
+    updated = await seeded.update("c", {"level": 75}, expected_version=3, projection={"level": 1, "version": 1})
+    assert updated == {"level": 75, "version": 4}
+
+
+async def test_update_treats_unversioned_documents_as_version_1(seeded):
+    xfail_on_mongomock(seeded)
+    assert (await seeded.update("b", {"level": 71}, expected_version=1))["version"] == 2
+
+
+async def test_update_conflict(seeded):
+    with pytest.raises(VersionConflict):
+        await seeded.update("c", {"level": 1}, expected_version=2)
+    assert (await seeded.get("c"))["level"] == 70
+
+
+async def test_update_return_previous(seeded):
+    before = await seeded.update("b", {"category": "Branding"}, projection={"category": 1}, return_previous=True)
+    assert before == {"category": "Marketing"}
+    assert sorted(ids(await seeded.find({"category": "Branding"}))) == ["a", "b", "c"]
+
+
+async def test_update_keeps_indexes_current(seeded):
+    await seeded.update("a", {"category": "Marketing", "is_featured": False})
+    assert sorted(ids(await seeded.find({"category": "Marketing"}))) == ["a", "b"]
+    assert ids(await seeded.find({"is_featured": True})) == ["c"]
+
+
+async def test_update_stores_literal_values(seeded):
+    updated = await seeded.update("a", {"title": "$level", "results": {"$gt": 1}})
+    assert updated["title"] == "$level"
+    assert updated["results"] == {"$gt": 1}
+
+
+async def test_delete_returns_removed_document(seeded):
+    deleted = await seeded.delete("b", projection={"title": 1})
+    assert deleted == {"title": "Beta"}
+    assert await seeded.delete("b") is None
+    assert await seeded.count() == 4
+    assert ids(await seeded.find({"category": "Marketing"})) == []
+
+
+async def test_apply_writes(seeded):
+    errors = await seeded.apply_writes([
+        WriteOp("insert", "f", {"id": "f", "title": "Zeta", "level": 10}),
+        WriteOp("insert", "a", {"id": "a", "title": "Duplicate"}),
+        WriteOp("update", "b", {"level": 10}, expected_version=1),
+        WriteOp("update", "c", {"level": 10}, expected_version=1),
+        WriteOp("update", "missing", {"level": 10}),
+        WriteOp("delete", "d"),
+        WriteOp("delete", "missing"),
+    ])
+    assert errors[0] is None
+    assert errors[1] is not None
+    assert errors[2] is None
+    assert errors[3] == VERSION_CONFLICT
+    # Unknown ids are skipped, not reported
+    assert errors[4:] == [None] * 3
+    assert sorted(ids(await seeded.find({"level": 10}))) == ["b", "f"]
+    assert (await seeded.get("b"))["version"] == 2
+    assert (await seeded.get("c"))["level"] == 70
+    assert await seeded.get("d") is None
+    assert (await seeded.get("a"))["title"] == "Alpha"
+
+
+async def test_apply_writes_reports_lost_races(seeded):
+    # Two editors read version 1 of "b"; only the first write may land
+    first = await seeded.apply_writes([WriteOp("update", "b", {"title": "First"}, expected_version=1)])
+    second = await seeded.apply_writes([
+        WriteOp("update", "b", {"title": "Second"}, expected_version=1),
+        WriteOp("update", "missing", {"title": "Second"}, expected_version=1),
+        WriteOp("update", "a", {"title": "Unguarded"}),
+    ])
+    assert first == [None]
+    assert second == [VERSION_CONFLICT, None, None]
+    assert (await seeded.get("b"))["title"] == "First"
+    assert (await seeded.get("b"))["version"] == 2
+    assert (await seeded.get("a"))["title"] == "Unguarded"
+
+
+async def test_datetimes_keep_millisecond_precision(repo):
+    moment = datetime(2024, 5, 6, 7, 8, 9, 123456)
+    await repo.insert({"id": "t", "created_at": moment})
+    assert (await repo.get("t"))["created_at"] == moment.replace(microsecond=123000)
+    assert ids(await repo.find({"created_at": {"$gte": moment.replace(microsecond=123000)}})) == ["t"]
+
+
+async def test_clear(seeded):
+    await seeded.clear()
+    assert await seeded.count() == 0
+    await seeded.insert({"id": "a"})
+    assert ids(await seeded.find({})) == ["a"]
+
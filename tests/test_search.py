@@ -0,0 +1,99 @@
+"""Search ranking, snippets and keeping the index in step with writes."""
+import pytest
+
+from search import SearchIndex
+from storage import MemoryStorage
+
+pytestmark = pytest.mark.anyio
+
+PORTFOLIO = {
+    "title": "Headless storefront",
+    "category": "E-commerce",
+    "description": "Moved a fashion brand to a headless stack",
+    "results": {"revenue": "2x"},
+    "technologies": ["Shopify", "Next.js"],
+}
+
+
+def ids(result):
+    return [hit["id"] for hit in result["results"]]
+
+
+@pytest.fixture
+def index():
+    index = SearchIndex()
+    index.index_document("portfolio", {"id": "title", "title": "Checkout redesign", "description": "Faster payments"})
+    index.index_document("portfolio", {"id": "body", "title": "Store audit", "description": "Found checkout issues"})
+    index.index_document("portfolio", {"id": "both", "title": "Checkout speed", "description": "Payments in one step",
+                                       "technologies": ["Shopify"]})
+    index.index_document("services", {"id": "svc", "title": "Shopify checkout tuning", "features": ["Speed"]})
+    return index
+
+
+def test_title_matches_outrank_body_matches(index):
+    result = index.search("checkout", ["portfolio"])
+    assert ids(result)[-1] == "body"
+    assert result["total"] == 3
+
+
+def test_documents_matching_more_words_rank_first(index):
+    assert ids(index.search("checkout payments speed"))[0] == "both"
+
+
+def test_prefixes_and_type_filter(index):
+    assert set(ids(index.search("shop"))) == {"both", "svc"}
+    assert ids(index.search("shop", ["services"])) == ["svc"]
+    # Too short to expand, and stopwords never match
+    assert index.search("s")["total"] == 0
+    assert index.search("the")["total"] == 0
+
+
+def test_snippet_marks_hits_and_escapes_html():
+    index = SearchIndex()
+    index.index_document("services", {"id": "x", "title": "<b>Audits</b> for stores", "features": []})
+    hit = index.search("audits")["results"][0]
+    assert hit["field"] == "title"
+    assert hit["snippet"] == "&lt;b&gt;<mark>Audits</mark>&lt;/b&gt; for stores"
+
+
+def test_replacing_and_removing_documents(index):
+    index.index_document("portfolio", {"id": "title", "title": "Catalog migration", "description": ""})
+    assert "title" not in ids(index.search("checkout"))
+    assert ids(index.search("catalog")) == ["title"]
+
+    index.remove("portfolio", "title", "unknown")
+    assert index.search("catalog")["total"] == 0
+    assert len(index) == 3
+
+
+async def test_writes_during_rebuild_survive_the_swap():
+    store = MemoryStorage()
+    await store.portfolio.insert({"id": "kept", "title": "Checkout redesign"})
+    await store.portfolio.insert({"id": "gone", "title": "Checkout audit"})
+    index = SearchIndex()
+    iterate = store.portfolio.iterate
+
+    async def iterate_then_write(*args, **kwargs):
+        async for doc in iterate(*args, **kwargs):
+            yield doc
+        # Handlers keep writing while the rebuild is still reading other collections
+        await store.portfolio.delete("gone")
+        index.remove("portfolio", "gone")
+        index.index_document("portfolio", {"id": "new", "title": "Checkout rebuild"})
+
+    store.portfolio.iterate = iterate_then_write
+    await index.rebuild(store)
+
+    assert sorted(ids(index.search("checkout"))) == ["kept", "new"]
+
+
+def test_index_follows_api_writes(client):
+    item_id = client.post("/api/portfolio", json=PORTFOLIO).json()["id"]
+    assert ids(client.get("/api/search", params={"q": "headless"}).json()) == [item_id]
+
+    client.put(f"/api/portfolio/{item_id}", json={**PORTFOLIO, "title": "Subscription storefront"})
+    assert ids(client.get("/api/search", params={"q": "subscription"}).json()) == [item_id]
+
+    client.delete(f"/api/portfolio/{item_id}")
+    assert client.get("/api/search", params={"q": "subscription"}).json()["total"] == 0
+    assert client.get("/api/search", params={"q": "x", "type": "blog"}).status_code == 400
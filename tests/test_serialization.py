@@ -0,0 +1,65 @@
+"""Fast read path: codec rows and orjson bodies match what Pydantic would produce."""
+from datetime import datetime
+
+import pytest
+
+import serialization
+from models import PortfolioItem, Service, Skill
+from serialization import ModelCodec, dumps
+
+LEGACY_PORTFOLIO = {
+    "_id": "65f0c0ffee",
+    "id": "p1",
+    "title": "Scale-up",
+    "category": "E-commerce",
+    "description": "Scaled a store",
+    "results": {"revenue": "900%"},
+    "technologies": ["Shopify"],
+    "created_at": datetime(2024, 5, 1, 12, 30, 15, 123000),
+    # Written before image_url, is_featured, updated_at and version existed
+}
+
+
+@pytest.mark.parametrize("model, doc", [
+    (PortfolioItem, LEGACY_PORTFOLIO),
+    (Service, {"id": "s1", "title": "Audits", "description": "Store audits", "icon": "A", "features": [],
+               "price": "$1", "is_active": False, "created_at": datetime(2024, 1, 1), "version": 3}),
+])
+def test_fast_rows_match_model_validation(model, doc):
+    codec = ModelCodec(model)
+    row = codec.load(doc)
+
+    assert row == model(**doc).model_dump()
+    assert list(row) == list(model.model_fields)
+    assert dumps(row) == model(**doc).model_dump_json().encode()
+
+
+def test_documents_missing_required_fields_fail_loudly():
+    doc = {key: value for key, value in LEGACY_PORTFOLIO.items() if key != "title"}
+    with pytest.raises(ValueError, match="missing 'title'"):
+        ModelCodec(PortfolioItem).load(doc)
+
+
+def test_validating_reads_can_be_switched_back_on(monkeypatch):
+    monkeypatch.setattr(serialization, "FAST_READS", False)
+    row = ModelCodec(PortfolioItem).load({**LEGACY_PORTFOLIO, "technologies": ("Shopify",)})
+    assert row["technologies"] == ["Shopify"]
+
+
+def test_sparse_fieldsets_project_and_load_only_the_chosen_fields():
+    codec = ModelCodec(Skill)
+    selected = codec.select(" level,name ")
+
+    assert selected is codec.select("name,level")
+    assert selected.projection == {"_id": 0, "name": 1, "level": 1, "id": 1}
+    assert selected.load({"id": "k1", "name": "Go", "level": 80}) == {"name": "Go", "level": 80}
+    assert selected.key_suffix == ("fields", "name", "level")
+    assert codec.select(",".join(codec.fields)) is codec
+
+
+def test_fields_parameter_on_the_api(client):
+    client.post("/api/skills", json={"name": "Go", "level": 80, "category": "Backend"})
+    assert client.get("/api/skills", params={"fields": "name"}).json() == [{"name": "Go"}]
+    response = client.get("/api/skills", params={"fields": "name,password"})
+    assert response.status_code == 400
+    assert "password" in response.json()["detail"]
@@ -0,0 +1,127 @@
+"""Static snapshot: incremental export, manifest and serving ahead of the routers."""
+import pytest
+
+from compression import encoding_etag
+from snapshot import MANIFEST_NAME, SnapshotServer, export, load_manifest
+from storage import MemoryStorage
+
+pytestmark = pytest.mark.anyio
+
+SERVICE = {"id": "s1", "title": "Old", "description": "Store audits", "icon": "A", "features": ["Speed"],
+           "price": "$1", "is_active": True}
+
+
+@pytest.fixture
+async def store():
+    store = MemoryStorage()
+    await store.services.insert(dict(SERVICE))
+    return store
+
+
+def server_for(store, directory):
+    server = SnapshotServer(directory, enabled=True, recheck_seconds=0)
+    server.attach(store)
+    return server
+
+
+async def test_writes_made_before_a_restart_are_not_served_stale(store, tmp_path):
+    await export(store, tmp_path)
+    assert (await server_for(store, tmp_path).lookup("/api/services/s1")) is not None
+
+    # Written by the seed script, another worker, or before this process started
+    await store.services.update("s1", {"title": "New"})
+    restarted = server_for(store, tmp_path)
+    assert await restarted.lookup("/api/services/s1") is None
+    assert await restarted.lookup("/api/services") is None
+    assert restarted.stats()["out_of_date"] == ["services"]
+    # Collections that still match keep being served
+    assert await restarted.lookup("/api/stats") is not None
+
+    await export(store, tmp_path)
+    assert (await server_for(store, tmp_path).lookup("/api/services/s1"))["file"].startswith("api/services/s1/")
+
+
+async def test_nothing_is_served_without_storage_to_verify_against(store, tmp_path):
+    await export(store, tmp_path)
+    server = SnapshotServer(tmp_path, enabled=True, recheck_seconds=0)
+    assert await server.lookup("/api/services") is None
+    assert (tmp_path / MANIFEST_NAME).exists()
+    assert load_manifest(tmp_path)["fingerprints"]["services"]
+
+
+async def test_export_only_rerenders_changed_collections(store, tmp_path):
+    first = await export(store, tmp_path)
+    assert first["changed"] == ["experience", "portfolio", "services", "skills", "stats", "testimonials"]
+    manifest = load_manifest(tmp_path)
+    assert manifest["files"]["/api/services/s1"]["file"] == "api/services/s1/index.json"
+    assert (tmp_path / "api/services/index@active_only=false.json").exists()
+
+    assert (await export(store, tmp_path))["changed"] == []
+
+    await store.skills.insert({"id": "k1", "name": "Python", "category": "Backend", "level": 90})
+    second = await export(store, tmp_path)
+    assert second["changed"] == ["skills"]
+    # The skill lists and the bundle that embeds them; services and the rest are kept as they were
+    assert load_manifest(tmp_path)["files"]["/api/services/s1"] == manifest["files"]["/api/services/s1"]
+    assert second["written"] == second["rendered"] == len([
+        target for target, entry in load_manifest(tmp_path)["files"].items() if "skills" in entry["collections"]
+    ])
+
+
+async def test_export_removes_files_of_deleted_documents(store, tmp_path):
+    await export(store, tmp_path)
+    await store.services.delete("s1")
+    result = await export(store, tmp_path)
+
+    assert result["removed"] == 1
+    assert "/api/services/s1" not in load_manifest(tmp_path)["files"]
+    assert not (tmp_path / "api/services/s1").exists()
+    assert await server_for(store, tmp_path).lookup("/api/services/s1") is None
+
+
+@pytest.fixture
+def serving(client, monkeypatch, tmp_path):
+    """The app's snapshot middleware serving an export of the client's store from ``tmp_path``"""
+    from snapshot import snapshot_server
+    from storage import storage
+
+    # Large enough to be exported with compressed variants
+    features = [f"Conversion audit step {i}" for i in range(60)]
+    service_id = client.post("/api/services", json={**SERVICE, "features": features}).json()["id"]
+    client.portal.call(export, storage.current, tmp_path)
+    for name, value in [("enabled", True), ("directory", tmp_path), ("recheck_seconds", 0), ("_mtime", 0.0),
+                        ("served", 0), ("not_modified", 0), ("stale", 0), ("missed", 0)]:
+        monkeypatch.setattr(snapshot_server, name, value)
+    snapshot_server.attach(storage.current)
+    return service_id
+
+
+def test_middleware_serves_exported_files(client, serving):
+    response = client.get(f"/api/services/{serving}", headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    assert response.json()["title"] == "Old"
+    assert response.headers["etag"].endswith('-v1"')
+    assert "last-modified" in response.headers
+
+    assert client.get(f"/api/services/{serving}", headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+    assert client.get("/api/health/snapshot").json()["served"] == 1
+    assert client.get("/api/health/snapshot").json()["not_modified"] == 1
+
+
+def test_middleware_serves_precompressed_variants(client, serving):
+    plain = client.get(f"/api/services/{serving}", headers={"Accept-Encoding": "identity"})
+    gzipped = client.get(f"/api/services/{serving}", headers={"Accept-Encoding": "gzip"})
+
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzipped.headers["etag"] == encoding_etag(plain.headers["etag"], "gzip")
+    assert gzipped.json() == plain.json()
+    assert client.get("/api/health/snapshot").json()["served"] == 2
+
+
+def test_middleware_falls_back_to_the_routers_after_a_write(client, serving):
+    assert client.put(f"/api/services/{serving}", json={**SERVICE, "title": "New"}).status_code == 200
+
+    response = client.get(f"/api/services/{serving}")
+    assert response.json()["title"] == "New"
+    assert response.headers["etag"].endswith('-v2"')
+    assert client.get("/api/health/snapshot").json()["stale"] == 1
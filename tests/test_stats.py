@@ -0,0 +1,60 @@
+"""Stats: the in-memory current document, monthly history and best-effort history writes."""
+from datetime import datetime
+
+import pytest
+
+from repository import DuplicateKey
+from stats_store import month_bucket, stats_store
+
+STATS = {"total_sales": 5000000, "clients_served": 600, "years_experience": 9, "projects_completed": 800}
+
+
+def put_stats(client, **changes):
+    response = client.put("/api/stats", json={**STATS, **changes})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_updates_are_served_and_sampled_monthly(client):
+    etag = client.get("/api/stats").headers["etag"]
+    put_stats(client, clients_served=650)
+    put_stats(client, clients_served=620)
+
+    response = client.get("/api/stats", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["clients_served"] == 620
+
+    [point] = client.get("/api/stats/history", params={"metric": "clients_served"}).json()
+    assert point["bucket_start"] == month_bucket(datetime.utcnow()).isoformat()
+    assert (point["value"], point["min"], point["max"], point["samples"]) == (620, 620, 650, 2)
+
+
+def test_history_failures_do_not_fail_the_update(client, monkeypatch):
+    async def broken(*args):
+        raise RuntimeError("history unavailable")
+
+    monkeypatch.setattr(stats_store, "_write_history", broken)
+    assert put_stats(client, projects_completed=900)["projects_completed"] == 900
+    assert client.get("/api/stats").json()["projects_completed"] == 900
+    assert client.get("/api/stats/history", params={"metric": "projects_completed"}).json() == []
+
+
+def test_history_retries_a_bucket_created_concurrently(client, monkeypatch):
+    write_history = stats_store._write_history
+    calls = []
+
+    async def racing(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            raise DuplicateKey("stats_history")
+        await write_history(*args)
+
+    monkeypatch.setattr(stats_store, "_write_history", racing)
+    put_stats(client)
+    assert len(calls) == 2
+    assert client.get("/api/stats/history", params={"metric": "total_sales"}).json()[0]["samples"] == 1
+
+
+@pytest.mark.parametrize("params", [{"metric": "revenue"}, {"metric": "total_sales", "months": 0}])
+def test_history_rejects_bad_parameters(client, params):
+    assert client.get("/api/stats/history", params=params).status_code in (400, 422)
@@ -0,0 +1,67 @@
+"""Synthetic data: reproducible sequences, valid documents and batched loading."""
+from datetime import datetime
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+import synthetic_data
+from contact_analytics import contact_rollups
+from models import ContactForm, PortfolioItem, Skill, Testimonial
+from storage import MemoryStorage, MongoStorage
+from synthetic_data import BLOCK_SIZE, generate, load
+
+UNTIL = datetime(2026, 6, 1)
+MODELS = {"contacts": ContactForm, "portfolio": PortfolioItem, "testimonials": Testimonial, "skills": Skill}
+
+
+@pytest.mark.parametrize("collection", sorted(MODELS))
+def test_documents_are_valid_and_reproducible(collection):
+    docs = list(generate(collection, 20, seed=7, until=UNTIL))
+
+    for doc in docs:
+        assert MODELS[collection](**doc).model_dump() == doc
+        assert doc["created_at"] <= UNTIL
+    assert docs == list(generate(collection, 20, seed=7, until=UNTIL))
+    assert docs != list(generate(collection, 20, seed=8, until=UNTIL))
+
+
+def test_any_slice_continues_the_same_sequence():
+    start = BLOCK_SIZE - 5
+    whole = list(generate("skills", start + 10, until=UNTIL))
+    assert list(generate("skills", 10, start=start, until=UNTIL)) == whole[start:]
+    assert list(generate("skills", 0, until=UNTIL)) == []
+
+
+@pytest.mark.anyio
+async def test_load_replaces_or_appends_in_batches():
+    store = MemoryStorage()
+    report = await load(store, {"skills": 25, "portfolio": 5}, seed=1, batch_size=4, concurrency=2, until=UNTIL)
+    assert {name: result["inserted"] for name, result in report.items()} == {"skills": 25, "portfolio": 5}
+    assert await store.skills.count() == 25
+
+    report = await load(store, {"skills": 10}, seed=1, batch_size=3, append=True, until=UNTIL)
+    assert (report["skills"]["start"], report["skills"]["failed"]) == (25, 0)
+    ids = {doc["id"] async for doc in store.skills.iterate()}
+    assert ids == {doc["id"] for doc in generate("skills", 35, seed=1, until=UNTIL)}
+
+    await load(store, {"skills": 3}, seed=1, until=UNTIL)
+    assert await store.skills.count() == 3
+
+
+@pytest.mark.anyio
+async def test_contact_rollups_are_written_once_for_the_whole_load(monkeypatch):
+    monkeypatch.setattr(contact_rollups, "enabled", True)
+    applied = []
+    record_deltas = contact_rollups.record_deltas
+
+    async def counting(db, deltas):
+        applied.append(sum(count for (_, dim, _), count in deltas.items() if dim == "total"))
+        await record_deltas(db, deltas)
+
+    monkeypatch.setattr(contact_rollups, "record_deltas", counting)
+    store = MongoStorage(AsyncMongoMockClient().db)
+    await load(store, {"contacts": 30}, batch_size=7, until=UNTIL)
+
+    assert applied == [30]
+    assert (await contact_rollups.analytics(store.mongo, None, None))["total"] == 30
+    assert synthetic_data.ROLLUP_COLLECTION in await store.mongo.list_collection_names()
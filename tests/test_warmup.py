@@ -0,0 +1,47 @@
+"""Startup warm-up: pre-rendered responses are what the routes serve, within a time budget."""
+import asyncio
+
+import pytest
+
+from cache import read_cache
+from storage import MemoryStorage
+from warmup import CacheWarmer, WarmupTarget
+
+PUBLIC_READS = [
+    "/api/stats", "/api/services", "/api/portfolio", "/api/portfolio?featured_only=true", "/api/portfolio/categories",
+    "/api/testimonials", "/api/testimonials?featured_only=true", "/api/experience", "/api/skills",
+    "/api/skills/categories", "/api/bundle",
+]
+
+
+def test_first_requests_are_served_from_the_warmed_cache(client):
+    assert client.get("/api/health/warmup").json()["state"] == "complete"
+    misses = read_cache.stats()["misses"]
+
+    for path in PUBLIC_READS:
+        assert client.get(path).status_code == 200
+    # Every warm-up key matches the key its route builds
+    assert read_cache.stats()["misses"] == misses
+
+
+@pytest.mark.anyio
+async def test_budget_and_failures_are_reported():
+    async def slow(store):
+        await asyncio.sleep(1)
+
+    async def broken(store):
+        raise RuntimeError("no such collection")
+
+    warmer = CacheWarmer(budget=0.2)
+    warmer.start(MemoryStorage(), [WarmupTarget(("warmup-test", "slow"), slow),
+                                   WarmupTarget(("warmup-test", "broken"), broken)])
+    with pytest.raises(RuntimeError, match="Warm-up running"):
+        await warmer.check()
+    await warmer._task
+
+    report = await warmer.check()
+    assert report["state"] == "timed_out"
+    assert report["unfinished"] == ["warmup-test:slow"]
+    assert report["failed"] == {"warmup-test:broken": "no such collection"}
+    # Stats and the search index load whatever happens to the pre-rendering
+    assert report["warmed"] == 2